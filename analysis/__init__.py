@@ -0,0 +1,14 @@
+"""
+Análisis POD / DMD / SVD de los accidentes en carreteras federales.
+
+Módulos de biblioteca (sin efectos al importar y sin matplotlib):
+- analysis.data: carga de datos y construcción de matrices snapshot
+- analysis.pod.pod_core: POD (SVD de la matriz snapshot)
+- analysis.dmd.dmd_core: DMD exacto, predicción y estabilidad
+- analysis.svd.svd_core: SVD de ventanas deslizantes sobre la serie diaria
+- analysis.spectral.spectral_core: periodogramas y períodos dominantes en lote
+- analysis.similarity.similarity_core: firmas de corredores, vecinos y agrupamiento
+
+Los scripts (pod_spatial.py, pod_estados.py, dmd_analysis.py) usan estos
+módulos y solo importan matplotlib al generar las figuras.
+"""
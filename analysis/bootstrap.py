@@ -0,0 +1,292 @@
+"""
+Bandas de confianza bootstrap para modos POD y autovalores DMD.
+
+Cada réplica remuestrea la matriz snapshot y recalcula la descomposición:
+- 'block': bootstrap por bloques de meses consecutivos (circular), que
+  conserva la autocorrelación dentro de cada bloque. El DMD remuestrea pares
+  de snapshots (x_k, x_{k+1}), así que las uniones entre bloques no crean
+  transiciones falsas
+- 'poisson': cada celda se sustituye por un conteo de Poisson con su media;
+  el calendario se conserva
+
+Los modos de cada réplica salen en otro orden y con otro signo: se alinean
+con los de referencia por asignación óptima (húngara) sobre |U_ref^T U| y
+luego por el signo de la correlación; los autovalores DMD se emparejan con
+los de referencia por distancia en el plano complejo.
+
+Las réplicas se reparten en lotes entre procesos; X se publica una vez en
+memoria compartida y las descomposiciones usan SVD aleatorizada. Con un
+presupuesto de tiempo, cada lote se detiene al llegar al plazo y devuelve las
+réplicas que ya hizo.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+
+import numpy as np
+
+from analysis.dmd.hodmd import hodmd
+from analysis.linalg import as_float, randomized_svd, svd
+from analysis.shared import SharedArrays, attach, shared_task
+
+METODOS = ('block', 'poisson')
+N_REPLICAS = 200
+LOTE_REPLICAS = 25
+BLOQUE_MESES = 12
+NIVEL = 0.90  # Cobertura de las bandas
+
+
+# ============================================================
+# Remuestreo y alineamiento
+# ============================================================
+
+def block_indices(n, block_len, rng):
+	"""Índices de un bootstrap circular por bloques de longitud block_len sobre 0..n-1."""
+	block_len = max(1, min(block_len, n))
+	starts = rng.integers(0, n, size=-(-n // block_len))
+	return ((starts[:, None] + np.arange(block_len)) % n).ravel()[:n]
+
+
+def align_modes(U_ref, U):
+	"""
+	Orden y signo de las columnas de U que mejor reproducen las de U_ref.
+
+	Returns:
+		order: Columna de U asignada a cada columna de U_ref
+		signs: ±1 por columna de U_ref
+		match: |correlación| de cada pareja (1 = mismo modo)
+	"""
+	from scipy.optimize import linear_sum_assignment
+
+	C = U_ref.T @ U
+	_, order = linear_sum_assignment(-np.abs(C))
+	matched = C[np.arange(len(order)), order]
+	return order, np.where(matched < 0, -1.0, 1.0), np.abs(matched)
+
+
+def match_eigenvalues(reference, eigenvalues):
+	"""Autovalores emparejados uno a uno con los de referencia (NaN si faltan)."""
+	from scipy.optimize import linear_sum_assignment
+
+	matched = np.full(len(reference), np.nan, dtype=complex)
+	rows, cols = linear_sum_assignment(np.abs(reference[:, None] - eigenvalues[None, :]))
+	matched[rows] = eigenvalues[cols]
+	return matched
+
+
+def _resample(X, method, block_len, rng):
+	"""Réplica de X e índices de columnas usados (None si se conserva el calendario)."""
+	if method == 'block':
+		columns = block_indices(X.shape[1], block_len, rng)
+		return X[:, columns], columns
+	return rng.poisson(np.maximum(X, 0)).astype(float), None
+
+
+# ============================================================
+# Tareas del pool
+# ============================================================
+
+def _expired(deadline):
+	return deadline is not None and time.time() > deadline
+
+
+@shared_task
+def _pod_batch(handle, n_modes, method, block_len, n_replicas, seed, deadline=None):
+	"""POD de hasta n_replicas réplicas de X (al menos una; ninguna más pasado `deadline`), alineado con la referencia."""
+	arrays = attach(handle)
+	X, X_centered, U_ref = arrays['X'], arrays['X_centered'], arrays['U_ref']
+	rng = np.random.default_rng(seed)
+	k = U_ref.shape[1]
+
+	S_b = np.empty((n_replicas, k))
+	U_b = np.empty((n_replicas, X.shape[0], k))
+	Vt_b = np.empty((n_replicas, k, X.shape[1]))
+	match = np.empty((n_replicas, k))
+	done = 0
+	for i in range(n_replicas):
+		if done and _expired(deadline):
+			break
+		X_rep, columns = _resample(X, method, block_len, rng)
+		X_rep = X_rep - X_rep.mean(axis=1, keepdims=True)
+		U, S, Vt = randomized_svd(X_rep, n_modes, rng=rng)
+
+		order, signs, match[i] = align_modes(U_ref, U)
+		U_b[i] = U[:, order] * signs
+		S_b[i] = S[order]
+		# Con bloques, los modos temporales de la réplica están en otro
+		# calendario: se proyecta la X original sobre sus modos espaciales
+		if columns is None:
+			Vt_b[i] = Vt[order] * signs[:, None]
+		else:
+			Vt_b[i] = (U_b[i].T @ X_centered) / S_b[i][:, None]
+		done += 1
+
+	return S_b[:done], U_b[:done], Vt_b[:done], match[:done]
+
+
+@shared_task
+def _dmd_batch(handle, rank, delays, method, block_len, n_replicas, seed, deadline=None):
+	"""Autovalores DMD de hasta n_replicas réplicas de X (al menos una; ninguna más pasado `deadline`), emparejados."""
+	arrays = attach(handle)
+	X_centered, reference = arrays['X_centered'], arrays['eigenvalues']
+	rng = np.random.default_rng(seed)
+	n = X_centered.shape[1]
+
+	eigenvalues = np.empty((n_replicas, len(reference)), dtype=complex)
+	done = 0
+	for i in range(n_replicas):
+		if done and _expired(deadline):
+			break
+		if delays > 1:
+			X_rep, _ = _resample(X_centered + arrays['X_mean'], 'poisson', block_len, rng)
+			_, lam, _ = hodmd(X_rep - X_rep.mean(axis=1, keepdims=True), d=delays, r=rank)
+		else:
+			# Pares (x_k, x_{k+1}) remuestreados por bloques, o todos con conteos de Poisson
+			if method == 'block':
+				X1_idx = block_indices(n - 1, block_len, rng)
+				X1, X2 = X_centered[:, X1_idx], X_centered[:, X1_idx + 1]
+			else:
+				X_rep, _ = _resample(X_centered + arrays['X_mean'], 'poisson', block_len, rng)
+				X_rep -= X_rep.mean(axis=1, keepdims=True)
+				X1, X2 = X_rep[:, :-1], X_rep[:, 1:]
+			U, S, Vt = randomized_svd(X1, rank, rng=rng)
+			keep = S > S[0] * 1e-10
+			lam = np.linalg.eigvals((U[:, keep].T @ X2 @ Vt[keep].T) / S[keep])
+		eigenvalues[i] = match_eigenvalues(reference, lam)
+		done += 1
+
+	return eigenvalues[:done]
+
+
+def _run_batches(task, arrays, args, n_replicas, batch_size, executor, seed, max_seconds, max_workers=None):
+	"""
+	Reparte n_replicas en lotes de `task` y concatena los resultados completados a tiempo.
+
+	Con max_seconds, los lotes son como mucho de n_replicas / procesos réplicas
+	(al menos uno por proceso) y reciben el plazo: los que están en marcha al
+	agotarse devuelven lo hecho y los que no empezaron se cancelan, salvo el
+	primero, para que haya alguna réplica. La memoria compartida solo se
+	libera cuando no queda ningún lote en marcha.
+	"""
+	deadline = None
+	if max_seconds is not None:
+		deadline = time.time() + max_seconds
+		n_workers = max_workers or getattr(executor, '_max_workers', None) or os.cpu_count() or 1
+		batch_size = max(1, min(batch_size, -(-n_replicas // n_workers)))
+
+	seeds = np.random.SeedSequence(seed).spawn(-(-n_replicas // batch_size))
+	sizes = [min(batch_size, n_replicas - i * batch_size) for i in range(len(seeds))]
+
+	owns_executor = executor is None
+	if owns_executor:
+		executor = ProcessPoolExecutor(max_workers=max_workers)
+	try:
+		with SharedArrays(arrays) as shared:
+			futures = [executor.submit(task, shared.handle, *args, size, s, deadline) for size, s in zip(sizes, seeds)]
+			# Sin tiempo, los lotes que no empezaron se cancelan (salvo el primero); los que
+			# están en marcha paran en el plazo y se esperan antes de liberar la memoria
+			_, not_done = wait(futures, timeout=max_seconds)
+			for pending in not_done:
+				if pending is not futures[0]:
+					pending.cancel()
+			results = [future.result() for future in futures if not future.cancelled()]
+	finally:
+		if owns_executor:
+			executor.shutdown(wait=False, cancel_futures=True)
+
+	return results
+
+
+# ============================================================
+# API
+# ============================================================
+
+def bootstrap_pod(X, n_modes=3, method='block', n_replicas=N_REPLICAS, block_len=BLOQUE_MESES,
+                  batch_size=LOTE_REPLICAS, executor=None, seed=0, max_seconds=None, U_ref=None, max_workers=None):
+	"""
+	Réplicas bootstrap de los primeros modos POD (centrado) de X.
+
+	Args:
+		X: Matriz snapshot (espacio × tiempo)
+		n_modes: Modos evaluados
+		method: 'block' (bloques de meses) o 'poisson' (conteos)
+		n_replicas: Número de réplicas
+		block_len: Meses por bloque
+		batch_size: Réplicas por tarea del pool
+		executor: Pool de procesos compartido (si es None se crea uno)
+		seed: Semilla (cada lote usa una semilla derivada)
+		max_seconds: Presupuesto de tiempo; al agotarse se devuelven las
+			réplicas terminadas
+		U_ref: Modos espaciales ya calculados (p. ej. de compute_pod) cuyo
+			orden y signo deben seguir las réplicas
+		max_workers: Procesos del pool que se crea si executor es None
+			(por defecto, uno por CPU)
+
+	Returns:
+		Dict con la referencia ('U', 'S', 'Vt') y las réplicas alineadas
+		('U_samples' B × m × k, 'S_samples' B × k, 'Vt_samples' B × k × n,
+		'match' B × k: |correlación| con el modo de referencia)
+	"""
+	if method not in METODOS:
+		raise ValueError(f"Método desconocido: {method} (opciones: {', '.join(METODOS)})")
+	X = as_float(X, 'float64')
+	X_centered = X - X.mean(axis=1, keepdims=True)
+	U, S, Vt = svd(X_centered)
+	n_modes = min(n_modes, *X.shape)
+	U, S, Vt = U[:, :n_modes], S[:n_modes], Vt[:n_modes]
+	if U_ref is not None:
+		order, signs, _ = align_modes(np.asarray(U_ref[:, :n_modes], dtype=float), U)
+		U, S, Vt = U[:, order] * signs, S[order], Vt[order] * signs[:, None]
+
+	results = _run_batches(_pod_batch, {'X': X, 'X_centered': X_centered, 'U_ref': U},
+	                       (n_modes, method, block_len), n_replicas, batch_size, executor, seed, max_seconds, max_workers)
+	S_b, U_b, Vt_b, match = (np.concatenate(parts) for parts in zip(*results))
+
+	return {'U': U, 'S': S, 'Vt': Vt, 'U_samples': U_b, 'S_samples': S_b, 'Vt_samples': Vt_b, 'match': match}
+
+
+def bootstrap_dmd(X, rank=10, delays=1, method='block', n_replicas=N_REPLICAS, block_len=BLOQUE_MESES,
+                  batch_size=LOTE_REPLICAS, executor=None, seed=0, max_seconds=None, max_workers=None):
+	"""
+	Réplicas bootstrap de los autovalores DMD (X centrada por filas).
+
+	Con delays > 1 (HODMD) solo se admite el remuestreo de Poisson: los
+	bloques romperían los snapshots con retardos.
+
+	Args:
+		X: Matriz snapshot (espacio × tiempo)
+		rank: Número de modos DMD
+		delays: Retardos (> 1 usa HODMD, como dmd_analysis)
+		(resto como bootstrap_pod)
+
+	Returns:
+		Dict con 'eigenvalues' (referencia, r) y 'samples' (B × r, emparejados;
+		NaN donde la réplica tiene menos modos)
+	"""
+	if method not in METODOS:
+		raise ValueError(f"Método desconocido: {method} (opciones: {', '.join(METODOS)})")
+	if delays > 1 and method != 'poisson':
+		raise ValueError("Con retardos (HODMD) solo se admite method='poisson'")
+	X = as_float(X, 'float64')
+	X_mean = X.mean(axis=1, keepdims=True)
+	X_centered = X - X_mean
+
+	if delays > 1:
+		_, eigenvalues, _ = hodmd(X_centered, d=delays, r=rank)
+	else:
+		U, S, Vt = svd(X_centered[:, :-1])
+		r = min(rank, int(np.sum(S > S[0] * 1e-10)))
+		eigenvalues = np.linalg.eigvals((U[:, :r].T @ X_centered[:, 1:] @ Vt[:r].T) / S[:r])
+
+	results = _run_batches(_dmd_batch, {'X_centered': X_centered, 'X_mean': X_mean, 'eigenvalues': eigenvalues},
+	                       (rank, delays, method, block_len), n_replicas, batch_size, executor, seed, max_seconds, max_workers)
+
+	return {'eigenvalues': eigenvalues, 'samples': np.concatenate(results)}
+
+
+def bands(samples, level=NIVEL):
+	"""Percentiles (1 - level)/2 y (1 + level)/2 de las réplicas (eje 0), ignorando NaN."""
+	alpha = (1 - level) / 2
+	lower, upper = np.nanquantile(samples, [alpha, 1 - alpha], axis=0)
+	return lower, upper
@@ -0,0 +1,516 @@
+"""
+Carga de datos y construcción de matrices snapshot.
+
+Lee las tablas generadas por `make extract-data` en extracted/analysis_data.db.
+"""
+
+import sqlite3
+import numpy as np
+import pandas as pd
+
+DB_PATH = "extracted/analysis_data.db"
+
+# Medidas enteras y dimensiones codificadas de la tabla `accidents_fact`
+FACT_MEASURES = ('pessoas', 'mortos', 'feridos_leves', 'feridos_graves', 'ilesos', 'feridos', 'veiculos')
+FACT_DIMENSIONS = ('uf', 'municipio', 'causa_acidente', 'tipo_acidente', 'classificacao_acidente',
+                   'fase_dia', 'condicao_metereologica', 'tipo_pista')
+
+# Modos de los tensores de conteos → expresión SQL sobre `accidents_fact`
+TENSOR_MODES = {
+	**{dimension: f"{dimension}_id" for dimension in FACT_DIMENSIONS},
+	'br': "br",
+	'km_bin': "CAST(km / {bin_size} AS INTEGER) * {bin_size}",
+	'hora': "hora",
+	'dia_semana': "CAST(strftime('%w', date) AS INTEGER)",
+	'mes_anio': "strftime('%Y-%m', date)",
+	'ano': "CAST(strftime('%Y', date) AS INTEGER)",
+}
+
+# Resolución → (tabla, columna de período) de la serie temporal nacional
+SERIES_TABLES = {
+	'day': ('accidents_daily', 'date'),
+	'week': ('rollup_total_week', 'semana'),
+	'month': ('rollup_total_month', 'mes_anio'),
+	'quarter': ('rollup_total_quarter', 'trimestre'),
+}
+
+# (nivel, resolución) → (cubo, columnas clave, columna de período) de las series por grupo
+GROUP_SERIES = {
+	('uf', 'day'): ('rollup_uf_br_km1_day', ('uf',), 'date'),
+	('uf', 'month'): ('rollup_uf_month', ('uf',), 'mes_anio'),
+	('uf_br', 'day'): ('rollup_uf_br_km1_day', ('uf', 'br'), 'date'),
+	('uf_br', 'month'): ('rollup_uf_br_km10_month', ('uf', 'br'), 'mes_anio'),
+}
+
+
+def _calendario_mensual(meses):
+	"""Meses 'YYYY-MM' consecutivos entre el primero y el último de `meses` (vacío si no hay ninguno)."""
+	if len(meses) == 0:
+		return pd.Index([], dtype=object)
+	return pd.Index(pd.period_range(min(meses), max(meses), freq='M').strftime('%Y-%m'), dtype=object)
+
+
+def load_spatial_data(estado, carretera, bin_size=10, db_path=DB_PATH):
+	"""
+	Carga conteos de accidentes por tramo y mes desde la base de datos
+	para un estado y carretera específicos.
+
+	Lee los cubos pre-agregados generados por `make extract-data`:
+	- bin_size múltiplo de 10: `rollup_uf_br_km10_month`
+	- cualquier otro bin entero: `rollup_uf_br_km1_day`, re-agrupado por tramo y mes
+
+	Los tramos son intervalos [km, km + bin_size).
+
+	Returns:
+		DataFrame con: tramo_km, mes_anio, count
+	"""
+	conn = sqlite3.connect(db_path)
+
+	if bin_size % 10 == 0:
+		query = """
+		SELECT
+			(km_bin / ?) * ? AS tramo_km,
+			mes_anio,
+			SUM(count) AS count
+		FROM rollup_uf_br_km10_month
+		WHERE uf = ?
+		  AND br = ?
+		GROUP BY tramo_km, mes_anio
+		ORDER BY mes_anio
+		"""
+	else:
+		query = """
+		SELECT
+			(km_bin / ?) * ? AS tramo_km,
+			substr(date, 1, 7) AS mes_anio,
+			SUM(count) AS count
+		FROM rollup_uf_br_km1_day
+		WHERE uf = ?
+		  AND br = ?
+		GROUP BY tramo_km, mes_anio
+		ORDER BY mes_anio
+		"""
+
+	df = pd.read_sql_query(query, conn, params=(int(bin_size), int(bin_size), estado, carretera))
+	conn.close()
+
+	return df
+
+
+def build_snapshot_matrix(df, dtype=None):
+	"""
+	Construye la matriz snapshot espacial-temporal.
+
+	Las columnas son el calendario mensual completo entre el primer y el último
+	mes de df: los meses sin accidentes en todo el corredor (que no aparecen en
+	df) son columnas de ceros, así que columnas consecutivas son meses
+	consecutivos, como exige DMD.
+
+	Args:
+		df: DataFrame con columnas 'tramo_km', 'mes_anio' y 'count'
+		dtype: Tipo de X (p. ej. 'float32'; por defecto, el de los conteos)
+
+	Returns:
+		X: Matriz numpy (n_tramos, n_meses)
+		tramos: Array con los valores de km de cada tramo
+		meses: Array con los períodos mensuales ('YYYY-MM', sin huecos)
+	"""
+	matriz_X = df.pivot_table(index='tramo_km', columns='mes_anio', values='count',
+	                          aggfunc='sum', fill_value=0)
+	matriz_X = matriz_X.reindex(columns=_calendario_mensual(matriz_X.columns), fill_value=0)
+
+	X = matriz_X.to_numpy(dtype=dtype)
+	tramos = matriz_X.index.astype(float).values
+	meses = matriz_X.columns.values
+
+	return X, tramos, meses
+
+
+def load_estados_data(db_path=DB_PATH):
+	"""
+	Carga datos agregados por estado y mes desde la base de datos.
+
+	Lee el cubo pre-agregado `rollup_uf_month` (generado por `make extract-data`)
+	en lugar de agrupar todo `accidents_spatial` en cada ejecución.
+
+	Returns:
+		DataFrame con: uf, mes_anio, count
+	"""
+	conn = sqlite3.connect(db_path)
+
+	query = """
+	SELECT
+		uf,
+		mes_anio,
+		count
+	FROM rollup_uf_month
+	ORDER BY uf, mes_anio
+	"""
+
+	df = pd.read_sql_query(query, conn)
+	conn.close()
+
+	return df
+
+
+def build_estados_matrix(df, dtype=None):
+	"""
+	Construye la matriz snapshot de estados × tiempo.
+
+	Como en `build_snapshot_matrix`, los meses sin accidentes en ningún estado
+	son columnas de ceros.
+
+	Args:
+		df: DataFrame con columnas 'uf', 'mes_anio', 'count'
+		dtype: Tipo de X (p. ej. 'float32'; por defecto, el de los conteos)
+
+	Returns:
+		X: Matriz numpy (n_estados, n_meses)
+		estados: Array con los códigos de los estados
+		meses: Array con los períodos mensuales ('YYYY-MM', sin huecos)
+	"""
+	matriz_X = df.pivot_table(index='uf', columns='mes_anio', values='count', fill_value=0)
+	matriz_X = matriz_X.reindex(columns=_calendario_mensual(matriz_X.columns), fill_value=0)
+
+	X = matriz_X.to_numpy(dtype=dtype)
+	estados = matriz_X.index.values
+	meses = matriz_X.columns.values
+
+	return X, estados, meses
+
+
+def load_daily_series(db_path=DB_PATH):
+	"""
+	Carga la serie diaria de accidentes (tabla `accidents_daily`).
+
+	Returns:
+		dates: Fechas (datetime64) ordenadas
+		counts: Número de accidentes por día
+	"""
+	conn = sqlite3.connect(db_path)
+	daily = pd.read_sql_query("SELECT date, accidents_count FROM accidents_daily ORDER BY date", conn)
+	conn.close()
+
+	return pd.to_datetime(daily["date"]).values, daily["accidents_count"].values
+
+
+def load_corridors(min_count=0, db_path=DB_PATH):
+	"""
+	Corredores (estado, carretera) con al menos `min_count` accidentes.
+
+	Lee el cubo `rollup_uf_br_km10_month`.
+
+	Returns:
+		Lista de (uf, br), de mayor a menor número de accidentes
+	"""
+	conn = sqlite3.connect(db_path)
+	rows = conn.execute("""
+		SELECT uf, br
+		FROM rollup_uf_br_km10_month
+		GROUP BY uf, br
+		HAVING SUM(count) >= ?
+		ORDER BY SUM(count) DESC
+	""", (min_count,)).fetchall()
+	conn.close()
+
+	return [(uf, int(br)) for uf, br in rows]
+
+
+def load_series(resolution='day', db_path=DB_PATH):
+	"""
+	Carga la serie nacional de accidentes con la resolución pedida.
+
+	Lee los cubos pre-agregados generados por `make extract-data`
+	(`rollup_total_week`, `rollup_total_month`, `rollup_total_quarter`).
+
+	Args:
+		resolution: 'day', 'week', 'month' o 'quarter'
+
+	Returns:
+		periods: Períodos ordenados (fecha, lunes de la semana, 'YYYY-MM' o 'YYYY-Qn')
+		counts: Número de accidentes por período
+	"""
+	if resolution not in SERIES_TABLES:
+		raise ValueError(f"Resolución desconocida: {resolution} (opciones: {', '.join(SERIES_TABLES)})")
+	table, period_column = SERIES_TABLES[resolution]
+	count_column = 'accidents_count' if resolution == 'day' else 'count'
+
+	conn = sqlite3.connect(db_path)
+	rows = conn.execute(f"SELECT {period_column}, {count_column} FROM {table} ORDER BY {period_column}").fetchall()
+	conn.close()
+
+	periods = np.array([period for period, _ in rows])
+	counts = np.array([count for _, count in rows], dtype=np.int64)
+
+	return periods, counts
+
+
+def load_series_matrix(level='uf', resolution='month', min_count=0, db_path=DB_PATH):
+	"""
+	Series de todos los estados (o corredores) como una matriz grupos × períodos.
+
+	Todas las series comparten el calendario completo entre el primer y el
+	último período del cubo; los períodos sin accidentes valen 0.
+
+	Args:
+		level: 'uf' o 'uf_br'
+		resolution: 'day' o 'month'
+		min_count: Grupos con menos accidentes en total se descartan
+
+	Returns:
+		keys: Lista de claves (uf,) o (uf, br) de cada fila
+		periods: Períodos ('YYYY-MM-DD' o 'YYYY-MM')
+		X: Matriz (n_grupos × n_períodos) de conteos
+	"""
+	if (level, resolution) not in GROUP_SERIES:
+		raise ValueError(f"Serie desconocida: {level}/{resolution} (opciones: "
+		                 f"{', '.join(f'{l}/{r}' for l, r in GROUP_SERIES)})")
+	table, key_columns, period_column = GROUP_SERIES[(level, resolution)]
+	keys_sql = ", ".join(key_columns)
+
+	query = f"""
+	SELECT {keys_sql}, {period_column} AS period, SUM(count) AS count
+	FROM {table}
+	WHERE ({keys_sql}) IN (
+		SELECT {keys_sql} FROM {table} GROUP BY {keys_sql} HAVING SUM(count) >= ?
+	)
+	GROUP BY {keys_sql}, period
+	"""
+
+	conn = sqlite3.connect(db_path)
+	df = pd.read_sql_query(query, conn, params=(min_count,))
+	conn.close()
+
+	if df.empty:
+		return [], np.array([]), np.zeros((0, 0))
+
+	if resolution == 'day':
+		calendar = pd.date_range(df['period'].min(), df['period'].max(), freq='D').strftime('%Y-%m-%d')
+	else:
+		calendar = pd.period_range(df['period'].min(), df['period'].max(), freq='M').strftime('%Y-%m')
+
+	matrix = df.pivot_table(index=list(key_columns), columns='period', values='count', aggfunc='sum', fill_value=0)
+	matrix = matrix.reindex(columns=calendar, fill_value=0)
+	keys = [key if isinstance(key, tuple) else (key,) for key in matrix.index]
+
+	return keys, np.asarray(calendar), matrix.to_numpy(dtype=float)
+
+
+def load_corridor_matrices(min_count=0, bin_size=10, db_path=DB_PATH):
+	"""
+	Matrices snapshot (tramos × meses) de todos los corredores con una sola consulta.
+
+	Lee el cubo `rollup_uf_br_km10_month` (bin_size múltiplo de 10). Todas las
+	matrices comparten el calendario mensual completo del cubo, así que sus
+	columnas son comparables entre corredores.
+
+	Args:
+		min_count: Corredores con menos accidentes en total se descartan
+		bin_size: Tramo en km (múltiplo de 10)
+
+	Returns:
+		meses: Calendario común ('YYYY-MM')
+		matrices: Dict (uf, br) → (X, tramos), de mayor a menor número de accidentes
+	"""
+	if bin_size % 10 != 0:
+		raise ValueError(f"bin_size debe ser múltiplo de 10 (recibido: {bin_size})")
+
+	query = """
+	SELECT uf, br, (km_bin / ?) * ? AS tramo_km, mes_anio, SUM(count) AS count
+	FROM rollup_uf_br_km10_month
+	WHERE (uf, br) IN (
+		SELECT uf, br FROM rollup_uf_br_km10_month GROUP BY uf, br HAVING SUM(count) >= ?
+	)
+	GROUP BY uf, br, tramo_km, mes_anio
+	"""
+
+	conn = sqlite3.connect(db_path)
+	df = pd.read_sql_query(query, conn, params=(int(bin_size), int(bin_size), min_count))
+	conn.close()
+
+	if df.empty:
+		return np.array([]), {}
+
+	meses = pd.period_range(df['mes_anio'].min(), df['mes_anio'].max(), freq='M').strftime('%Y-%m')
+	df['columna'] = pd.Index(meses).get_indexer(df['mes_anio'])
+	totales = df.groupby(['uf', 'br'])['count'].sum().sort_values(ascending=False)
+
+	matrices = {}
+	grupos = dict(tuple(df.groupby(['uf', 'br'])))
+	for uf, br in totales.index:
+		grupo = grupos[(uf, br)]
+		tramos, fila = np.unique(grupo['tramo_km'].to_numpy(), return_inverse=True)
+		X = np.zeros((len(tramos), len(meses)))
+		np.add.at(X, (fila, grupo['columna'].to_numpy()), grupo['count'].to_numpy())
+		matrices[(uf, int(br))] = (X, tramos.astype(float))
+
+	return np.asarray(meses), matrices
+
+
+def load_dow_month(db_path=DB_PATH):
+	"""
+	Carga la matriz día de la semana × mes (cubo `rollup_total_dow_month`).
+
+	Returns:
+		DataFrame con: dia_semana (0 = domingo), mes_anio, count, dias
+	"""
+	conn = sqlite3.connect(db_path)
+	df = pd.read_sql_query("SELECT dia_semana, mes_anio, count, dias FROM rollup_total_dow_month ORDER BY mes_anio, dia_semana", conn)
+	conn.close()
+
+	return df
+
+
+def load_severity_data(estado, carretera, medida='mortos', bin_size=10, db_path=DB_PATH):
+	"""
+	Carga una medida de severidad por tramo y mes (tabla `accidents_fact`).
+
+	Devuelve el mismo formato que `load_spatial_data`, así que la matriz
+	ponderada se construye con `build_snapshot_matrix`.
+
+	Args:
+		medida: Columna de FACT_MEASURES a sumar (p. ej. 'mortos', 'feridos_graves')
+
+	Returns:
+		DataFrame con: tramo_km, mes_anio, count (suma de la medida)
+	"""
+	if medida not in FACT_MEASURES:
+		raise ValueError(f"Medida desconocida: {medida} (opciones: {', '.join(FACT_MEASURES)})")
+
+	query = f"""
+	SELECT
+		CAST(km / ? AS INTEGER) * ? AS tramo_km,
+		strftime('%Y-%m', date) AS mes_anio,
+		SUM({medida}) AS count
+	FROM accidents_fact
+	WHERE uf_id = (SELECT id FROM dim_uf WHERE value = ?)
+	  AND br = ?
+	  AND km >= 0
+	GROUP BY tramo_km, mes_anio
+	ORDER BY mes_anio
+	"""
+
+	conn = sqlite3.connect(db_path)
+	df = pd.read_sql_query(query, conn, params=(int(bin_size), int(bin_size), estado, carretera))
+	conn.close()
+
+	df['count'] = df['count'].fillna(0)
+	return df
+
+
+def load_breakdown(dimension, estado=None, carretera=None, medida=None, db_path=DB_PATH):
+	"""
+	Accidentes (o suma de una medida) por valor de una dimensión y mes.
+
+	Args:
+		dimension: Columna de FACT_DIMENSIONS (p. ej. 'causa_acidente')
+		estado, carretera: Filtros opcionales
+		medida: Columna de FACT_MEASURES a sumar (por defecto, número de accidentes)
+
+	Returns:
+		DataFrame con: <dimension>, mes_anio, count
+	"""
+	if dimension not in FACT_DIMENSIONS:
+		raise ValueError(f"Dimensión desconocida: {dimension} (opciones: {', '.join(FACT_DIMENSIONS)})")
+	if medida is not None and medida not in FACT_MEASURES:
+		raise ValueError(f"Medida desconocida: {medida} (opciones: {', '.join(FACT_MEASURES)})")
+
+	filters, params = [], []
+	if estado is not None:
+		filters.append("f.uf_id = (SELECT id FROM dim_uf WHERE value = ?)")
+		params.append(estado)
+	if carretera is not None:
+		filters.append("f.br = ?")
+		params.append(carretera)
+	where = f"WHERE {' AND '.join(filters)}" if filters else ""
+
+	query = f"""
+	SELECT
+		d.value AS {dimension},
+		strftime('%Y-%m', f.date) AS mes_anio,
+		{f'SUM(f.{medida})' if medida else 'COUNT(*)'} AS count
+	FROM accidents_fact AS f
+	JOIN dim_{dimension} AS d ON d.id = f.{dimension}_id
+	{where}
+	GROUP BY d.value, mes_anio
+	ORDER BY mes_anio, d.value
+	"""
+
+	conn = sqlite3.connect(db_path)
+	df = pd.read_sql_query(query, conn, params=params)
+	conn.close()
+
+	return df
+
+
+def load_count_tensor(modes, estado=None, carretera=None, medida=None, bin_size=10, db_path=DB_PATH):
+	"""
+	Tensor disperso de conteos (p. ej. uf × causa_acidente × mes_anio) agregado en SQL.
+
+	Solo se leen las celdas no nulas del cubo (una fila por combinación presente).
+	Las etiquetas del modo 'mes_anio' son el calendario mensual completo, de modo
+	que los meses sin accidentes son cortes vacíos en lugar de desaparecer.
+
+	Args:
+		modes: Modos del tensor, claves de TENSOR_MODES
+		estado, carretera: Filtros opcionales
+		medida: Columna de FACT_MEASURES a sumar (por defecto, número de accidentes)
+		bin_size: Tamaño de tramo del modo 'km_bin'
+
+	Returns:
+		SparseTensor con las etiquetas de cada modo
+	"""
+	from analysis.tensor.tensor_core import SparseTensor
+
+	unknown = [mode for mode in modes if mode not in TENSOR_MODES]
+	if unknown:
+		raise ValueError(f"Modos desconocidos: {', '.join(unknown)} (opciones: {', '.join(TENSOR_MODES)})")
+	if medida is not None and medida not in FACT_MEASURES:
+		raise ValueError(f"Medida desconocida: {medida} (opciones: {', '.join(FACT_MEASURES)})")
+
+	expressions = [TENSOR_MODES[mode].format(bin_size=int(bin_size)) for mode in modes]
+	filters = [f"{expression} IS NOT NULL" for expression in expressions]
+	params = []
+	if estado is not None:
+		filters.append("uf_id = (SELECT id FROM dim_uf WHERE value = ?)")
+		params.append(estado)
+	if carretera is not None:
+		filters.append("br = ?")
+		params.append(carretera)
+	if 'km_bin' in modes:
+		filters.append("km >= 0")
+
+	select_modes = ", ".join(f"{expression} AS m{i}" for i, expression in enumerate(expressions))
+	group_modes = ", ".join(f"m{i}" for i in range(len(modes)))
+	query = f"""
+	SELECT {select_modes}, {f'SUM({medida})' if medida else 'COUNT(*)'} AS value
+	FROM accidents_fact
+	WHERE {' AND '.join(filters)}
+	GROUP BY {group_modes}
+	HAVING value > 0
+	"""
+
+	conn = sqlite3.connect(db_path)
+	df = pd.read_sql_query(query, conn, params=params)
+
+	coords, labels = [], []
+	for i, mode in enumerate(modes):
+		if mode == 'mes_anio':
+			uniques = _calendario_mensual(df[f"m{i}"].unique())
+			codes = pd.Index(uniques).get_indexer(df[f"m{i}"])
+		else:
+			codes, uniques = pd.factorize(df[f"m{i}"], sort=True)
+		coords.append(codes)
+		if mode in FACT_DIMENSIONS:
+			names = dict(conn.execute(f"SELECT id, value FROM dim_{mode}").fetchall())
+			uniques = np.array([names[code] for code in uniques])
+		labels.append(np.asarray(uniques))
+	conn.close()
+
+	return SparseTensor(
+		np.column_stack(coords) if coords else np.empty((0, 0)),
+		df['value'].to_numpy(dtype=float),
+		[len(label) for label in labels],
+		labels=labels,
+		modes=list(modes)
+	)
@@ -0,0 +1 @@
+"""DMD (Dynamic Mode Decomposition)."""
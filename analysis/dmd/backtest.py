@@ -0,0 +1,257 @@
+"""
+Backtesting de las predicciones DMD con origen móvil.
+
+Para cada corredor, tamaño de tramo y centrado se ajusta DMD con los meses
+[0, o) y se predicen los `horizonte` meses siguientes, para cada origen o.
+La SVD de cada ajuste se comparte entre todos los rangos evaluados
+(dmd_from_svd), y las combinaciones corredor × tramo × centrado se reparten
+entre procesos.
+
+Con `ventana` > 0 el modelo de cada origen es un WindowedDMD sobre los
+últimos `ventana` meses, que solo recibe los meses nuevos en actualizaciones
+de rango uno en lugar de reajustarse (ventana = 0: toda la historia).
+
+Reporta, por configuración y horizonte, MAE, RMSE y WAPE (error absoluto sobre
+accidentes observados, comparable entre tamaños de tramo), y el tiempo medio
+de ajuste + predicción de cada configuración.
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Raíz del repositorio en el path para los paquetes analysis y pipeline
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from analysis.data import build_snapshot_matrix, load_spatial_data
+from analysis.dmd.dmd_core import dmd_from_svd, predict_future
+from analysis.dmd.windowed_dmd import WindowedDMD
+from analysis.shared import SharedArrays, attach, shared_task
+from pipeline.instrumentation import print_summary, save_metrics, stage
+
+# ============================================================
+# Configuración
+# ============================================================
+
+DB_PATH = "extracted/analysis_data.db"
+OUTPUT_DIR = "analysis/dmd/results"
+
+# Rejilla de hiper-parámetros
+CORREDORES = [('SC', 101)]
+RANGOS = (5, 10, 15)
+BINS_KM = (5, 10)
+CENTRADO = (True, False)
+VENTANAS = (0, 36)  # Meses del modelo (0: ajuste con toda la historia; > 0: WindowedDMD deslizante)
+
+HORIZONTE = 12  # Meses predichos desde cada origen
+MIN_ENTRENAMIENTO = 36  # Meses mínimos de entrenamiento
+PASO = 1  # Meses entre orígenes
+
+# ============================================================
+# Backtesting
+# ============================================================
+
+def backtest_matrix(X, rangos, horizonte=HORIZONTE, min_entrenamiento=MIN_ENTRENAMIENTO, paso=PASO, centrar=True,
+                    ventana=0):
+	"""
+	Backtesting con origen móvil de DMD sobre una matriz snapshot.
+
+	Args:
+		X: Matriz snapshot (tramos × meses)
+		rangos: Rangos DMD a evaluar (comparten la SVD de cada origen)
+		horizonte: Meses predichos desde cada origen
+		min_entrenamiento: Primer origen
+		paso: Meses entre orígenes
+		centrar: Si True, resta la media temporal del entrenamiento (con ventana, la del primero)
+		ventana: 0 reajusta DMD con toda la historia en cada origen; > 0 actualiza un
+		         WindowedDMD de esos meses con los meses nuevos
+
+	Returns:
+		errores: DataFrame con n_modos, horizonte, mae, rmse, wape, n_origenes
+		tiempos: DataFrame con n_modos, segundos_por_ajuste, n_ajustes
+	"""
+	n_meses = X.shape[1]
+	n_h = horizonte
+	abs_err = {r: np.zeros(n_h) for r in rangos}
+	sq_err = {r: np.zeros(n_h) for r in rangos}
+	abs_real = np.zeros(n_h)
+	n_valores = np.zeros(n_h)
+	n_origenes = np.zeros(n_h, dtype=int)
+	segundos = {r: 0.0 for r in rangos}
+	n_ajustes = 0
+
+	if ventana:
+		# Media fija del primer entrenamiento: el operador de la ventana se actualiza sobre los mismos datos centrados
+		media = X[:, :min_entrenamiento].mean(axis=1, keepdims=True) if centrar else np.zeros((X.shape[0], 1))
+		X_centrado = X - media
+		modelos = {}
+		for r in rangos:
+			inicio = time.perf_counter()
+			modelos[r] = WindowedDMD(X_centrado[:, :min_entrenamiento], r=r, window=max(ventana, r))
+			segundos[r] += time.perf_counter() - inicio
+		visto = min_entrenamiento
+
+	for origen in range(min_entrenamiento, n_meses, paso):
+		pasos = min(horizonte, n_meses - origen)
+		predicciones = {}
+
+		if ventana:
+			# Cada origen solo añade a la ventana los meses nuevos (actualizaciones de rango uno)
+			for r in rangos:
+				inicio = time.perf_counter()
+				for x in X_centrado[:, visto:origen].T:
+					modelos[r].update(x)
+				predicciones[r] = modelos[r].forecast(pasos) + media
+				segundos[r] += time.perf_counter() - inicio
+			visto = origen
+		else:
+			entrenamiento = X[:, :origen]
+			media = entrenamiento.mean(axis=1, keepdims=True) if centrar else np.zeros((X.shape[0], 1))
+			X_train = entrenamiento - media
+
+			inicio = time.perf_counter()
+			U, S, Vh = np.linalg.svd(X_train[:, :-1], full_matrices=False)
+			segundos_svd = time.perf_counter() - inicio
+
+			# Rango numérico: modos con valor singular no nulo
+			rango_max = int(np.sum(S > S[0] * 1e-10)) if S.size and S[0] > 0 else 0
+			if rango_max == 0:
+				continue
+
+			for r in rangos:
+				inicio = time.perf_counter()
+				Phi, eigenvalues, b = dmd_from_svd(X_train, U, S, Vh, min(r, rango_max))
+				predicciones[r] = predict_future(Phi, eigenvalues, b, origen + pasos)[:, origen:] + media
+				segundos[r] += segundos_svd + time.perf_counter() - inicio
+
+		real = X[:, origen:origen + pasos]
+		abs_real[:pasos] += np.abs(real).sum(axis=0)
+		n_valores[:pasos] += real.shape[0]
+		n_origenes[:pasos] += 1
+		n_ajustes += 1
+
+		for r in rangos:
+			error = predicciones[r] - real
+			abs_err[r][:pasos] += np.abs(error).sum(axis=0)
+			sq_err[r][:pasos] += (error**2).sum(axis=0)
+
+	validos = n_valores > 0
+	filas = []
+	for r in rangos:
+		for h in np.nonzero(validos)[0]:
+			filas.append({
+				'n_modos': r,
+				'horizonte': int(h) + 1,
+				'mae': abs_err[r][h] / n_valores[h],
+				'rmse': np.sqrt(sq_err[r][h] / n_valores[h]),
+				'wape': abs_err[r][h] / abs_real[h] if abs_real[h] > 0 else np.nan,
+				'n_origenes': int(n_origenes[h])
+			})
+
+	tiempos = pd.DataFrame([
+		{'n_modos': r, 'segundos_por_ajuste': segundos[r] / n_ajustes if n_ajustes else np.nan, 'n_ajustes': n_ajustes}
+		for r in rangos
+	])
+
+	return pd.DataFrame(filas), tiempos
+
+
+@shared_task
+def _backtest_task(handle, estado, carretera, bin_size, centrar, ventana, rangos, horizonte, min_entrenamiento, paso):
+	"""Backtesting de un corredor, tamaño de tramo, centrado y ventana (se ejecuta en un worker)."""
+	X = attach(handle)['X']
+
+	errores, tiempos = backtest_matrix(X, rangos, horizonte, min_entrenamiento, paso, centrar, ventana)
+
+	config = {'estado': estado, 'carretera': carretera, 'bin_size': bin_size, 'centrar': centrar, 'ventana': ventana}
+	return errores.assign(**config), tiempos.assign(**config)
+
+
+def run_backtest(corredores=CORREDORES, rangos=RANGOS, bins=BINS_KM, centrado=CENTRADO, horizonte=HORIZONTE,
+                 min_entrenamiento=MIN_ENTRENAMIENTO, paso=PASO, jobs=None, db_path=DB_PATH, ventanas=VENTANAS):
+	"""
+	Backtesting de toda la rejilla, repartido entre procesos.
+
+	Args:
+		corredores: Lista de (estado, carretera)
+		rangos, bins, centrado, ventanas: Valores de n_modos, bin_size, centrado y ventana a evaluar
+		jobs: Número de procesos (por defecto, uno por CPU)
+
+	Returns:
+		errores: Error por configuración y horizonte
+		tiempos: Tiempo medio por ajuste de cada configuración
+	"""
+	# Cada matriz se construye una vez y los workers la leen de memoria compartida
+	matrices = {}
+	for estado, carretera in corredores:
+		for bin_size in bins:
+			df = load_spatial_data(estado, carretera, bin_size=bin_size, db_path=db_path)
+			matrices[(estado, carretera, bin_size)] = build_snapshot_matrix(df)[0]
+
+	publicadas = [SharedArrays({'X': X}) for X in matrices.values()]
+	try:
+		tareas = [
+			(shared.handle, estado, carretera, bin_size, centrar, ventana, tuple(rangos), horizonte, min_entrenamiento, paso)
+			for (estado, carretera, bin_size), shared in zip(matrices, publicadas)
+			for centrar in centrado
+			for ventana in ventanas
+		]
+
+		with ProcessPoolExecutor(max_workers=jobs) as executor:
+			resultados = list(executor.map(_backtest_task, *zip(*tareas)))
+	finally:
+		for shared in publicadas:
+			shared.close()
+
+	errores = pd.concat([e for e, _ in resultados], ignore_index=True)
+	tiempos = pd.concat([t for _, t in resultados], ignore_index=True)
+
+	return errores, tiempos
+
+
+def print_ranking(errores, tiempos):
+	"""Imprime, por corredor, las configuraciones ordenadas por WAPE medio sobre los horizontes."""
+	claves = ['estado', 'carretera', 'bin_size', 'centrar', 'ventana', 'n_modos']
+	resumen = (errores.groupby(claves)[['mae', 'wape']].mean().reset_index()
+	           .merge(tiempos, on=claves).sort_values('wape'))
+
+	for (estado, carretera), grupo in resumen.groupby(['estado', 'carretera']):
+		print(f"\nBR-{carretera} en {estado} (ordenado por WAPE medio):")
+		print(grupo.drop(columns=['estado', 'carretera', 'n_ajustes']).to_string(index=False, float_format='%.4f'))
+
+
+# ============================================================
+# Main
+# ============================================================
+
+def main(corredores=CORREDORES, rangos=RANGOS, bins=BINS_KM, centrado=CENTRADO, horizonte=HORIZONTE, jobs=None,
+         ventanas=VENTANAS):
+	"""Ejecuta el backtesting de la rejilla y guarda los resultados en CSV."""
+	print("="*60)
+	print("BACKTESTING DMD (origen móvil)")
+	print("="*60)
+
+	n_configs = len(corredores) * len(bins) * len(centrado) * len(ventanas) * len(rangos)
+	print(f"\n{n_configs} configuraciones, horizonte {horizonte} meses")
+
+	with stage("dmd_backtest") as metrics:
+		errores, tiempos = run_backtest(corredores, rangos, bins, centrado, horizonte, jobs=jobs, ventanas=ventanas)
+		metrics.rows_out = len(errores)
+
+	os.makedirs(OUTPUT_DIR, exist_ok=True)
+	errores.to_csv(os.path.join(OUTPUT_DIR, "backtest_errores.csv"), index=False)
+	tiempos.to_csv(os.path.join(OUTPUT_DIR, "backtest_tiempos.csv"), index=False)
+
+	print_ranking(errores, tiempos)
+	print(f"\n   ✓ Resultados guardados en {OUTPUT_DIR}/backtest_errores.csv y backtest_tiempos.csv")
+
+	print_summary()
+	save_metrics(DB_PATH)
+
+
+if __name__ == "__main__":
+	main()
@@ -10,11 +10,20 @@ Permite:
 - Predecir estados futuros
 """
 
-import sqlite3
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
 import os
+import sys
+
+# Raíz del repositorio en el path para los paquetes analysis y pipeline
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from analysis.bootstrap import bands, bootstrap_dmd
+from analysis.data import build_snapshot_matrix, load_spatial_data
+from analysis.dmd.dmd_core import analyze_stability, dmd_exact, predict_future
+from analysis.dmd.hodmd import hodmd
+from analysis.linalg import center_rows
+from analysis.spectral.spectral_core import dmd_hints
+from pipeline.instrumentation import print_summary, save_metrics, stage
 
 # ============================================================
 # Configuración
@@ -27,147 +36,27 @@ OUTPUT_DIR = "analysis/dmd/results"
 ESTADO = 'SC'
 CARRETERA = 101
 BIN_SIZE_KM = 10
-N_MODOS = 15  # Número de modos DMD a usar
+N_MODOS = 15  # Número de modos DMD a usar ('auto': según los períodos del espectro)
 MESES_PREDICCION = 24  # Meses a predecir (2 años)
+RETARDOS = 1  # Retardos temporales (> 1 usa HODMD, p. ej. 12; 'auto': el período dominante)
+DTYPE = 'float64'  # Tipo de cálculo ('float32' reduce la memoria a la mitad)
+N_BOOTSTRAP = 200  # Réplicas bootstrap de los autovalores (0 = sin bandas)
+TIEMPO_BOOTSTRAP = 60  # Segundos máximos del bootstrap
 
 # ============================================================
-# Funciones de Carga de Datos (reutilizadas de POD)
-# ============================================================
-
-def load_spatial_data(estado, carretera):
-	"""Carga datos espaciales desde la base de datos."""
-	conn = sqlite3.connect(DB_PATH)
-
-	query = f"""
-	SELECT
-		date,
-		uf,
-		br,
-		km,
-		strftime('%Y-%m', date) as mes_anio
-	FROM accidents_spatial
-	WHERE uf = '{estado}'
-	  AND br = {carretera}
-	  AND km IS NOT NULL
-	ORDER BY date
-	"""
-
-	df = pd.read_sql_query(query, conn)
-	conn.close()
-	return df
-
-
-def build_snapshot_matrix(df, bin_size=10):
-	"""Construye la matriz snapshot espacial-temporal."""
-	max_km = df['km'].max()
-	bins_espacio = np.arange(0, max_km + bin_size, bin_size)
-	df['tramo_km'] = pd.cut(df['km'], bins=bins_espacio, labels=bins_espacio[:-1])
-
-	matriz_X = pd.crosstab(df['tramo_km'], df['mes_anio'])
-	X = matriz_X.values
-	tramos = matriz_X.index.astype(float).values
-	meses = matriz_X.columns.values
-
-	return X, tramos, meses
-
-
-# ============================================================
-# Algoritmo DMD
+# Visualización
 # ============================================================
 
-def dmd_exact(X, r=10):
-	"""
-	Implementación del algoritmo Exact DMD.
-
-	Args:
-		X: Matriz de datos (espacio × tiempo)
-		r: Rango de reducción (número de modos)
-
-	Returns:
-		Phi: Modos DMD (espacio × r)
-		eigenvalues: Autovalores (crecimiento/oscilación)
-		b: Amplitudes iniciales
+def plot_dmd_results(X, X_dmd, eigenvalues, tiempo_actual, meses_futuros, estado=ESTADO, carretera=CARRETERA,
+                     bootstrap=None):
 	"""
-	# Matrices desplazadas en el tiempo
-	X1 = X[:, :-1]  # Estados actuales
-	X2 = X[:, 1:]   # Estados futuros (un paso adelante)
-
-	# SVD reducida de X1
-	U, S, Vh = np.linalg.svd(X1, full_matrices=False)
-	Ur = U[:, :r]
-	Sr = np.diag(S[:r])
-	Vr = Vh[:r, :].T
-
-	# Matriz Atilde (dinámica proyectada en espacio reducido)
-	Atilde = Ur.T @ X2 @ Vr @ np.linalg.inv(Sr)
+	Genera visualizaciones del análisis DMD.
 
-	# Eigendecomposición de Atilde
-	eigenvalues, W = np.linalg.eig(Atilde)
-
-	# Reconstrucción de modos DMD en espacio completo
-	Phi = X2 @ Vr @ np.linalg.inv(Sr) @ W
-
-	# Calcular amplitudes iniciales (proyección del estado inicial)
-	x0 = X[:, 0]
-	b = np.linalg.pinv(Phi) @ x0
-
-	return Phi, eigenvalues, b
-
-
-def predict_future(Phi, eigenvalues, b, n_timesteps):
+	Con `bootstrap` (salida de bootstrap_dmd) se dibuja la nube de autovalores
+	de las réplicas alrededor de cada autovalor.
 	"""
-	Predice estados futuros usando DMD.
-
-	Args:
-		Phi: Modos DMD
-		eigenvalues: Autovalores
-		b: Amplitudes iniciales
-		n_timesteps: Número total de pasos (presente + futuro)
+	import matplotlib.pyplot as plt
 
-	Returns:
-		X_dmd: Matriz predicha (espacio × tiempo)
-	"""
-	r = len(eigenvalues)
-	time_dynamics = np.zeros((r, n_timesteps), dtype='complex')
-
-	# Evolución temporal: coef_t = (lambda^t) * b
-	for t in range(n_timesteps):
-		time_dynamics[:, t] = (eigenvalues ** t) * b
-
-	# Reconstrucción: X ≈ Phi @ time_dynamics
-	X_dmd = (Phi @ time_dynamics).real
-
-	return X_dmd
-
-
-def analyze_stability(eigenvalues):
-	"""
-	Analiza la estabilidad del sistema basándose en los eigenvalues.
-
-	Returns:
-		Dict con información de estabilidad
-	"""
-	magnitudes = np.abs(eigenvalues)
-	angles = np.angle(eigenvalues)
-	frequencies = angles / (2 * np.pi)
-
-	stability_info = {
-		'stable': np.sum(magnitudes < 1),
-		'neutral': np.sum(np.abs(magnitudes - 1) < 0.05),
-		'unstable': np.sum(magnitudes > 1),
-		'max_magnitude': magnitudes.max(),
-		'min_magnitude': magnitudes.min()
-	}
-
-	return stability_info
-
-
-# ============================================================
-# Visualización
-# ============================================================
-
-def plot_dmd_results(X, X_dmd, eigenvalues, tiempo_actual, meses_futuros):
-	"""Genera visualizaciones del análisis DMD."""
 	os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 	fig, axs = plt.subplots(1, 2, figsize=(16, 6))
@@ -188,6 +77,10 @@ def plot_dmd_results(X, X_dmd, eigenvalues, tiempo_actual, meses_futuros):
 	# B. Análisis de estabilidad (Plano complejo)
 	theta = np.linspace(0, 2*np.pi, 100)
 	axs[1].plot(np.cos(theta), np.sin(theta), 'k--', linewidth=1.5, label='Círculo unitario')
+	if bootstrap is not None:
+		muestras = bootstrap['samples'][~np.isnan(bootstrap['samples'])]
+		axs[1].scatter(muestras.real, muestras.imag, c='gray', s=4, alpha=0.2,
+		               label=f'Réplicas bootstrap ({len(bootstrap["samples"])})')
 	axs[1].scatter(eigenvalues.real, eigenvalues.imag, c='red', s=100, marker='x', linewidths=2,
 	               label='Eigenvalues DMD')
 	axs[1].set_title('Estabilidad del Sistema\n(Eigenvalues en Plano Complejo)',
@@ -212,8 +105,8 @@ def plot_dmd_results(X, X_dmd, eigenvalues, tiempo_actual, meses_futuros):
 	            fontsize=9)
 
 	plt.tight_layout()
-	plt.savefig(f"{OUTPUT_DIR}/dmd_prediction_br{CARRETERA}_{ESTADO}.png", dpi=300, bbox_inches='tight')
-	print(f"   ✓ Gráfico guardado: {OUTPUT_DIR}/dmd_prediction_br{CARRETERA}_{ESTADO}.png")
+	plt.savefig(f"{OUTPUT_DIR}/dmd_prediction_br{carretera}_{estado}.png", dpi=300, bbox_inches='tight')
+	print(f"   ✓ Gráfico guardado: {OUTPUT_DIR}/dmd_prediction_br{carretera}_{estado}.png")
 
 	# Gráfico adicional: Comparación Original vs DMD
 	fig2, axs2 = plt.subplots(1, 2, figsize=(16, 6))
@@ -231,14 +124,14 @@ def plot_dmd_results(X, X_dmd, eigenvalues, tiempo_actual, meses_futuros):
 	plt.colorbar(im2, ax=axs2[1], label='Accidentes')
 
 	plt.tight_layout()
-	plt.savefig(f"{OUTPUT_DIR}/dmd_comparison_br{CARRETERA}_{ESTADO}.png", dpi=300, bbox_inches='tight')
-	print(f"   ✓ Gráfico guardado: {OUTPUT_DIR}/dmd_comparison_br{CARRETERA}_{ESTADO}.png")
+	plt.savefig(f"{OUTPUT_DIR}/dmd_comparison_br{carretera}_{estado}.png", dpi=300, bbox_inches='tight')
+	print(f"   ✓ Gráfico guardado: {OUTPUT_DIR}/dmd_comparison_br{carretera}_{estado}.png")
 
 	plt.show()
 
 
-def print_statistics(X, eigenvalues, stability_info):
-	"""Imprime estadísticas del análisis DMD."""
+def print_statistics(X, eigenvalues, stability_info, bootstrap=None):
+	"""Imprime estadísticas del análisis DMD (con intervalos de |λ| si hay bootstrap)."""
 	print("\n" + "="*60)
 	print("ESTADÍSTICAS DMD")
 	print("="*60)
@@ -260,6 +153,16 @@ def print_statistics(X, eigenvalues, stability_info):
 		period = 1/freq if freq != 0 else np.inf
 		print(f"  Modo {i+1}: |λ|={mag:.3f}, frecuencia={freq:.4f}, período≈{period:.1f} meses")
 
+	if bootstrap is not None:
+		referencia = bootstrap['eigenvalues']
+		lower, upper = bands(np.abs(bootstrap['samples']))
+		orden = np.argsort(np.abs(referencia))[::-1]
+		print(f"\nIntervalos bootstrap de |λ| ({len(bootstrap['samples'])} réplicas, top 5):")
+		for i in orden[:5]:
+			print(f"  |λ|={np.abs(referencia[i]):.3f} [{lower[i]:.3f}, {upper[i]:.3f}]")
+		inciertos = int(np.sum((lower < 1) & (upper > 1)))
+		print(f"  Modos cuya estabilidad no se decide (el intervalo contiene |λ|=1): {inciertos}")
+
 	print("="*60)
 
 
@@ -267,24 +170,45 @@ def print_statistics(X, eigenvalues, stability_info):
 # Main
 # ============================================================
 
-if __name__ == "__main__":
+def main(estado=ESTADO, carretera=CARRETERA, bin_size=BIN_SIZE_KM, n_modos=N_MODOS, meses_prediccion=MESES_PREDICCION,
+         retardos=RETARDOS, dtype=DTYPE, n_bootstrap=N_BOOTSTRAP, jobs=None):
+	"""Ejecuta el análisis DMD y la predicción de una carretera (`jobs`: procesos del bootstrap)."""
 	print("="*60)
-	print(f"DMD ANALYSIS: BR-{CARRETERA} en {ESTADO}")
+	print(f"DMD ANALYSIS: BR-{carretera} en {estado}")
 	print("="*60)
 
 	# 1. Cargar datos y construir matriz
 	print(f"\n1. Cargando datos...")
-	df = load_spatial_data(ESTADO, CARRETERA)
-	X, tramos, meses = build_snapshot_matrix(df, bin_size=BIN_SIZE_KM)
+	with stage("dmd.load") as metrics:
+		df = load_spatial_data(estado, carretera, bin_size=bin_size, db_path=DB_PATH)
+		X, tramos, meses = build_snapshot_matrix(df, dtype=dtype)
+		metrics.rows_in = len(df)
+		metrics.rows_out = X.shape[0]
 	print(f"   ✓ Matriz generada: {X.shape[0]} tramos × {X.shape[1]} meses")
 
 	# Centrar datos (restar media temporal)
-	X_mean = X.mean(axis=1, keepdims=True)
-	X_centered = X - X_mean
+	X_centered, X_mean = center_rows(X)
+
+	# Rango y retardos a partir de la estacionalidad de la serie total del corredor
+	if 'auto' in (n_modos, retardos):
+		hints = dmd_hints(X.sum(axis=0))
+		periodos = ", ".join(f"{p:.1f}" for p in hints['periods']) or "ninguno"
+		print(f"   ✓ Períodos significativos (meses): {periodos}")
+		if n_modos == 'auto':
+			# Sin estacionalidad clara, el rango por defecto
+			n_modos = min(hints['rank'] if hints['period'] else N_MODOS, min(X.shape))
+		if retardos == 'auto':
+			retardos = min(hints['delays'], X.shape[1] // 2)
 
 	# 2. Aplicar DMD
-	print(f"\n2. Aplicando DMD (r={N_MODOS} modos)...")
-	Phi, eigenvalues, b = dmd_exact(X_centered, r=N_MODOS)
+	if retardos > 1:
+		print(f"\n2. Aplicando HODMD (r={n_modos} modos, d={retardos} retardos)...")
+		with stage("dmd.hodmd", rows_in=X.shape[0]):
+			Phi, eigenvalues, b = hodmd(X_centered, d=retardos, r=n_modos)
+	else:
+		print(f"\n2. Aplicando DMD (r={n_modos} modos)...")
+		with stage("dmd.dmd_exact", rows_in=X.shape[0]):
+			Phi, eigenvalues, b = dmd_exact(X_centered, r=n_modos)
 	print(f"   ✓ DMD completado: {len(eigenvalues)} modos extraídos")
 
 	# 3. Analizar estabilidad
@@ -292,18 +216,36 @@ if __name__ == "__main__":
 	stability_info = analyze_stability(eigenvalues)
 
 	# 4. Predicción futura
-	print(f"\n4. Generando predicción ({MESES_PREDICCION} meses futuros)...")
+	print(f"\n4. Generando predicción ({meses_prediccion} meses futuros)...")
 	tiempo_actual = X.shape[1]
-	tiempo_total = tiempo_actual + MESES_PREDICCION
-	X_dmd = predict_future(Phi, eigenvalues, b, tiempo_total) + X_mean
+	tiempo_total = tiempo_actual + meses_prediccion
+	with stage("dmd.predict_future") as metrics:
+		X_dmd = predict_future(Phi, eigenvalues, b, tiempo_total) + X_mean
+		metrics.rows_out = X_dmd.shape[0]
 	print(f"   ✓ Predicción generada: {X_dmd.shape[0]} × {X_dmd.shape[1]}")
 
+	# Bandas de confianza: pares de meses por bloques (DMD) o conteos de Poisson (HODMD)
+	bootstrap = None
+	if n_bootstrap:
+		with stage("dmd.bootstrap", rows_in=n_bootstrap) as metrics:
+			bootstrap = bootstrap_dmd(X, n_modos, retardos, method='block' if retardos == 1 else 'poisson',
+			                          n_replicas=n_bootstrap, max_seconds=TIEMPO_BOOTSTRAP, max_workers=jobs)
+			metrics.rows_out = len(bootstrap['samples'])
+
 	# 5. Estadísticas
-	print_statistics(X, eigenvalues, stability_info)
+	print_statistics(X, eigenvalues, stability_info, bootstrap)
 
 	# 6. Visualizar
 	print("\n5. Generando visualizaciones...")
-	plot_dmd_results(X, X_dmd, eigenvalues, tiempo_actual, MESES_PREDICCION)
+	with stage("dmd.plot"):
+		plot_dmd_results(X, X_dmd, eigenvalues, tiempo_actual, meses_prediccion, estado, carretera, bootstrap)
 
 	print("\n✅ Análisis DMD completado!")
 	print("="*60)
+
+	print_summary()
+	save_metrics(DB_PATH)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,114 @@
+"""
+DMD (Dynamic Mode Decomposition): algoritmo exacto, predicción y estabilidad.
+
+DMD modela el sistema como: x_{k+1} = A x_k
+Solo depende de numpy y scipy: se puede importar desde workers y servicios.
+"""
+
+import numpy as np
+
+from analysis.linalg import as_float, svd
+
+
+def dmd_exact(X, r=10, dtype=None):
+	"""
+	Implementación del algoritmo Exact DMD.
+
+	Args:
+		X: Matriz de datos (espacio × tiempo)
+		r: Rango de reducción (número de modos)
+		dtype: Tipo de cálculo ('float64', 'float32' o None para conservar el de X)
+
+	Returns:
+		Phi: Modos DMD (espacio × r)
+		eigenvalues: Autovalores (crecimiento/oscilación)
+		b: Amplitudes iniciales
+	"""
+	X = as_float(X, dtype)
+
+	# SVD reducida de X1 (estados actuales)
+	U, S, Vh = svd(X[:, :-1])
+
+	return dmd_from_svd(X, U, S, Vh, r)
+
+
+def dmd_from_svd(X, U, S, Vh, r):
+	"""
+	Exact DMD a partir de la SVD ya calculada de X[:, :-1].
+
+	Permite evaluar varios rangos r con una sola SVD.
+
+	Args:
+		X: Matriz de datos (espacio × tiempo)
+		U, S, Vh: SVD reducida de X[:, :-1]
+		r: Rango de reducción (número de modos)
+
+	Returns:
+		Phi, eigenvalues, b (como dmd_exact)
+	"""
+	X2 = X[:, 1:]   # Estados futuros (un paso adelante)
+
+	Ur = U[:, :r]
+	Sr = np.diag(S[:r])
+	Vr = Vh[:r, :].T
+
+	# Matriz Atilde (dinámica proyectada en espacio reducido)
+	Atilde = Ur.T @ X2 @ Vr @ np.linalg.inv(Sr)
+
+	# Eigendecomposición de Atilde
+	eigenvalues, W = np.linalg.eig(Atilde)
+
+	# Reconstrucción de modos DMD en espacio completo
+	Phi = X2 @ Vr @ np.linalg.inv(Sr) @ W
+
+	# Calcular amplitudes iniciales (proyección del estado inicial)
+	x0 = X[:, 0]
+	b = np.linalg.pinv(Phi) @ x0
+
+	return Phi, eigenvalues, b
+
+
+def predict_future(Phi, eigenvalues, b, n_timesteps):
+	"""
+	Predice estados futuros usando DMD.
+
+	Args:
+		Phi: Modos DMD
+		eigenvalues: Autovalores
+		b: Amplitudes iniciales
+		n_timesteps: Número total de pasos (presente + futuro)
+
+	Returns:
+		X_dmd: Matriz predicha (espacio × tiempo)
+	"""
+	r = len(eigenvalues)
+	time_dynamics = np.zeros((r, n_timesteps), dtype='complex')
+
+	# Evolución temporal: coef_t = (lambda^t) * b
+	for t in range(n_timesteps):
+		time_dynamics[:, t] = (eigenvalues ** t) * b
+
+	# Reconstrucción: X ≈ Phi @ time_dynamics
+	X_dmd = (Phi @ time_dynamics).real
+
+	return X_dmd
+
+
+def analyze_stability(eigenvalues):
+	"""
+	Analiza la estabilidad del sistema basándose en los eigenvalues.
+
+	Returns:
+		Dict con información de estabilidad
+	"""
+	magnitudes = np.abs(eigenvalues)
+
+	stability_info = {
+		'stable': np.sum(magnitudes < 1),
+		'neutral': np.sum(np.abs(magnitudes - 1) < 0.05),
+		'unstable': np.sum(magnitudes > 1),
+		'max_magnitude': magnitudes.max(),
+		'min_magnitude': magnitudes.min()
+	}
+
+	return stability_info
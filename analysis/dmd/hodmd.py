@@ -0,0 +1,106 @@
+"""
+HODMD (Higher-Order DMD): DMD sobre snapshots con retardos temporales.
+
+Cada snapshot aumentado apila d snapshots consecutivos [x_k; x_{k+1}; ...; x_{k+d-1}],
+lo que permite captar dinámicas periódicas aunque haya pocas filas espaciales.
+
+Reducción en dos niveles (Le Clainche & Vega, 2017):
+1. SVD de X truncada a r modos: snapshots reducidos T = U_r^T X (r × K)
+2. Embedding de T con d retardos (r·d × K-d+1) y SVD truncada a r2 modos
+3. DMD sobre los coeficientes del segundo nivel
+
+El embedding es una vista con strides de T (no se copia). La SVD del segundo
+nivel se obtiene de la matriz de Gram (r·d × r·d) acumulada por bloques de
+columnas, así que nunca se materializa la matriz con retardos completa.
+
+Solo depende de numpy.
+"""
+
+import numpy as np
+
+from analysis.linalg import as_float
+
+CHUNK_SIZE = 4096
+
+
+def delay_embedding(T, d):
+	"""
+	Vista con strides de los snapshots con d retardos.
+
+	Args:
+		T: Snapshots (n × K)
+		d: Número de retardos
+
+	Returns:
+		Vista (n, K-d+1, d): view[:, k, i] = T[:, k+i]
+	"""
+	return np.lib.stride_tricks.sliding_window_view(T, d, axis=1)
+
+
+def _embedded_columns(view, start, stop):
+	"""Columnas [start, stop) de la matriz con retardos (n·d × c), como copia contigua."""
+	block = view[:, start:stop, :]
+	return block.transpose(2, 0, 1).reshape(-1, block.shape[1])
+
+
+def hodmd(X, d, r=10, r2=None, chunk_size=CHUNK_SIZE):
+	"""
+	Implementación de HODMD con embedding por vistas.
+
+	Args:
+		X: Matriz de datos (espacio × tiempo); una serie 1D se trata como una fila.
+			Una X float32 se mantiene en float32 en la SVD espacial
+		d: Número de retardos (d=1 equivale a DMD sobre la base POD)
+		r: Modos del primer nivel (SVD espacial)
+		r2: Modos del segundo nivel (por defecto, r)
+		chunk_size: Columnas del embedding procesadas por bloque
+
+	Returns:
+		Phi: Modos DMD (espacio × r2)
+		eigenvalues: Autovalores
+		b: Amplitudes iniciales
+		(compatibles con predict_future y analyze_stability)
+	"""
+	X = np.atleast_2d(as_float(X))
+	if r2 is None:
+		r2 = r
+
+	# 1. Primer nivel: reducción espacial
+	U1, S1, Vh1 = np.linalg.svd(X, full_matrices=False)
+	U1 = U1[:, :r]
+	T = np.ascontiguousarray(S1[:r, None] * Vh1[:r, :])
+
+	# 2. Segundo nivel: SVD del embedding vía Gram por bloques
+	view = delay_embedding(T, d)
+	n_cols = view.shape[1]
+	if n_cols < 2:
+		raise ValueError(f"Se necesitan más de d={d} snapshots")
+
+	G = np.zeros((T.shape[0] * d, T.shape[0] * d))
+	for start in range(0, n_cols, chunk_size):
+		H = _embedded_columns(view, start, min(start + chunk_size, n_cols))
+		G += H @ H.T
+
+	eigvals, U2 = np.linalg.eigh(G)
+	order = np.argsort(eigvals)[::-1][:r2]
+	U2 = U2[:, order[eigvals[order] > 0]]
+
+	# Coeficientes del segundo nivel: Y = U2^T H (r2 × K-d+1)
+	Y = np.empty((U2.shape[1], n_cols))
+	for start in range(0, n_cols, chunk_size):
+		stop = min(start + chunk_size, n_cols)
+		Y[:, start:stop] = U2.T @ _embedded_columns(view, start, stop)
+
+	# 3. DMD sobre los coeficientes reducidos
+	Y1, Y2 = Y[:, :-1], Y[:, 1:]
+	Atilde = Y2 @ np.linalg.pinv(Y1)
+	eigenvalues, W = np.linalg.eig(Atilde)
+
+	# Modos: primer bloque del embedding, de vuelta al espacio físico
+	Phi = U1 @ (U2 @ W)[:T.shape[0], :]
+
+	# Amplitudes iniciales: proyección del primer snapshot aumentado (con una
+	# sola fila espacial, x_0 no basta para separar los modos)
+	b = np.linalg.lstsq(W, Y[:, 0], rcond=None)[0]
+
+	return Phi, eigenvalues, b
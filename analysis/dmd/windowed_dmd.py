@@ -0,0 +1,156 @@
+"""
+DMD en ventana deslizante con actualizaciones de rango uno.
+
+Los snapshots se proyectan sobre una base POD fija de r modos (z = U_r^T x) y el
+operador reducido se mantiene como Ã = Q P, con Q = Σ z_{k+1} z_k^T y
+P = (Σ z_k z_k^T)^{-1} sobre los pares de la ventana. Añadir o quitar un par es
+una actualización de Sherman–Morrison en O(r²); proyectar el snapshot cuesta
+O(n·r). La eigendescomposición (O(r³)) solo se hace al pedir modos o predicción.
+
+La base se calcula con la ventana inicial. Si el régimen cambia, los snapshots
+nuevos quedan cada vez más fuera de ella y el operador reducido deja de
+representarlos. Por eso se sigue la fracción de energía de la ventana que cae
+fuera de la base (‖x‖² − ‖z‖² por snapshot). Cuando supera en `tol_base` la que
+había al calcular la base, esta se recalcula con la SVD de la ventana (O(n·w²)),
+que se conserva completa.
+
+Solo depende de numpy.
+"""
+
+from collections import deque
+
+import numpy as np
+
+from analysis.dmd.dmd_core import predict_future
+
+
+class WindowedDMD:
+	"""
+	DMD sobre los últimos `window` pares de snapshots, actualizable snapshot a snapshot.
+
+	Uso:
+		wdmd = WindowedDMD(X[:, :36], r=10)
+		for x in nuevos_snapshots:
+			wdmd.update(x)
+		X_pred = wdmd.forecast(24)
+	"""
+
+	def __init__(self, X, r=10, window=None, tol_base=0.05):
+		"""
+		Ajusta la base POD y el operador con los snapshots iniciales.
+
+		Args:
+			X: Snapshots iniciales (espacio × tiempo)
+			r: Rango máximo de la base POD (se limita al rango numérico de la ventana)
+			window: Pares (x_k, x_{k+1}) que se conservan (por defecto, los de X)
+			tol_base: Aumento de la fracción de energía fuera de la base que obliga a
+			          recalcularla (None: base fija)
+		"""
+		X = np.asarray(X, dtype=float)
+		if window is None:
+			window = X.shape[1] - 1
+		if window < r:
+			raise ValueError(f"La ventana ({window} pares) debe ser >= r ({r})")
+
+		self.r_max = r
+		self.window = window
+		self.tol_base = tol_base
+		self.n_rebases = 0
+
+		self._X = deque(X.T[-(window + 1):], maxlen=window + 1)
+		self._rebase()
+
+	def _rebase(self):
+		"""Base POD de los snapshots de la ventana, proyección y operador."""
+		X = np.array(self._X).T
+		U, S, _ = np.linalg.svd(X[:, :-1], full_matrices=False)
+		# Modos con valor singular no nulo: con más, Σ z_k z_k^T es singular
+		rango = int(np.sum(S > S[0] * 1e-10)) if S.size and S[0] > 0 else 0
+		if rango == 0:
+			raise ValueError("La ventana no tiene snapshots distintos de cero")
+
+		self.U_r = np.ascontiguousarray(U[:, :min(self.r_max, rango)])
+		self.r = self.U_r.shape[1]
+
+		Z = self.U_r.T @ X
+		energia = np.einsum('ij,ij->j', X, X)
+		self._snapshots = deque(Z.T, maxlen=self.window + 1)
+		self._residuos = deque(energia - np.einsum('ij,ij->j', Z, Z), maxlen=self.window + 1)
+		self._energias = deque(energia, maxlen=self.window + 1)
+		self.fraccion_base = self.fraccion_fuera()
+		self.refresh()
+
+	def fraccion_fuera(self):
+		"""Fracción de la energía de la ventana que queda fuera de la base POD."""
+		total = sum(self._energias)
+		return sum(self._residuos) / total if total > 0 else 0.0
+
+	def refresh(self):
+		"""Recalcula Ã y P desde la ventana actual (descarta el error acumulado)."""
+		Z = np.array(self._snapshots).T
+		Z1, Z2 = Z[:, :-1], Z[:, 1:]
+		self._P = np.linalg.inv(Z1 @ Z1.T)
+		self.Atilde = Z2 @ Z1.T @ self._P
+
+	def _add_pair(self, z, z_next):
+		Pz = self._P @ z
+		gamma = 1.0 / (1.0 + z @ Pz)
+		self.Atilde += gamma * np.outer(z_next - self.Atilde @ z, Pz)
+		self._P -= gamma * np.outer(Pz, Pz)
+
+	def _remove_pair(self, z, z_next):
+		Pz = self._P @ z
+		gamma = 1.0 / (1.0 - z @ Pz)
+		self.Atilde -= gamma * np.outer(z_next - self.Atilde @ z, Pz)
+		self._P += gamma * np.outer(Pz, Pz)
+
+	def update(self, x):
+		"""
+		Añade un snapshot y, si la ventana está llena, descarta el par más antiguo.
+
+		Si la energía fuera de la base ha crecido más de `tol_base` desde que se
+		calculó, recalcula la base con la ventana actual.
+
+		Args:
+			x: Snapshot nuevo (espacio)
+		"""
+		x = np.asarray(x, dtype=float)
+		z = self.U_r.T @ x
+
+		if len(self._snapshots) == self._snapshots.maxlen:
+			self._remove_pair(self._snapshots[0], self._snapshots[1])
+		self._add_pair(self._snapshots[-1], z)
+		self._snapshots.append(z)
+		self._X.append(x)
+		energia = float(x @ x)
+		self._energias.append(energia)
+		self._residuos.append(energia - float(z @ z))
+
+		if self.tol_base is not None and self.fraccion_fuera() > self.fraccion_base + self.tol_base:
+			self._rebase()
+			self.n_rebases += 1
+
+	def modes(self):
+		"""
+		Modos DMD del operador actual.
+
+		Returns:
+			Phi: Modos DMD (espacio × r)
+			eigenvalues: Autovalores
+			b: Amplitudes del último snapshot de la ventana
+		"""
+		eigenvalues, W = np.linalg.eig(self.Atilde)
+		Phi = self.U_r @ W
+		b = np.linalg.solve(W, self._snapshots[-1])
+
+		return Phi, eigenvalues, b
+
+	def forecast(self, n_steps):
+		"""
+		Predicción a partir del último snapshot.
+
+		Returns:
+			X_pred: Matriz (espacio × n_steps) con los pasos 1..n_steps
+		"""
+		Phi, eigenvalues, b = self.modes()
+		return predict_future(Phi, eigenvalues, b, n_steps + 1)[:, 1:]
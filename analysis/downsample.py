@@ -0,0 +1,93 @@
+"""
+Reducción de series largas a pocos puntos para graficar.
+
+- lttb: Largest-Triangle-Three-Buckets (Steinarsson, 2013). Divide la serie
+  en n_out - 2 cubetas y de cada una conserva el punto que forma el
+  triángulo de mayor área con el punto elegido en la anterior y el promedio
+  de la siguiente; conserva picos y forma con n_out puntos exactos
+- minmax: mínimo y máximo de cada cubeta, en orden temporal; garantiza que
+  ningún extremo desaparece del gráfico
+
+Ambas devuelven índices de la serie original, para poder tomar cualquier
+columna asociada (fecha, conteo, días) de las filas elegidas.
+"""
+
+import numpy as np
+
+
+def _edges(start, stop, n_buckets):
+	"""Límites de n_buckets cubetas contiguas (no vacías si stop - start >= n_buckets) sobre start..stop-1."""
+	return np.linspace(start, stop, n_buckets + 1).astype(int)
+
+
+def lttb(x, y, n_out):
+	"""
+	Índices de los n_out puntos elegidos por LTTB (incluyen el primero y el último).
+
+	Args:
+		x: Abscisas crecientes (p. ej. días)
+		y: Valores
+		n_out: Puntos devueltos
+
+	Returns:
+		Índices crecientes (todos si la serie tiene n_out puntos o menos)
+	"""
+	x = np.asarray(x, dtype=float)
+	y = np.asarray(y, dtype=float)
+	n = len(y)
+	if n_out >= n:
+		return np.arange(n)
+	if n_out < 3:
+		return np.array([0, n - 1][:max(n_out, 0)])
+
+	n_buckets = n_out - 2
+	edges = _edges(1, n - 1, n_buckets)
+	widths = np.diff(edges)
+	mean_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / widths
+	mean_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / widths
+	# Tercer vértice de cada cubeta: el promedio de la siguiente (el último punto para la última)
+	next_x = np.append(mean_x[1:], x[-1])
+	next_y = np.append(mean_y[1:], y[-1])
+
+	selected = np.empty(n_out, dtype=int)
+	selected[0], selected[-1] = 0, n - 1
+	a = 0
+	for i in range(n_buckets):
+		lo, hi = edges[i], edges[i + 1]
+		# Doble del área del triángulo (a, punto, promedio siguiente)
+		area = np.abs((x[a] - next_x[i]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y[i] - y[a]))
+		a = lo + int(np.argmax(area))
+		selected[i + 1] = a
+
+	return selected
+
+
+def minmax(y, n_out):
+	"""
+	Índices del mínimo y el máximo de cada una de n_out // 2 cubetas, en orden.
+
+	Args:
+		y: Valores
+		n_out: Puntos devueltos como máximo
+
+	Returns:
+		Índices crecientes sin repetir (todos si la serie tiene n_out puntos o
+		menos; con n_out = 1, el del máximo)
+	"""
+	y = np.asarray(y, dtype=float)
+	n = len(y)
+	if n_out >= n:
+		return np.arange(n)
+	if n_out < 2:
+		return np.array([int(np.argmax(y))][:max(n_out, 0)])
+	n_buckets = n_out // 2
+	starts = _edges(0, n, n_buckets)[:-1]
+	bucket = np.repeat(np.arange(n_buckets), np.diff(np.append(starts, n)))
+
+	# Primera posición de cada cubeta donde se alcanza su mínimo (y su máximo)
+	lowest = np.flatnonzero(y == np.minimum.reduceat(y, starts)[bucket])
+	highest = np.flatnonzero(y == np.maximum.reduceat(y, starts)[bucket])
+	_, first_low = np.unique(bucket[lowest], return_index=True)
+	_, first_high = np.unique(bucket[highest], return_index=True)
+
+	return np.union1d(lowest[first_low], highest[first_high])
@@ -0,0 +1,192 @@
+"""
+Álgebra lineal compartida por los análisis.
+
+Solo depende de numpy y scipy.
+"""
+
+import numpy as np
+
+
+def randomized_svd(A, k, n_oversamples=10, n_iter=4, rng=None, init=None):
+	"""
+	SVD truncada aleatorizada (Halko, Martinsson & Tropp, 2011).
+
+	Proyecta A sobre un subespacio aleatorio de k + n_oversamples columnas,
+	refinado con iteraciones de potencia, y calcula la SVD exacta de la
+	proyección. Cuesta O(m·n·k) en lugar de O(m·n·min(m, n)).
+
+	Args:
+		A: Matriz (m × n)
+		k: Número de valores singulares
+		n_oversamples: Columnas extra del subespacio aleatorio
+		n_iter: Iteraciones de potencia (mejoran la precisión con espectros planos)
+		rng: Generador o semilla de numpy
+		init: Base inicial del espacio de filas (n × l0), p. ej. Vt.T de una SVD
+			anterior de una matriz parecida; se completa con columnas aleatorias
+			y permite menos iteraciones de potencia
+
+	Returns:
+		U (m × k), S (k), Vt (k × n)
+	"""
+	A = np.asarray(A, dtype=float)
+	rng = np.random.default_rng(rng)
+	k = min(k, *A.shape)
+	l = min(k + n_oversamples, *A.shape)
+
+	Omega = rng.standard_normal((A.shape[1], l))
+	if init is not None:
+		n_init = min(init.shape[1], l)
+		Omega[:, :n_init] = init[:, :n_init]
+	Q, _ = np.linalg.qr(A @ Omega)
+	for _ in range(n_iter):
+		Q, _ = np.linalg.qr(A.T @ Q)
+		Q, _ = np.linalg.qr(A @ Q)
+
+	U_b, S, Vt = np.linalg.svd(Q.T @ A, full_matrices=False)
+
+	return (Q @ U_b)[:, :k], S[:k], Vt[:k, :]
+
+
+# ============================================================
+# Precisión y memoria
+# ============================================================
+
+# Tipos de cálculo admitidos: float32 ocupa la mitad que float64
+FLOAT_DTYPES = ('float64', 'float32')
+
+# Filas (o columnas) por bloque al recorrer matrices grandes, p. ej. np.memmap
+BLOCK_SIZE = 4096
+
+
+def as_float(X, dtype=None):
+	"""
+	X como array de coma flotante, sin copiar si ya tiene el tipo pedido.
+
+	Un np.memmap de tipo `dtype` se devuelve tal cual (sigue en disco).
+
+	Args:
+		X: Matriz (array, np.memmap o similar)
+		dtype: 'float64', 'float32' o None (se conserva un tipo flotante; los
+			enteros pasan a float64)
+	"""
+	if not isinstance(X, np.ndarray):
+		X = np.asarray(X)
+	if dtype is None:
+		dtype = X.dtype if np.issubdtype(X.dtype, np.floating) else np.float64
+	dtype = np.dtype(dtype)
+	if dtype.name not in FLOAT_DTYPES:
+		raise ValueError(f"Tipo no soportado: {dtype} (opciones: {', '.join(FLOAT_DTYPES)})")
+	return X if X.dtype == dtype else X.astype(dtype)
+
+
+def svd(X, overwrite=False):
+	"""
+	SVD reducida en la precisión de X.
+
+	np.linalg.svd calcula siempre en float64; aquí una X float32 usa LAPACK en
+	simple precisión. Una X contigua en C se descompone como X^T (contigua en
+	Fortran), así que con `overwrite` LAPACK trabaja sobre X sin copiarla.
+
+	Args:
+		X: Matriz flotante (m × n)
+		overwrite: Si True, X puede quedar destruida
+
+	Returns:
+		U (m × k), S (k), Vt (k × n), con k = min(m, n)
+	"""
+	# scipy tarda en importarse: solo se carga al descomponer
+	from scipy import linalg
+
+	if X.flags.c_contiguous and not X.flags.f_contiguous:
+		U_t, S, Vt_t = linalg.svd(X.T, full_matrices=False, overwrite_a=overwrite, check_finite=False)
+		return Vt_t.T, S, U_t.T
+	return linalg.svd(X, full_matrices=False, overwrite_a=overwrite, check_finite=False)
+
+
+def center_rows(X, dtype=None, overwrite=False):
+	"""
+	Resta a cada fila su media temporal con una sola copia como máximo.
+
+	Si la conversión de tipo ya copia X (p. ej. conteos enteros a float32), o
+	si `overwrite` es True, se centra en el sitio; solo en otro caso se crea
+	la matriz centrada aparte.
+
+	Returns:
+		X_centered, X_mean (n_filas × 1)
+	"""
+	X_float = as_float(X, dtype)
+	X_mean = X_float.mean(axis=1, keepdims=True, dtype=np.float64).astype(X_float.dtype)
+	if X_float is X and not overwrite:
+		return X_float - X_mean, X_mean
+	X_float -= X_mean
+	return X_float, X_mean
+
+
+def centered_svd(X, k=None, center=True, dtype=None, block_size=BLOCK_SIZE):
+	"""
+	SVD reducida de X - media sin materializar la matriz centrada.
+
+	Se acumula la Gram del lado pequeño (columnas si X es alta, filas si es
+	ancha) recorriendo X por bloques, cada uno centrado en un temporal; de la
+	Gram salen los vectores singulares de ese lado y S, y los del otro lado se
+	reconstruyen bloque a bloque. Con un np.memmap como entrada la memoria es
+	O(min(m, n)² + bloque) más la salida.
+
+	La Gram se acumula en float64 aunque `dtype` sea float32. Al elevar al
+	cuadrado, los valores singulares por debajo de ~1e-7·S[0] pierden
+	precisión y se descartan.
+
+	Args:
+		X: Matriz (m × n), p. ej. np.load(ruta, mmap_mode='r')
+		k: Número de modos (por defecto, todos los no nulos)
+		center: Si True, resta la media de cada fila
+		dtype: Tipo de U, S y Vt ('float64', 'float32' o None como as_float)
+		block_size: Filas (o columnas, si X es ancha) por bloque
+
+	Returns:
+		U (m × k), S (k), Vt (k × n), X_mean (m × 1)
+	"""
+	m, n = X.shape
+	dtype = as_float(X[:1, :1], dtype).dtype
+
+	X_mean = np.zeros((m, 1))
+	if center:
+		for start in range(0, m, block_size):
+			rows = slice(start, start + block_size)
+			X_mean[rows] = np.asarray(X[rows], dtype=np.float64).mean(axis=1, keepdims=True)
+
+	# Bloques centrados a lo largo del lado grande
+	tall = m >= n
+	blocks = [slice(start, start + block_size) for start in range(0, m if tall else n, block_size)]
+
+	def centered_block(index):
+		if tall:
+			return np.asarray(X[index], dtype=np.float64) - X_mean[index]
+		return np.asarray(X[:, index], dtype=np.float64) - X_mean
+
+	G = np.zeros((n, n) if tall else (m, m))
+	for index in blocks:
+		B = centered_block(index)
+		G += B.T @ B if tall else B @ B.T
+
+	eigenvalues, eigenvectors = np.linalg.eigh(G)
+	order = np.argsort(eigenvalues)[::-1]
+	S = np.sqrt(np.maximum(eigenvalues[order], 0.0))
+	eigenvectors = eigenvectors[:, order]
+
+	n_valid = int(np.sum(S > S[0] * 1e-7)) if S.size and S[0] > 0 else 0
+	k = n_valid if k is None else min(k, n_valid)
+	S, W = S[:k], eigenvectors[:, :k]
+
+	if tall:
+		U = np.empty((m, k), dtype=dtype)
+		for index in blocks:
+			U[index] = (centered_block(index) @ W) / S
+		Vt = W.T.astype(dtype)
+	else:
+		U = W.astype(dtype)
+		Vt = np.empty((k, n), dtype=dtype)
+		for index in blocks:
+			Vt[:, index] = (W.T @ centered_block(index)) / S[:, None]
+
+	return U, S.astype(dtype), Vt, X_mean.astype(dtype)
@@ -0,0 +1 @@
+"""POD (Proper Orthogonal Decomposition)."""
@@ -0,0 +1,61 @@
+"""
+POD (Proper Orthogonal Decomposition) vía SVD.
+
+Solo depende de numpy y scipy (este, al descomponer): se puede importar desde workers y servicios.
+"""
+
+import numpy as np
+
+from analysis.linalg import as_float, center_rows, centered_svd, svd
+
+# Matrices más grandes no se copian para centrarlas: la SVD sale de su Gram (centered_svd)
+MAX_COPIA_MB = 512
+
+
+def compute_pod(X, center=True, dtype=None, overwrite=False):
+	"""
+	Calcula POD usando SVD.
+
+	Un np.memmap, o una matriz de más de MAX_COPIA_MB que no se puede
+	sobrescribir, se descompone con centered_svd: se recorre por bloques sin
+	materializar la copia centrada, y solo se devuelven los modos con valor
+	singular por encima de ~1e-7·S[0].
+
+	Args:
+		X: Matriz snapshot (espacio × tiempo), también np.memmap
+		center: Si True, resta la media temporal
+		dtype: Tipo de cálculo ('float64', 'float32' o None para conservar el de X)
+		overwrite: Si True, X (flotante) se centra en el sitio en lugar de copiarse
+
+	Returns:
+		U: Modos espaciales
+		S: Valores singulares
+		Vt: Modos temporales (transpuestos)
+		X_mean: Campo medio
+	"""
+	X = X if isinstance(X, np.ndarray) else np.asarray(X)
+	itemsize = as_float(X[:1, :1], dtype).itemsize
+	if isinstance(X, np.memmap) or (not overwrite and X.shape[0] * X.shape[1] * itemsize > MAX_COPIA_MB * 2**20):
+		return centered_svd(X, center=center, dtype=dtype)
+
+	if center:
+		X_centered, X_mean = center_rows(X, dtype, overwrite)
+	else:
+		X_centered = as_float(X, dtype)
+		X_mean = np.zeros((X.shape[0], 1), dtype=X_centered.dtype)
+
+	# La matriz centrada es una copia propia salvo sin centrado ni conversión
+	U, S, Vt = svd(X_centered, overwrite=X_centered is not X or overwrite)
+
+	return U, S, Vt, X_mean
+
+
+def energy_percentages(S):
+	"""
+	Energía de cada modo y energía acumulada (en %).
+
+	Returns:
+		energy, cum_energy
+	"""
+	energy = S**2 / np.sum(S**2) * 100
+	return energy, np.cumsum(energy)
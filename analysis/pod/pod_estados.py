@@ -14,11 +14,17 @@ Permite identificar:
 - Dinámicas opuestas entre estados
 """
 
-import sqlite3
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
 import os
+import sys
+
+# Raíz del repositorio en el path para los paquetes analysis y pipeline
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from analysis.data import build_estados_matrix, load_estados_data
+from analysis.pod.pod_core import compute_pod, energy_percentages
+from analysis.pod.rank_selection import gavish_donoho_rank
+from pipeline.instrumentation import print_summary, save_metrics, stage
 
 # ============================================================
 # Configuración
@@ -31,69 +37,10 @@ OUTPUT_DIR = "analysis/pod/results"
 # Funciones
 # ============================================================
 
-def load_estados_data():
-	"""
-	Carga datos agregados por estado y mes desde la base de datos.
-
-	Returns:
-		DataFrame con: uf, mes_anio, count
-	"""
-	conn = sqlite3.connect(DB_PATH)
-
-	query = """
-	SELECT
-		uf,
-		strftime('%Y-%m', date) as mes_anio,
-		COUNT(*) as count
-	FROM accidents_spatial
-	WHERE uf IS NOT NULL
-	GROUP BY uf, mes_anio
-	ORDER BY uf, mes_anio
-	"""
-
-	df = pd.read_sql_query(query, conn)
-	conn.close()
-
-	return df
-
-
-def build_estados_matrix(df):
-	"""
-	Construye la matriz snapshot de estados × tiempo.
-
-	Args:
-		df: DataFrame con columnas 'uf', 'mes_anio', 'count'
-
-	Returns:
-		X: Matriz numpy (n_estados, n_meses)
-		estados: Array con los códigos de los estados
-		meses: Array con los períodos mensuales
-	"""
-	# Crear matriz de conteo (pivot table)
-	matriz_X = df.pivot_table(index='uf', columns='mes_anio', values='count', fill_value=0)
-
-	X = matriz_X.values
-	estados = matriz_X.index.values
-	meses = matriz_X.columns.values
-
-	return X, estados, meses
-
-
-def compute_pod(X, center=True):
-	"""Calcula POD usando SVD."""
-	if center:
-		X_mean = X.mean(axis=1, keepdims=True)
-		X_centered = X - X_mean
-	else:
-		X_mean = np.zeros((X.shape[0], 1))
-		X_centered = X
-
-	U, S, Vt = np.linalg.svd(X_centered, full_matrices=False)
-	return U, S, Vt, X_mean
-
-
 def plot_results(X, U, S, Vt, estados, meses):
 	"""Genera visualizaciones del análisis POD macro."""
+	import matplotlib.pyplot as plt
+
 	os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 	fig, axs = plt.subplots(2, 1, figsize=(14, 12))
@@ -144,7 +91,7 @@ def plot_results(X, U, S, Vt, estados, meses):
 
 	# Gráfico adicional: Energía de los modos
 	fig2, ax = plt.subplots(figsize=(10, 6))
-	energy = S**2 / np.sum(S**2) * 100
+	energy, _ = energy_percentages(S)
 	n_modes_plot = min(10, len(S))
 
 	bars = ax.bar(range(1, n_modes_plot + 1), energy[:n_modes_plot], color='steelblue', edgecolor='black')
@@ -168,8 +115,7 @@ def plot_results(X, U, S, Vt, estados, meses):
 
 def print_statistics(X, S, U, estados):
 	"""Imprime estadísticas del análisis."""
-	energy = S**2 / np.sum(S**2) * 100
-	cum_energy = np.cumsum(energy)
+	energy, cum_energy = energy_percentages(S)
 
 	print("\n" + "="*60)
 	print("ESTADÍSTICAS POD MACRO (ESTADOS)")
@@ -185,6 +131,10 @@ def print_statistics(X, S, U, estados):
 	n_modes_90 = np.argmax(cum_energy >= 90) + 1
 	print(f"\nModos necesarios para 90% de energía: {n_modes_90}")
 
+	# Modos por encima del umbral de ruido (Gavish–Donoho)
+	n_modes_gd, _ = gavish_donoho_rank(S, X.shape)
+	print(f"Modos por encima del umbral de ruido (Gavish–Donoho): {n_modes_gd}")
+
 	# Análisis del Modo 2 (contraste regional)
 	print(f"\nAnálisis del Modo 2 (Contraste Regional):")
 	modo2 = U[:, 1]
@@ -210,26 +160,32 @@ def print_statistics(X, S, U, estados):
 # Main
 # ============================================================
 
-if __name__ == "__main__":
+def main():
+	"""Ejecuta el análisis POD macro por estados."""
 	print("="*60)
 	print("POD MACRO: ANÁLISIS DE ESTADOS")
 	print("="*60)
 
 	# 1. Cargar datos
 	print("\n1. Cargando datos agregados por estado...")
-	df = load_estados_data()
+	with stage("pod_estados.load") as metrics:
+		df = load_estados_data(db_path=DB_PATH)
+		metrics.rows_out = len(df)
 	print(f"   ✓ Registros cargados: {len(df):,}")
 
 	# 2. Construir matriz
 	print("\n2. Construyendo matriz Estados × Tiempo...")
-	X, estados, meses = build_estados_matrix(df)
+	with stage("pod_estados.build_matrix", rows_in=len(df)) as metrics:
+		X, estados, meses = build_estados_matrix(df)
+		metrics.rows_out = X.shape[0]
 	print(f"   ✓ Matriz generada: {X.shape[0]} estados × {X.shape[1]} meses")
 	print(f"   ✓ Estados: {', '.join(estados)}")
 	print(f"   ✓ Rango temporal: {meses[0]} a {meses[-1]}")
 
 	# 3. Aplicar POD
 	print("\n3. Aplicando POD (SVD)...")
-	U, S, Vt, X_mean = compute_pod(X, center=True)
+	with stage("pod_estados.compute_pod", rows_in=X.shape[0]):
+		U, S, Vt, X_mean = compute_pod(X, center=True)
 	print(f"   ✓ SVD completado: {len(S)} modos extraídos")
 
 	# 4. Estadísticas
@@ -237,7 +193,15 @@ if __name__ == "__main__":
 
 	# 5. Visualizar
 	print("\n4. Generando visualizaciones...")
-	plot_results(X, U, S, Vt, estados, meses)
+	with stage("pod_estados.plot"):
+		plot_results(X, U, S, Vt, estados, meses)
 
 	print("\n✅ Análisis POD macro completado!")
 	print("="*60)
+
+	print_summary()
+	save_metrics(DB_PATH)
+
+
+if __name__ == "__main__":
+	main()
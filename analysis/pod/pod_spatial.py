@@ -10,11 +10,19 @@ Matriz Snapshot X:
 - Valores: Cantidad de accidentes por tramo/mes
 """
 
-import sqlite3
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
 import os
+import sys
+
+# Raíz del repositorio en el path para los paquetes analysis y pipeline
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from analysis.bootstrap import bands, bootstrap_pod
+from analysis.data import build_snapshot_matrix, load_spatial_data
+from analysis.pod.pod_core import compute_pod, energy_percentages
+from analysis.pod.rank_selection import gavish_donoho_rank
+from analysis.pod.rpca import robust_pod
+from pipeline.instrumentation import print_summary, save_metrics, stage
 
 # ============================================================
 # Configuración
@@ -27,100 +35,29 @@ OUTPUT_DIR = "analysis/pod/results"
 ESTADO = 'SC'
 CARRETERA = 101
 BIN_SIZE_KM = 10  # Discretización espacial cada 10 km
+DTYPE = 'float64'  # Tipo de cálculo ('float32' reduce la memoria a la mitad)
+N_BOOTSTRAP = 200  # Réplicas bootstrap de las bandas de confianza (0 = sin bandas)
+MODOS_BOOTSTRAP = 3
+TIEMPO_BOOTSTRAP = 60  # Segundos máximos del bootstrap
 
 # ============================================================
 # Funciones
 # ============================================================
 
-def load_spatial_data(estado, carretera):
-	"""
-	Carga datos espaciales desde la base de datos para un estado y carretera específicos.
-
-	Returns:
-		DataFrame con: date, uf, br, km, mes_anio
-	"""
-	conn = sqlite3.connect(DB_PATH)
-
-	query = f"""
-	SELECT
-		date,
-		uf,
-		br,
-		km,
-		strftime('%Y-%m', date) as mes_anio
-	FROM accidents_spatial
-	WHERE uf = '{estado}'
-	  AND br = {carretera}
-	  AND km IS NOT NULL
-	ORDER BY date
-	"""
-
-	df = pd.read_sql_query(query, conn)
-	conn.close()
-
-	return df
-
-
-def build_snapshot_matrix(df, bin_size=10):
-	"""
-	Construye la matriz snapshot espacial-temporal.
-
-	Args:
-		df: DataFrame con columnas 'km' y 'mes_anio'
-		bin_size: Tamaño de los bins espaciales en km
-
-	Returns:
-		X: Matriz numpy (n_tramos, n_meses)
-		tramos: Array con los valores de km de cada tramo
-		meses: Array con los períodos mensuales
-	"""
-	# Crear bins espaciales
-	max_km = df['km'].max()
-	bins_espacio = np.arange(0, max_km + bin_size, bin_size)
-	df['tramo_km'] = pd.cut(df['km'], bins=bins_espacio, labels=bins_espacio[:-1])
-
-	# Crear matriz de conteo (crosstab)
-	matriz_X = pd.crosstab(df['tramo_km'], df['mes_anio'])
-
-	# Convertir a numpy
-	X = matriz_X.values
-	tramos = matriz_X.index.astype(float).values
-	meses = matriz_X.columns.values
+def critical_zone_share(U_samples, max_idx):
+	"""Fracción de réplicas bootstrap cuyo máximo absoluto del modo espacial 1 cae en el tramo max_idx."""
+	return float(np.mean(np.argmax(np.abs(U_samples[:, :, 0]), axis=1) == max_idx))
 
-	return X, tramos, meses
 
-
-def compute_pod(X, center=True):
+def plot_results(X, U, S, Vt, tramos, meses, X_mean, estado=ESTADO, carretera=CARRETERA, bootstrap=None):
 	"""
-	Calcula POD usando SVD.
-
-	Args:
-		X: Matriz snapshot (espacio × tiempo)
-		center: Si True, resta la media temporal
+	Genera visualizaciones del análisis POD.
 
-	Returns:
-		U: Modos espaciales
-		S: Valores singulares
-		Vt: Modos temporales (transpuestos)
-		X_mean: Campo medio
+	Con `bootstrap` (salida de bootstrap_pod) se añaden bandas de confianza
+	a los valores singulares y a los modos 1 espacial y temporal.
 	"""
-	if center:
-		X_mean = X.mean(axis=1, keepdims=True)
-		X_centered = X - X_mean
-	else:
-		X_mean = np.zeros((X.shape[0], 1))
-		X_centered = X
-
-	# SVD
-	U, S, Vt = np.linalg.svd(X_centered, full_matrices=False)
+	import matplotlib.pyplot as plt
 
-	return U, S, Vt, X_mean
-
-
-def plot_results(X, U, S, Vt, tramos, meses, X_mean):
-	"""
-	Genera visualizaciones del análisis POD.
-	"""
 	os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 	# Configuración visual
@@ -131,6 +68,12 @@ def plot_results(X, U, S, Vt, tramos, meses, X_mean):
 	# A. Energía de los modos (Valores singulares)
 	n_modes_plot = min(20, len(S))
 	axs[0, 0].plot(range(1, n_modes_plot + 1), S[:n_modes_plot], 'ro-', linewidth=2)
+	if bootstrap is not None:
+		lower, upper = bands(bootstrap['S_samples'])
+		k = len(lower)
+		axs[0, 0].vlines(range(1, k + 1), lower, upper, color='gray', linewidth=4, alpha=0.5,
+		                 label=f'IC bootstrap ({len(bootstrap["S_samples"])} réplicas)')
+		axs[0, 0].legend()
 	axs[0, 0].set_title('Energía de los Modos (Valores Singulares)', fontsize=12, fontweight='bold')
 	axs[0, 0].set_ylabel('Importancia (Valor Singular)')
 	axs[0, 0].set_xlabel('Modo #')
@@ -139,6 +82,10 @@ def plot_results(X, U, S, Vt, tramos, meses, X_mean):
 	# B. Modo Espacial 1 (Estructura dominante)
 	axs[1, 0].plot(tramos, U[:, 0], 'b-', linewidth=2)
 	axs[1, 0].fill_between(tramos, U[:, 0], color='blue', alpha=0.3)
+	if bootstrap is not None:
+		lower, upper = bands(bootstrap['U_samples'][:, :, 0])
+		axs[1, 0].fill_between(tramos, lower, upper, color='gray', alpha=0.4, label='IC bootstrap')
+		axs[1, 0].legend()
 	axs[1, 0].set_title('Modo 1 Espacial (Estructura Dominante)', fontsize=12, fontweight='bold')
 	axs[1, 0].set_ylabel('Intensidad del Patrón')
 	axs[1, 0].set_xlabel('Kilómetro de la Ruta')
@@ -149,8 +96,11 @@ def plot_results(X, U, S, Vt, tramos, meses, X_mean):
 	max_idx = np.argmax(np.abs(U[:, 0]))
 	max_km = tramos[max_idx]
 	max_val = U[max_idx, 0]
+	etiqueta = f'Zona Crítica: KM {max_km:.0f}'
+	if bootstrap is not None:
+		etiqueta += f'\n({100 * critical_zone_share(bootstrap["U_samples"], max_idx):.0f}% de las réplicas)'
 	axs[1, 0].annotate(
-		f'Zona Crítica: KM {max_km:.0f}',
+		etiqueta,
 		xy=(max_km, max_val),
 		xytext=(max_km + 50, max_val),
 		arrowprops=dict(facecolor='black', shrink=0.05),
@@ -160,6 +110,10 @@ def plot_results(X, U, S, Vt, tramos, meses, X_mean):
 
 	# C. Modo Temporal 1 (Dinámica)
 	axs[1, 1].plot(range(len(Vt[0, :])), Vt[0, :], 'g-', linewidth=2)
+	if bootstrap is not None:
+		lower, upper = bands(bootstrap['Vt_samples'][:, 0, :])
+		axs[1, 1].fill_between(range(len(lower)), lower, upper, color='gray', alpha=0.4, label='IC bootstrap')
+		axs[1, 1].legend()
 	axs[1, 1].set_title('Modo 1 Temporal (Evolución)', fontsize=12, fontweight='bold')
 	axs[1, 1].set_xlabel('Meses (desde inicio)')
 	axs[1, 1].set_ylabel('Coeficiente Temporal')
@@ -174,20 +128,20 @@ def plot_results(X, U, S, Vt, tramos, meses, X_mean):
 	plt.colorbar(im, ax=axs[0, 1], label='Accidentes')
 
 	plt.tight_layout()
-	plt.savefig(f"{OUTPUT_DIR}/pod_spatial_br{CARRETERA}_{ESTADO}.png", dpi=300, bbox_inches='tight')
-	print(f"   ✓ Gráfico guardado: {OUTPUT_DIR}/pod_spatial_br{CARRETERA}_{ESTADO}.png")
+	plt.savefig(f"{OUTPUT_DIR}/pod_spatial_br{carretera}_{estado}.png", dpi=300, bbox_inches='tight')
+	print(f"   ✓ Gráfico guardado: {OUTPUT_DIR}/pod_spatial_br{carretera}_{estado}.png")
 
 	# Gráfico adicional: Matriz original
 	fig2, ax = plt.subplots(figsize=(10, 6))
 	im = ax.imshow(X, aspect='auto', cmap='hot', interpolation='nearest')
-	ax.set_title(f'Matriz Snapshot Original: BR-{CARRETERA} {ESTADO}\n(Accidentes por Tramo × Mes)',
+	ax.set_title(f'Matriz Snapshot Original: BR-{carretera} {estado}\n(Accidentes por Tramo × Mes)',
 	             fontsize=12, fontweight='bold')
 	ax.set_ylabel('Espacio (Tramos de 10 KM)')
 	ax.set_xlabel('Tiempo (Meses)')
 	plt.colorbar(im, ax=ax, label='Cantidad de Accidentes')
 	plt.tight_layout()
-	plt.savefig(f"{OUTPUT_DIR}/matriz_original_br{CARRETERA}_{ESTADO}.png", dpi=300, bbox_inches='tight')
-	print(f"   ✓ Gráfico guardado: {OUTPUT_DIR}/matriz_original_br{CARRETERA}_{ESTADO}.png")
+	plt.savefig(f"{OUTPUT_DIR}/matriz_original_br{carretera}_{estado}.png", dpi=300, bbox_inches='tight')
+	print(f"   ✓ Gráfico guardado: {OUTPUT_DIR}/matriz_original_br{carretera}_{estado}.png")
 
 	plt.show()
 
@@ -197,8 +151,7 @@ def print_statistics(X, S):
 	Imprime estadísticas del análisis.
 	"""
 	# Energía acumulada
-	energy = S**2 / np.sum(S**2) * 100
-	cum_energy = np.cumsum(energy)
+	energy, cum_energy = energy_percentages(S)
 
 	print("\n" + "="*60)
 	print("ESTADÍSTICAS POD")
@@ -212,6 +165,10 @@ def print_statistics(X, S):
 	# Modos necesarios para 90% de energía
 	n_modes_90 = np.argmax(cum_energy >= 90) + 1
 	print(f"\nModos necesarios para 90% de energía: {n_modes_90}")
+
+	# Modos por encima del umbral de ruido (Gavish–Donoho)
+	n_modes_gd, _ = gavish_donoho_rank(S, X.shape)
+	print(f"Modos por encima del umbral de ruido (Gavish–Donoho): {n_modes_gd}")
 	print("="*60)
 
 
@@ -219,34 +176,67 @@ def print_statistics(X, S):
 # Main
 # ============================================================
 
-if __name__ == "__main__":
+def main(estado=ESTADO, carretera=CARRETERA, bin_size=BIN_SIZE_KM, dtype=DTYPE, n_bootstrap=N_BOOTSTRAP, jobs=None):
+	"""Ejecuta el análisis POD espacial-temporal de una carretera (`jobs`: procesos del bootstrap)."""
 	print("="*60)
-	print(f"POD SPATIAL-TEMPORAL: BR-{CARRETERA} en {ESTADO}")
+	print(f"POD SPATIAL-TEMPORAL: BR-{carretera} en {estado}")
 	print("="*60)
 
 	# 1. Cargar datos
-	print(f"\n1. Cargando datos de BR-{CARRETERA} en {ESTADO}...")
-	df = load_spatial_data(ESTADO, CARRETERA)
-	print(f"   ✓ Registros cargados: {len(df):,}")
+	print(f"\n1. Cargando datos de BR-{carretera} en {estado}...")
+	with stage("pod_spatial.load") as metrics:
+		df = load_spatial_data(estado, carretera, bin_size=bin_size, db_path=DB_PATH)
+		metrics.rows_out = len(df)
+	print(f"   ✓ Accidentes cargados: {int(df['count'].sum()):,}")
 	print(f"   ✓ Rango temporal: {df['mes_anio'].min()} a {df['mes_anio'].max()}")
-	print(f"   ✓ Rango espacial: KM {df['km'].min():.1f} a {df['km'].max():.1f}")
+	print(f"   ✓ Rango espacial: KM {df['tramo_km'].min():.1f} a {df['tramo_km'].max() + bin_size:.1f}")
 
 	# 2. Construir matriz snapshot
-	print(f"\n2. Construyendo matriz snapshot (bins de {BIN_SIZE_KM} km)...")
-	X, tramos, meses = build_snapshot_matrix(df, bin_size=BIN_SIZE_KM)
+	print(f"\n2. Construyendo matriz snapshot (bins de {bin_size} km)...")
+	with stage("pod_spatial.build_matrix", rows_in=len(df)) as metrics:
+		X, tramos, meses = build_snapshot_matrix(df, dtype=dtype)
+		metrics.rows_out = X.shape[0]
 	print(f"   ✓ Matriz generada: {X.shape[0]} tramos × {X.shape[1]} meses")
 
 	# 3. Aplicar POD
 	print("\n3. Aplicando POD (SVD)...")
-	U, S, Vt, X_mean = compute_pod(X, center=True)
+	with stage("pod_spatial.compute_pod", rows_in=X.shape[0]):
+		U, S, Vt, X_mean = compute_pod(X, center=True)
 	print(f"   ✓ SVD completado: {len(S)} modos extraídos")
 
 	# 4. Estadísticas
 	print_statistics(X, S)
 
+	# POD robusto: los picos aislados pasan a la parte dispersa E
+	with stage("pod_spatial.robust_pod", rows_in=X.shape[0]):
+		_, S_robusto, _, _, E, info = robust_pod(X, rng=0)
+	_, cum_robusto = energy_percentages(S_robusto)
+	print(f"POD robusto (RPCA, {info['n_iter']} iteraciones): rango {info['rank']}, "
+	      f"{np.argmax(cum_robusto >= 90) + 1} modos para 90% de energía, "
+	      f"{100 * np.mean(np.abs(E) > 0.5):.1f}% de celdas con picos")
+
+	# Bandas de confianza: bootstrap por bloques de 12 meses
+	bootstrap = None
+	if n_bootstrap:
+		with stage("pod_spatial.bootstrap", rows_in=n_bootstrap) as metrics:
+			bootstrap = bootstrap_pod(X, MODOS_BOOTSTRAP, n_replicas=n_bootstrap, max_seconds=TIEMPO_BOOTSTRAP,
+			                          U_ref=U, max_workers=jobs)
+			metrics.rows_out = len(bootstrap['S_samples'])
+		max_idx = int(np.argmax(np.abs(U[:, 0])))
+		print(f"Bootstrap ({len(bootstrap['S_samples'])} réplicas): zona crítica KM {tramos[max_idx]:.0f} "
+		      f"en el {100 * critical_zone_share(bootstrap['U_samples'], max_idx):.0f}% de las réplicas")
+
 	# 5. Visualizar
 	print("\n4. Generando visualizaciones...")
-	plot_results(X, U, S, Vt, tramos, meses, X_mean)
+	with stage("pod_spatial.plot"):
+		plot_results(X, U, S, Vt, tramos, meses, X_mean, estado, carretera, bootstrap=bootstrap)
 
 	print("\n✅ Análisis POD espacial completado!")
 	print("="*60)
+
+	print_summary()
+	save_metrics(DB_PATH)
+
+
+if __name__ == "__main__":
+	main()
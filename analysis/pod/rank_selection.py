@@ -0,0 +1,232 @@
+"""
+Selección del rango POD: cuántos modos son estructura y cuántos ruido.
+
+Tres criterios, alternativos al umbral de energía:
+- Gavish–Donoho: umbral duro óptimo sobre los valores singulares (instantáneo)
+- Bi-validación cruzada (Owen & Perry, 2009): predice bloques retenidos de X
+  con la SVD truncada del resto
+- Análisis paralelo (Horn): compara cada valor singular con los de matrices
+  con las filas permutadas; las permutaciones se reparten en lotes entre
+  procesos y usan SVD aleatorizada
+
+Con `main()` se calcula el rango de cada corredor en un trabajo por lotes.
+"""
+
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Raíz del repositorio en el path para los paquetes analysis y pipeline
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from analysis.data import build_snapshot_matrix, load_corridors, load_spatial_data
+from analysis.linalg import randomized_svd
+from analysis.shared import SharedArrays, attach, shared_task
+from analysis.svd.svd_core import modes_for_energy
+from pipeline.instrumentation import print_summary, save_metrics, stage
+
+# ============================================================
+# Configuración
+# ============================================================
+
+DB_PATH = "extracted/analysis_data.db"
+OUTPUT_DIR = "analysis/pod/results"
+
+BIN_SIZE_KM = 10
+MIN_ACCIDENTES = 500  # Corredores con menos accidentes no se evalúan
+MAX_RANGO = 20
+N_PERMUTACIONES = 200
+LOTE_PERMUTACIONES = 25
+CUANTIL = 0.95
+
+# ============================================================
+# Criterios
+# ============================================================
+
+def gavish_donoho_rank(S, shape, sigma=None):
+	"""
+	Rango por el umbral duro óptimo de Gavish & Donoho (2014).
+
+	Args:
+		S: Valores singulares de X
+		shape: Forma (m, n) de X
+		sigma: Desviación del ruido, si se conoce (si no, se estima con la mediana de S)
+
+	Returns:
+		rango, umbral
+	"""
+	m, n = sorted(shape)
+	beta = m / n
+
+	if sigma is None:
+		omega = 0.56 * beta**3 - 0.95 * beta**2 + 1.82 * beta + 1.43
+		threshold = omega * np.median(S)
+	else:
+		lambda_beta = np.sqrt(2 * (beta + 1) + 8 * beta / ((beta + 1) + np.sqrt(beta**2 + 14 * beta + 1)))
+		threshold = lambda_beta * np.sqrt(n) * sigma
+
+	return int(np.sum(S > threshold)), threshold
+
+
+def bcv_rank(X, max_rank=MAX_RANGO, row_folds=2, col_folds=2, rng=None):
+	"""
+	Rango por bi-validación cruzada de Gabriel (Owen & Perry, 2009).
+
+	Para cada bloque retenido A = X[I, J] se predice A ≈ B D_k^+ C con la SVD de
+	D = X[~I, ~J], B = X[I, ~J] y C = X[~I, J]. Una sola SVD de D sirve para
+	todos los k.
+
+	Returns:
+		rango: k (0..max_rank) con menor error de predicción
+		errores: Error cuadrático total para cada k
+	"""
+	X = np.asarray(X, dtype=float)
+	rng = np.random.default_rng(rng)
+	row_groups = np.array_split(rng.permutation(X.shape[0]), row_folds)
+	col_groups = np.array_split(rng.permutation(X.shape[1]), col_folds)
+
+	errors = np.zeros(max_rank + 1)
+	for rows in row_groups:
+		row_mask = np.zeros(X.shape[0], dtype=bool)
+		row_mask[rows] = True
+		for cols in col_groups:
+			col_mask = np.zeros(X.shape[1], dtype=bool)
+			col_mask[cols] = True
+
+			A = X[np.ix_(row_mask, col_mask)]
+			B = X[np.ix_(row_mask, ~col_mask)]
+			C = X[np.ix_(~row_mask, col_mask)]
+			D = X[np.ix_(~row_mask, ~col_mask)]
+
+			U, S, Vt = np.linalg.svd(D, full_matrices=False)
+			K = min(max_rank, int(np.sum(S > S[0] * 1e-10)) if S.size and S[0] > 0 else 0)
+
+			# Â_k = Σ_{i<k} (B v_i)(u_i^T C) / s_i
+			left = (B @ Vt[:K].T) / S[:K]
+			right = U[:, :K].T @ C
+
+			A_hat = np.zeros_like(A)
+			errors[0] += np.sum(A**2)
+			for k in range(1, max_rank + 1):
+				if k <= K:
+					A_hat += np.outer(left[:, k - 1], right[k - 1])
+				errors[k] += np.sum((A - A_hat)**2)
+
+	return int(np.argmin(errors)), errors
+
+
+@shared_task
+def _permutation_batch(handle, max_rank, n_permutations, seed):
+	"""Valores singulares principales de n_permutations copias de X con cada fila permutada."""
+	X = attach(handle)['X']
+	rng = np.random.default_rng(seed)
+	values = np.empty((n_permutations, max_rank))
+	for p in range(n_permutations):
+		X_perm = rng.permuted(X, axis=1)
+		_, S, _ = randomized_svd(X_perm, max_rank, rng=rng)
+		values[p] = S
+	return values
+
+
+def parallel_analysis_rank(X, max_rank=MAX_RANGO, n_permutations=N_PERMUTACIONES, quantile=CUANTIL,
+                           batch_size=LOTE_PERMUTACIONES, executor=None, seed=0):
+	"""
+	Rango por análisis paralelo: modos cuyo valor singular supera el cuantil
+	del mismo modo en matrices con cada fila permutada en el tiempo.
+
+	Args:
+		X: Matriz snapshot (centrada si el POD se centra)
+		max_rank: Modos evaluados
+		n_permutations: Número de permutaciones
+		quantile: Cuantil de la distribución nula
+		batch_size: Permutaciones por tarea del pool
+		executor: Pool de procesos compartido (si es None se crea uno)
+		seed: Semilla (cada lote usa una semilla derivada)
+
+	Returns:
+		rango, umbrales (cuantil por modo)
+	"""
+	X = np.asarray(X, dtype=float)
+	max_rank = min(max_rank, *X.shape)
+	seeds = np.random.SeedSequence(seed).spawn(-(-n_permutations // batch_size))
+	sizes = [min(batch_size, n_permutations - i * batch_size) for i in range(len(seeds))]
+
+	# Los workers leen X de memoria compartida en lugar de recibir una copia por lote
+	owns_executor = executor is None
+	if owns_executor:
+		executor = ProcessPoolExecutor()
+	try:
+		with SharedArrays({'X': X}) as shared:
+			futures = [executor.submit(_permutation_batch, shared.handle, max_rank, size, s) for size, s in zip(sizes, seeds)]
+			null_values = np.vstack([future.result() for future in futures])
+	finally:
+		if owns_executor:
+			executor.shutdown()
+
+	thresholds = np.quantile(null_values, quantile, axis=0)
+	S = np.linalg.svd(X, compute_uv=False)[:max_rank]
+
+	# Modos consecutivos por encima del umbral
+	above = S > thresholds
+	rank = int(np.argmin(above)) if not above.all() else max_rank
+
+	return rank, thresholds
+
+
+# ============================================================
+# Main
+# ============================================================
+
+def main(corredores=None, bin_size=BIN_SIZE_KM, min_accidentes=MIN_ACCIDENTES, jobs=None):
+	"""
+	Calcula el rango de cada corredor con los tres criterios y lo guarda en CSV.
+
+	Args:
+		corredores: Lista de (estado, carretera); por defecto, todos los que
+			tienen al menos `min_accidentes` accidentes
+	"""
+	print("="*60)
+	print("SELECCIÓN DE RANGO POD")
+	print("="*60)
+
+	if corredores is None:
+		corredores = load_corridors(min_accidentes, db_path=DB_PATH)
+	print(f"\n{len(corredores)} corredores (tramos de {bin_size} km)")
+
+	filas = []
+	with stage("rank_selection", rows_in=len(corredores)) as metrics, ProcessPoolExecutor(max_workers=jobs) as executor:
+		for estado, carretera in corredores:
+			X, _, _ = build_snapshot_matrix(load_spatial_data(estado, carretera, bin_size=bin_size, db_path=DB_PATH))
+			if min(X.shape) < 4:
+				continue
+			X_centered = X - X.mean(axis=1, keepdims=True)
+			S = np.linalg.svd(X_centered, compute_uv=False)
+
+			filas.append({
+				'estado': estado,
+				'carretera': carretera,
+				'n_tramos': X.shape[0],
+				'n_meses': X.shape[1],
+				'rango_energia_90': modes_for_energy(S, 0.90),
+				'rango_gavish_donoho': gavish_donoho_rank(S, X.shape)[0],
+				'rango_bcv': bcv_rank(X_centered, min(MAX_RANGO, min(X.shape) // 2 - 1), rng=0)[0],
+				'rango_paralelo': parallel_analysis_rank(X_centered, executor=executor)[0]
+			})
+		metrics.rows_out = len(filas)
+
+	resultados = pd.DataFrame(filas)
+	print("\n" + resultados.to_string(index=False))
+
+	os.makedirs(OUTPUT_DIR, exist_ok=True)
+	resultados.to_csv(os.path.join(OUTPUT_DIR, "rank_selection.csv"), index=False)
+	print(f"\n   ✓ Resultados guardados en {OUTPUT_DIR}/rank_selection.csv")
+
+	print_summary()
+	save_metrics(DB_PATH)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,151 @@
+"""
+POD robusto: separación de una matriz snapshot en parte de bajo rango y parte dispersa.
+
+Resuelve la búsqueda de componentes principales (Candès, Li, Ma & Wright,
+2011)
+
+	min ||L||_* + λ ||E||_1   sujeto a   L + E = M
+
+con el método de Lagrangiano aumentado inexacto (Lin, Chen & Ma, 2010). L
+recoge las tendencias (pocos modos) y E los picos aislados (festivos,
+ventanas anómalas) que en la SVD directa inflan el número de modos.
+
+Cada iteración solo necesita los valores singulares principales: se
+calculan con SVD aleatorizada, arrancando del subespacio singular de la
+iteración anterior (arranque en caliente), y el número pedido se ajusta al
+rango de esa iteración.
+"""
+
+import numpy as np
+
+from analysis.linalg import as_float, randomized_svd, svd
+
+MAX_ITER = 500
+TOL = 1e-7
+RHO = 1.5  # Crecimiento de la penalización mu por iteración
+RANGO_INICIAL = 10
+
+# Por encima de esta fracción de min(m, n) la SVD completa es más barata que la aleatorizada
+FRACCION_SVD_COMPLETA = 0.25
+
+
+def shrink(A, tau):
+	"""Umbral suave elemento a elemento: sign(A) · max(|A| - tau, 0)."""
+	return A - np.clip(A, -tau, tau)
+
+
+def singular_value_threshold(A, tau, k, rng=None, init=None):
+	"""
+	Umbral suave sobre los valores singulares de A, calculando solo los k principales.
+
+	Si todos los calculados superan el umbral, k se duplica hasta que alguno
+	quede por debajo (o se llegue a la SVD completa).
+
+	Args:
+		init: Vectores singulares derechos de una matriz parecida (n × l), como
+			arranque de la SVD aleatorizada
+
+	Returns:
+		L: U · max(S - tau, 0) · Vt
+		rango: Valores singulares por encima de tau
+		V: Vectores singulares derechos calculados (arranque de la siguiente llamada)
+	"""
+	p = min(A.shape)
+	k = max(1, min(k, p))
+	while True:
+		if k >= FRACCION_SVD_COMPLETA * p:
+			U, S, Vt = svd(A, overwrite=True)
+		else:
+			U, S, Vt = randomized_svd(A, k, n_iter=1 if init is not None else 2, rng=rng, init=init)
+
+		rank = int(np.sum(S > tau))
+		if rank < len(S) or len(S) == p:
+			break
+		k = min(2 * k, p)
+
+	return (U[:, :rank] * (S[:rank] - tau)) @ Vt[:rank], rank, Vt.T
+
+
+def robust_pca(M, lam=None, tol=TOL, max_iter=MAX_ITER, rank=RANGO_INICIAL, rng=None):
+	"""
+	Descomposición M = L + E con L de bajo rango y E dispersa (IALM).
+
+	Args:
+		M: Matriz snapshot (m × n)
+		lam: Peso de la parte dispersa (por defecto, 1 / sqrt(max(m, n)))
+		tol: Tolerancia sobre ||M - L - E||_F / ||M||_F
+		max_iter: Máximo de iteraciones
+		rank: Estimación inicial del rango de L (tamaño de la primera SVD
+			truncada; p. ej. info['rank'] de una matriz parecida)
+		rng: Generador o semilla de las SVD aleatorizadas
+
+	Returns:
+		L: Parte de bajo rango
+		E: Parte dispersa (anomalías)
+		info: Dict con 'n_iter', 'rank' y 'residual'
+	"""
+	M = as_float(M)
+	m, n = M.shape
+	rng = np.random.default_rng(rng)
+	if lam is None:
+		lam = 1 / np.sqrt(max(m, n))
+
+	norm_fro = np.linalg.norm(M)
+	if norm_fro == 0:
+		return np.zeros_like(M), np.zeros_like(M), {'n_iter': 0, 'rank': 0, 'residual': 0.0}
+	norm_two = randomized_svd(M, 1, rng=rng)[1][0]
+
+	# Multiplicador inicial y penalización como en Lin et al.
+	Y = M / max(norm_two, np.abs(M).max() / lam)
+	mu = 1.25 / norm_two
+	mu_max = mu * 1e7
+
+	L = np.zeros_like(M)
+	V = None
+	T = np.empty_like(M)  # Temporal de trabajo (evita una matriz nueva por operación)
+	step = max(1, round(0.05 * min(m, n)))
+	for n_iter in range(1, max_iter + 1):
+		# T = M + Y/mu, común a las dos actualizaciones
+		np.divide(Y, mu, out=T)
+		T += M
+		E = shrink(T - L, lam / mu)
+		T -= E
+		L, svp, V = singular_value_threshold(T, 1 / mu, rank, rng, init=V)
+
+		# Siguiente SVD truncada: un poco por encima del rango actual
+		rank = svp + 1 if svp < rank else min(svp + step, min(m, n))
+
+		# Residuo Z = M - L - E y multiplicador Y += mu Z
+		np.subtract(M, L, out=T)
+		T -= E
+		residual = np.linalg.norm(T) / norm_fro
+		T *= mu
+		Y += T
+		mu = min(mu * RHO, mu_max)
+
+		if residual < tol:
+			break
+
+	return L, E, {'n_iter': n_iter, 'rank': svp, 'residual': float(residual)}
+
+
+def robust_pod(X, **kwargs):
+	"""
+	POD de la parte de bajo rango de X (mismo formato que compute_pod).
+
+	El campo medio se toma de L, así que los picos de E no lo desplazan.
+
+	Args:
+		X: Matriz snapshot (espacio × tiempo)
+		**kwargs: Parámetros de robust_pca
+
+	Returns:
+		U, S, Vt, X_mean: POD de L centrada
+		E: Parte dispersa
+		info: Diagnóstico de robust_pca
+	"""
+	L, E, info = robust_pca(X, **kwargs)
+	X_mean = L.mean(axis=1, keepdims=True)
+	L -= X_mean
+	U, S, Vt = svd(L, overwrite=True)
+	return U, S, Vt, X_mean, E, info
@@ -0,0 +1,164 @@
+"""
+Matrices compartidas entre procesos sin copias ni serialización.
+
+El proceso principal publica los arrays (matrices snapshot, factores SVD) una
+sola vez, en `multiprocessing.shared_memory` o en ficheros `.npy` mapeados en
+memoria, y reparte un `handle` pequeño y serializable. Cada worker obtiene con
+`attach(handle)` vistas de solo lectura sobre la misma memoria, así que un
+barrido paralelo usa una sola copia de los datos sea cual sea el número de
+workers.
+
+Uso:
+	with SharedArrays({'X': X, 'U': U}) as shared:
+		executor.map(tarea, [shared.handle] * n)
+
+	@shared_task
+	def tarea(handle):
+		arrays = attach(handle)
+		X = arrays['X']  # solo lectura
+
+Un worker que conservara los segmentos después de la tarea mantendría mapeada
+(y contada como Shmem) la memoria de los SharedArrays ya cerrados mientras el
+pool siga vivo, y un pool compartido sobrevive a varios. Por eso las tareas se
+decoran con `shared_task`, que cierra al terminar lo que abrió attach; attach
+cierra además los segmentos de otros handles que sigan abiertos.
+"""
+
+import functools
+import os
+import shutil
+import tempfile
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Segmentos y mapeos abiertos por este proceso (se reutilizan dentro de una tarea)
+_attached = {}
+# Segmentos que no se pudieron cerrar porque quedaban vistas sobre ellos
+_unclosed = []
+
+
+class SharedArrays:
+	"""
+	Publica arrays numpy para que los workers los lean sin copiarlos.
+
+	Args:
+		arrays: Dict nombre → array
+		backend: 'shm' (memoria compartida) o 'memmap' (ficheros .npy mapeados)
+		directory: Directorio de los .npy con backend 'memmap' (por defecto, uno temporal)
+	"""
+
+	def __init__(self, arrays, backend='shm', directory=None):
+		if backend not in ('shm', 'memmap'):
+			raise ValueError(f"Backend desconocido: {backend} (opciones: shm, memmap)")
+
+		self.backend = backend
+		self.handle = {}
+		self._segments = []
+		self._directory = None
+
+		if backend == 'memmap':
+			self._owns_directory = directory is None
+			self._directory = directory or tempfile.mkdtemp(prefix="shared_arrays_")
+			os.makedirs(self._directory, exist_ok=True)
+
+		for name, array in arrays.items():
+			array = np.ascontiguousarray(array)
+			if backend == 'shm':
+				segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+				np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)[...] = array
+				# Sin mapeo en este proceso: los workers que el pool cree por fork a
+				# continuación no heredan uno que nadie cerraría. El segmento sigue
+				# existiendo hasta unlink
+				segment.close()
+				self._segments.append(segment)
+				location = segment.name
+			else:
+				location = os.path.join(self._directory, f"{name}.npy")
+				np.save(location, array)
+			self.handle[name] = (backend, location, array.shape, array.dtype.str)
+
+	def close(self):
+		"""Libera la memoria compartida (o borra los .npy temporales)."""
+		for segment in self._segments:
+			_attached.pop(segment.name, None)
+			segment.close()
+			segment.unlink()
+		self._segments = []
+		if self._directory is not None and self._owns_directory:
+			shutil.rmtree(self._directory, ignore_errors=True)
+			self._directory = None
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+
+def attach(handle):
+	"""
+	Vistas de solo lectura de los arrays publicados con SharedArrays.
+
+	Los segmentos se abren una vez por tarea (ver shared_task); los de otros
+	handles que sigan abiertos se cierran.
+
+	Returns:
+		Dict nombre → array (no escribible)
+	"""
+	_release(keep={location for _, location, _, _ in handle.values()})
+
+	arrays = {}
+	for name, (backend, location, shape, dtype) in handle.items():
+		if location not in _attached:
+			if backend == 'shm':
+				# Los workers del pool comparten el resource tracker del proceso
+				# principal: el segmento queda registrado una sola vez y solo
+				# SharedArrays.close lo libera
+				segment = shared_memory.SharedMemory(name=location)
+				_attached[location] = (segment, np.ndarray(shape, dtype=np.dtype(dtype), buffer=segment.buf))
+			else:
+				_attached[location] = (None, np.load(location, mmap_mode='r'))
+
+		view = _attached[location][1].view()
+		view.flags.writeable = False
+		arrays[name] = view
+
+	return arrays
+
+
+def _release(keep=()):
+	"""Cierra los segmentos y mapeos abiertos por este proceso salvo los de `keep`."""
+	segments = [_attached.pop(location)[0] for location in list(_attached) if location not in keep]
+	segments += _unclosed
+	_unclosed.clear()
+
+	for segment in segments:
+		if segment is None:
+			continue
+		try:
+			segment.close()
+		except BufferError:
+			# Alguna vista de una tarea anterior sigue viva: se reintenta en el próximo attach
+			_unclosed.append(segment)
+
+
+def detach():
+	"""Cierra los segmentos abiertos por este proceso (los que tengan vistas vivas, en el próximo attach)."""
+	_release()
+
+
+def shared_task(task):
+	"""
+	Decorador de las tareas del pool que usan attach: al terminar la tarea (y
+	liberarse sus vistas) cierra los segmentos abiertos, para que el worker no
+	los mantenga mapeados hasta su siguiente tarea.
+	"""
+	@functools.wraps(task)
+	def wrapper(*args, **kwargs):
+		try:
+			return task(*args, **kwargs)
+		finally:
+			detach()
+
+	return wrapper
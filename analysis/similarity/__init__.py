@@ -0,0 +1 @@
+"""Firmas de corredores, búsqueda de corredores parecidos y agrupamiento."""
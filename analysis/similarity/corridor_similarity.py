@@ -0,0 +1,142 @@
+"""
+Corredores parecidos: ¿qué carreteras se comportan como la BR-101/SC?
+
+Construye la firma de cada corredor (modos temporales POD, espectro de
+energía, autovalores DMD) sobre el calendario común, busca los vecinos más
+cercanos del corredor de consulta y agrupa todos los corredores con k-means
+y con Ward jerárquico.
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Raíz del repositorio en el path para los paquetes analysis y pipeline
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from analysis.data import load_corridor_matrices
+from analysis.similarity.similarity_core import SimilarityIndex, corridor_signatures, kmeans, ward_clusters
+from pipeline.instrumentation import print_summary, save_metrics, stage
+
+# ============================================================
+# Configuración
+# ============================================================
+
+DB_PATH = "extracted/analysis_data.db"
+OUTPUT_DIR = "analysis/similarity/results"
+
+# Corredor de consulta: BR-101 en Santa Catarina
+ESTADO = 'SC'
+CARRETERA = 101
+BIN_SIZE_KM = 10
+MIN_ACCIDENTES = 200  # Corredores con menos accidentes no se indexan
+MIN_TRAMOS = 2
+N_VECINOS = 10
+N_GRUPOS = 6
+
+# ============================================================
+# Funciones
+# ============================================================
+
+def print_neighbours(consulta, vecinos, totales):
+	"""Imprime los corredores más parecidos al de consulta."""
+	print("\n" + "="*60)
+	print(f"CORREDORES PARECIDOS A BR-{consulta[1]}/{consulta[0]}")
+	print("="*60)
+	for i, ((uf, br), distancia) in enumerate(vecinos, start=1):
+		print(f"  {i:2d}. BR-{br}/{uf}: distancia {distancia:.3f} ({totales[(uf, br)]:,} accidentes)")
+
+
+def print_clusters(resultados, consulta, top=5):
+	"""Imprime tamaño y corredores principales de cada grupo k-means."""
+	print("\n" + "="*60)
+	print("GRUPOS DE CORREDORES (k-means)")
+	print("="*60)
+	for grupo, filas in resultados.groupby('grupo_kmeans'):
+		principales = filas.nlargest(top, 'accidentes')
+		print(f"\nGrupo {grupo + 1} ({len(filas)} corredores): " +
+		      ", ".join(f"BR-{row.br}/{row.uf}" for row in principales.itertuples()))
+
+	fila = resultados[(resultados['uf'] == consulta[0]) & (resultados['br'] == consulta[1])]
+	if not fila.empty:
+		print(f"\nBR-{consulta[1]}/{consulta[0]} está en el grupo {fila['grupo_kmeans'].iloc[0] + 1} (k-means) "
+		      f"y {fila['grupo_ward'].iloc[0] + 1} (Ward)")
+	print("="*60)
+
+
+# ============================================================
+# Main
+# ============================================================
+
+def main(estado=ESTADO, carretera=CARRETERA, bin_size=BIN_SIZE_KM, min_accidentes=MIN_ACCIDENTES,
+	     n_vecinos=N_VECINOS, n_grupos=N_GRUPOS):
+	"""Indexa las firmas de todos los corredores, busca los parecidos al de consulta y los agrupa."""
+	print("="*60)
+	print("SIMILITUD ENTRE CORREDORES")
+	print("="*60)
+
+	print("\n1. Cargando corredores...")
+	with stage("similarity.load") as metrics:
+		meses, matrices = load_corridor_matrices(min_accidentes, bin_size=bin_size, db_path=DB_PATH)
+		matrices = {key: X for key, (X, _) in matrices.items() if X.shape[0] >= MIN_TRAMOS}
+		metrics.rows_out = len(matrices)
+	print(f"   ✓ {len(matrices)} corredores × {len(meses)} meses")
+	if len(matrices) < 2:
+		print(f"\n⚠️  Hacen falta al menos 2 corredores con {min_accidentes} accidentes y {MIN_TRAMOS} tramos para compararlos")
+		return
+
+	print("\n2. Calculando firmas...")
+	with stage("similarity.signatures", rows_in=len(matrices)) as metrics:
+		keys = list(matrices)
+		F = corridor_signatures(matrices.values())
+		index = SimilarityIndex(keys, F)
+		metrics.rows_out = len(index)
+	print(f"   ✓ {F.shape[0]} firmas de dimensión {F.shape[1]}")
+
+	# Consulta de todos los corredores a la vez, para medir el coste por consulta
+	with stage("similarity.search", rows_in=len(index)):
+		inicio = time.perf_counter()
+		index.search(F, n_vecinos + 1)
+		segundos = time.perf_counter() - inicio
+	print(f"   ✓ {len(index)} consultas de {n_vecinos} vecinos en {1000 * segundos:.1f} ms "
+	      f"({1000 * segundos / max(len(index), 1):.3f} ms por consulta)")
+
+	totales = {key: int(X.sum()) for key, X in matrices.items()}
+	consulta = (estado, carretera)
+	if consulta in matrices:
+		print_neighbours(consulta, index.neighbours(consulta, n_vecinos), totales)
+	else:
+		print(f"\n⚠️  BR-{carretera}/{estado} no tiene firma (menos de {min_accidentes} accidentes o {MIN_TRAMOS} tramos)")
+
+	n_grupos = min(n_grupos, len(index))
+	print(f"\n3. Agrupando ({n_grupos} grupos)...")
+	with stage("similarity.kmeans", rows_in=len(index)):
+		etiquetas_kmeans, _, inercia = kmeans(F, n_grupos, rng=0)
+	with stage("similarity.ward", rows_in=len(index)):
+		etiquetas_ward, _ = ward_clusters(F, n_grupos)
+	print(f"   ✓ k-means (inercia {inercia:.3f}) y Ward")
+
+	resultados = pd.DataFrame({
+		'uf': [uf for uf, _ in keys],
+		'br': [br for _, br in keys],
+		'tramos': [matrices[key].shape[0] for key in keys],
+		'accidentes': [totales[key] for key in keys],
+		'grupo_kmeans': etiquetas_kmeans,
+		'grupo_ward': etiquetas_ward,
+	})
+	print_clusters(resultados, consulta)
+
+	os.makedirs(OUTPUT_DIR, exist_ok=True)
+	resultados.to_csv(os.path.join(OUTPUT_DIR, "corridor_clusters.csv"), index=False)
+	np.save(os.path.join(OUTPUT_DIR, "corridor_signatures.npy"), F)
+	print(f"\n   ✓ Resultados guardados en {OUTPUT_DIR}/corridor_clusters.csv y corridor_signatures.npy")
+
+	print_summary()
+	save_metrics(DB_PATH)
+
+
+if __name__ == "__main__":
+	main()
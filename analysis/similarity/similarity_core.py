@@ -0,0 +1,220 @@
+"""
+Firmas de corredores, búsqueda de vecinos y agrupamiento.
+
+Cada corredor (matriz snapshot tramos × meses sobre el calendario común) se
+resume en un vector de longitud fija, independiente de su número de tramos:
+- modos temporales POD (signo fijado por el modo espacial, ponderados por su
+  valor singular) promediados en n_points bloques del calendario
+- espectro de energía de los primeros modos
+- autovalores DMD (módulo y frecuencia) de los modos de mayor amplitud
+
+Cada bloque se normaliza y se pondera, y el vector final tiene norma 1: la
+distancia euclídea entre firmas equivale a la de coseno. La búsqueda de
+vecinos es exacta, con un producto matriz-matriz sobre todas las firmas (con
+miles de corredores y ~100 dimensiones, un árbol no gana a BLAS), y el
+agrupamiento usa k-means vectorizado o Ward jerárquico.
+"""
+
+import numpy as np
+from scipy.cluster import hierarchy
+
+from analysis.dmd.dmd_core import dmd_from_svd
+from analysis.linalg import center_rows, svd
+
+N_MODOS = 3  # Modos temporales POD de la firma
+N_PUNTOS = 24  # Bloques del calendario por modo
+N_ENERGIA = 10  # Fracciones de energía de la firma
+N_AUTOVALORES = 6  # Autovalores DMD (uno por par conjugado)
+PESOS = {'modos': 1.0, 'energia': 0.5, 'dmd': 0.5}  # Peso de cada bloque en la distancia
+
+
+def _block_means(V, n_points):
+	"""Promedio de cada fila de V en n_points bloques consecutivos (o interpolación si V es más corta)."""
+	n = V.shape[1]
+	if n >= n_points:
+		edges = np.linspace(0, n, n_points + 1).round().astype(int)
+		return np.add.reduceat(V, edges[:-1], axis=1) / np.diff(edges)
+	grid = np.linspace(0, n - 1, n_points)
+	return np.array([np.interp(grid, np.arange(n), row) for row in V])
+
+
+def _unit(v):
+	norm = np.linalg.norm(v)
+	return v / norm if norm > 0 else v
+
+
+def corridor_signature(X, n_modes=N_MODOS, n_points=N_PUNTOS, n_energy=N_ENERGIA, n_eigs=N_AUTOVALORES,
+                       weights=PESOS):
+	"""
+	Firma de longitud fija de un corredor.
+
+	Args:
+		X: Matriz snapshot (tramos × meses) sobre el calendario común
+		n_modes, n_points: Modos temporales y bloques del calendario por modo
+		n_energy: Fracciones de energía incluidas
+		n_eigs: Autovalores DMD incluidos
+		weights: Peso de los bloques 'modos', 'energia' y 'dmd'
+
+	Returns:
+		Vector de norma 1 y longitud n_modes·n_points + n_energy + 2·n_eigs
+	"""
+	X_centered, _ = center_rows(X, dtype='float64')
+	U, S, Vt = svd(X_centered)
+	valid = S > S[0] * 1e-10 if S.size and S[0] > 0 else np.zeros(len(S), dtype=bool)
+	rank = int(valid.sum())
+
+	# Modos temporales: signo tal que el modo espacial sume positivo
+	k = min(n_modes, rank)
+	signs = np.where(U[:, :k].sum(axis=0) < 0, -1.0, 1.0)
+	modes = np.zeros((n_modes, n_points))
+	if k:
+		modes[:k] = _block_means(Vt[:k] * signs[:, None], n_points) * (S[:k] / np.linalg.norm(S[:k]))[:, None]
+
+	energy = np.zeros(n_energy)
+	if rank:
+		fractions = S[:rank]**2 / np.sum(S[:rank]**2)
+		energy[:min(n_energy, rank)] = fractions[:n_energy]
+
+	# Autovalores DMD de frecuencia >= 0, por amplitud de su modo
+	dmd = np.zeros((n_eigs, 2))
+	if X.shape[1] > 2 and rank:
+		U1, S1, Vh1 = svd(X_centered[:, :-1])
+		r = min(2 * n_eigs, int(np.sum(S1 > S1[0] * 1e-10))) if S1.size and S1[0] > 0 else 0
+		if r:
+			Phi, eigenvalues, b = dmd_from_svd(X_centered, U1, S1, Vh1, r)
+			amplitude = np.abs(b) * np.linalg.norm(Phi, axis=0)
+			keep = np.flatnonzero(eigenvalues.imag >= 0)
+			keep = keep[np.argsort(-amplitude[keep])][:n_eigs]
+			dmd[:len(keep), 0] = np.abs(eigenvalues[keep]) - 1
+			dmd[:len(keep), 1] = np.abs(np.angle(eigenvalues[keep])) / np.pi
+
+	return _unit(np.concatenate([
+		weights['modos'] * _unit(modes.ravel()),
+		weights['energia'] * _unit(energy),
+		weights['dmd'] * _unit(dmd.ravel()),
+	]))
+
+
+def corridor_signatures(matrices, **kwargs):
+	"""
+	Firmas de muchos corredores como matriz (n_corredores × dimensión).
+
+	Args:
+		matrices: Iterable de matrices snapshot sobre el mismo calendario
+		**kwargs: Parámetros de corridor_signature
+	"""
+	return np.vstack([corridor_signature(X, **kwargs) for X in matrices])
+
+
+class SimilarityIndex:
+	"""
+	Índice de vecinos más cercanos (distancia euclídea) sobre firmas.
+
+	Guarda las firmas contiguas y sus normas al cuadrado; una consulta de q
+	firmas es un producto (q × d) · (d × n) y una selección parcial.
+
+	Args:
+		keys: Clave de cada fila (p. ej. (uf, br))
+		F: Firmas (n × d)
+	"""
+
+	def __init__(self, keys, F):
+		self.keys = list(keys)
+		self.F = np.ascontiguousarray(F, dtype=float)
+		self._norms = np.einsum('ij,ij->i', self.F, self.F)
+		self._rows = {key: i for i, key in enumerate(self.keys)}
+
+	def __len__(self):
+		return len(self.keys)
+
+	def search(self, Q, k=10):
+		"""
+		Los k vecinos más cercanos de cada fila de Q.
+
+		Returns:
+			indices (q × k), distances (q × k), de menor a mayor distancia
+		"""
+		Q = np.atleast_2d(np.asarray(Q, dtype=float))
+		k = min(k, len(self))
+		d2 = self._norms[None, :] - 2 * (Q @ self.F.T) + np.einsum('ij,ij->i', Q, Q)[:, None]
+		np.maximum(d2, 0, out=d2)
+
+		nearest = np.argpartition(d2, k - 1, axis=1)[:, :k] if k < len(self) else np.tile(np.arange(len(self)), (len(Q), 1))
+		d2_nearest = np.take_along_axis(d2, nearest, axis=1)
+		order = np.argsort(d2_nearest, axis=1)
+		return np.take_along_axis(nearest, order, axis=1), np.sqrt(np.take_along_axis(d2_nearest, order, axis=1))
+
+	def neighbours(self, key, k=10):
+		"""Los k corredores más parecidos a `key` (sin incluirlo), como lista de (clave, distancia)."""
+		row = self._rows[key]
+		indices, distances = self.search(self.F[row], k + 1)
+		return [(self.keys[i], float(d)) for i, d in zip(indices[0], distances[0]) if i != row][:k]
+
+
+def kmeans(F, n_clusters, n_init=10, max_iter=100, tol=1e-6, rng=None):
+	"""
+	k-means (Lloyd) vectorizado con inicialización k-means++.
+
+	Cada iteración calcula todas las distancias punto-centroide con un
+	producto de matrices y actualiza los centroides con np.add.at.
+
+	Args:
+		F: Puntos (n × d)
+		n_clusters: Número de grupos
+		n_init: Reinicios; se devuelve el de menor inercia
+		tol: Desplazamiento máximo de los centroides para parar
+
+	Returns:
+		labels (n), centroids (n_clusters × d), inertia
+	"""
+	F = np.asarray(F, dtype=float)
+	rng = np.random.default_rng(rng)
+	n = len(F)
+	n_clusters = min(n_clusters, n)
+	norms = np.einsum('ij,ij->i', F, F)
+
+	def sq_distances(C):
+		return np.maximum(norms[:, None] - 2 * (F @ C.T) + np.einsum('ij,ij->i', C, C)[None, :], 0)
+
+	best = (None, None, np.inf)
+	for _ in range(n_init):
+		# k-means++: cada centroide nuevo con probabilidad ∝ distancia² al más cercano
+		C = np.empty((n_clusters, F.shape[1]))
+		C[0] = F[rng.integers(n)]
+		closest = sq_distances(C[:1])[:, 0]
+		for j in range(1, n_clusters):
+			total = closest.sum()
+			C[j] = F[rng.choice(n, p=closest / total)] if total > 0 else F[rng.integers(n)]
+			closest = np.minimum(closest, sq_distances(C[j:j + 1])[:, 0])
+
+		for _ in range(max_iter):
+			labels = np.argmin(sq_distances(C), axis=1)
+			sums = np.zeros_like(C)
+			np.add.at(sums, labels, F)
+			counts = np.bincount(labels, minlength=n_clusters)
+			# Un grupo vacío conserva su centroide
+			C_new = np.where(counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], C)
+			shift = np.max(np.abs(C_new - C))
+			C = C_new
+			if shift < tol:
+				break
+
+		d2 = sq_distances(C)
+		labels = np.argmin(d2, axis=1)
+		inertia = float(d2[np.arange(n), labels].sum())
+		if inertia < best[2]:
+			best = (labels, C, inertia)
+
+	return best
+
+
+def ward_clusters(F, n_clusters):
+	"""
+	Agrupamiento jerárquico de Ward cortado en n_clusters grupos.
+
+	Returns:
+		labels (n, de 0 a n_clusters - 1), Z (matriz de enlace de scipy, para el dendrograma)
+	"""
+	Z = hierarchy.linkage(np.asarray(F, dtype=float), method='ward')
+	labels = hierarchy.fcluster(Z, t=n_clusters, criterion='maxclust') - 1
+	return labels, Z
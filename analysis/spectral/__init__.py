@@ -0,0 +1 @@
+"""Análisis espectral (periodogramas, estacionalidad) de las series de accidentes."""
@@ -0,0 +1,146 @@
+"""
+Estacionalidad de todas las series de accidentes: país, estados y corredores,
+con resolución diaria y mensual.
+
+Para cada combinación nivel × resolución se cargan todas las series como una
+matriz (grupos × períodos), se calculan sus espectros en lote y se guardan
+los períodos dominantes en la tabla `seasonality_periods`:
+- diario: Welch con segmentos de 3 años (resuelve la semana y el año)
+- mensual: periodograma de la serie completa
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import sqlite3
+
+# Raíz del repositorio en el path para los paquetes analysis y pipeline
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from analysis.data import load_series, load_series_matrix
+from analysis.spectral.spectral_core import SIGNIFICANCIA, dominant_periods, periodogram, welch
+from pipeline.instrumentation import print_summary, save_metrics, stage
+
+# ============================================================
+# Configuración
+# ============================================================
+
+DB_PATH = "extracted/analysis_data.db"
+TABLE_NAME = "seasonality_periods"
+
+NIVELES = ('total', 'uf', 'uf_br')
+RESOLUCIONES = ('day', 'month')
+MIN_ACCIDENTES = 100  # Series con menos accidentes no se analizan
+N_PICOS = 3
+SEGMENTO_DIAS = 3 * 365  # Segmento de Welch de las series diarias
+
+# ============================================================
+# Funciones
+# ============================================================
+
+def load_level(nivel, resolucion, min_accidentes=MIN_ACCIDENTES, db_path=DB_PATH):
+	"""
+	Series de un nivel como matriz.
+
+	Returns:
+		keys: (uf, br) de cada fila (None donde no aplica)
+		X: Matriz (n_series × n_períodos)
+	"""
+	if nivel == 'total':
+		_, counts = load_series(resolucion, db_path=db_path)
+		return [(None, None)], counts[None, :].astype(float)
+
+	keys, _, X = load_series_matrix(nivel, resolucion, min_count=min_accidentes, db_path=db_path)
+	return [(key[0], key[1] if len(key) > 1 else None) for key in keys], X
+
+
+def seasonality_table(nivel, resolucion, keys, X, n_picos=N_PICOS):
+	"""Espectros en lote de las filas de X y tabla de sus períodos dominantes."""
+	if resolucion == 'day':
+		freqs, power = welch(X, nperseg=SEGMENTO_DIAS)
+	else:
+		freqs, power = periodogram(X)
+	periods, peak_power, ratios = dominant_periods(freqs, power, n_picos, min_period=2, max_period=X.shape[1] / 2)
+
+	n_series = len(keys)
+	table = pd.DataFrame({
+		'nivel': nivel,
+		'resolucion': resolucion,
+		'uf': np.repeat([uf for uf, _ in keys], n_picos),
+		'br': np.repeat([br for _, br in keys], n_picos),
+		'pico': np.tile(np.arange(1, n_picos + 1), n_series),
+		'periodo': periods.ravel(),
+		'potencia': peak_power.ravel(),
+		'relacion': ratios.ravel(),
+	})
+	table['significativo'] = table['relacion'] >= SIGNIFICANCIA
+	return table.dropna(subset=['periodo'])
+
+
+def print_overview(resultados):
+	"""Períodos dominantes del país y frecuencia de los ciclos semanal y anual entre series."""
+	print("\n" + "="*60)
+	print("ESTACIONALIDAD")
+	print("="*60)
+
+	for resolucion, unidad in (('day', 'días'), ('month', 'meses')):
+		total = resultados[(resultados['nivel'] == 'total') & (resultados['resolucion'] == resolucion)]
+		if not total.empty:
+			print(f"\nPaís ({resolucion}): " + ", ".join(
+				f"{row.periodo:.1f} {unidad} (×{row.relacion:.0f})" for row in total.itertuples()))
+
+	ciclos = [('day', 7, 'semanal'), ('day', 365.25, 'anual'), ('month', 12, 'anual')]
+	for nivel in ('uf', 'uf_br'):
+		for resolucion, periodo, nombre in ciclos:
+			filas = resultados[(resultados['nivel'] == nivel) & (resultados['resolucion'] == resolucion)]
+			n_series = filas.groupby(['uf', 'br'], dropna=False).ngroups
+			if n_series == 0:
+				continue
+			cerca = filas[filas['significativo'] & (np.abs(filas['periodo'] / periodo - 1) < 0.05)]
+			n_con_ciclo = cerca.groupby(['uf', 'br'], dropna=False).ngroups
+			print(f"{nivel} ({resolucion}): ciclo {nombre} significativo en {n_con_ciclo} de {n_series} series")
+	print("="*60)
+
+
+# ============================================================
+# Main
+# ============================================================
+
+def main(niveles=NIVELES, resoluciones=RESOLUCIONES, min_accidentes=MIN_ACCIDENTES):
+	"""Calcula los períodos dominantes de todas las series y los guarda en la base de datos."""
+	print("="*60)
+	print("ESTACIONALIDAD ESPECTRAL")
+	print("="*60)
+
+	tablas = []
+	for nivel in niveles:
+		for resolucion in resoluciones:
+			with stage(f"seasonality.{nivel}.{resolucion}") as metrics:
+				keys, X = load_level(nivel, resolucion, min_accidentes)
+				metrics.rows_in = len(keys)
+				if len(keys) == 0 or X.shape[1] < 4:
+					continue
+				tabla = seasonality_table(nivel, resolucion, keys, X)
+				metrics.rows_out = len(tabla)
+			tablas.append(tabla)
+			print(f"   ✓ {nivel}/{resolucion}: {len(keys)} series de {X.shape[1]} períodos")
+
+	if not tablas:
+		print(f"\n⚠️  Ninguna serie con al menos {min_accidentes} accidentes y 4 períodos; no se guarda {TABLE_NAME}")
+		return
+
+	resultados = pd.concat(tablas, ignore_index=True)
+	with sqlite3.connect(DB_PATH) as conn:
+		resultados.to_sql(TABLE_NAME, conn, if_exists='replace', index=False)
+	print(f"\n   ✓ {len(resultados):,} períodos guardados en {DB_PATH} (tabla {TABLE_NAME})")
+
+	print_overview(resultados)
+
+	print_summary()
+	save_metrics(DB_PATH)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,167 @@
+"""
+Periodogramas y períodos dominantes de muchas series a la vez.
+
+Cada fila de la matriz de entrada es una serie (un estado, un corredor) con
+el mismo calendario. Los espectros se calculan con FFT vectorizadas sobre el
+eje temporal, por lotes de filas, así que miles de series cuestan lo mismo
+que unas pocas FFT grandes:
+- periodogram: periodograma con ventana de Hann (series cortas, p. ej. mensuales)
+- welch: promedio de periodogramas de segmentos (series diarias largas y ruidosas)
+
+Solo depende de numpy y scipy (este, solo en welch).
+"""
+
+import numpy as np
+
+from analysis.linalg import as_float
+
+BATCH_SIZE = 1024  # Series por lote de FFT
+
+# Relación pico/fondo mínima para considerar significativo un período: con
+# ruido blanco la relación con la mediana supera 10 con probabilidad ~2^-10
+SIGNIFICANCIA = 10.0
+
+
+def _detrend_linear(X):
+	"""Resta a cada fila su recta de mínimos cuadrados."""
+	t = np.arange(X.shape[1]) - (X.shape[1] - 1) / 2
+	slope = (X @ t) / (t @ t) if X.shape[1] > 1 else np.zeros(X.shape[0])
+	return X - X.mean(axis=1, keepdims=True) - slope[:, None] * t
+
+
+def periodogram(X, fs=1.0, batch_size=BATCH_SIZE):
+	"""
+	Periodograma de cada fila (tendencia lineal eliminada, ventana de Hann).
+
+	Args:
+		X: Series (n_series × n) o una serie 1D
+		fs: Muestras por unidad de tiempo (1 = frecuencias en ciclos por período)
+
+	Returns:
+		freqs: Frecuencias (n // 2 + 1)
+		power: Densidad espectral (n_series × n_freqs)
+	"""
+	X = np.atleast_2d(as_float(X))
+	n = X.shape[1]
+	window = np.hanning(n) if n > 1 else np.ones(1)
+	scale = 1.0 / (fs * np.sum(window**2))
+
+	freqs = np.fft.rfftfreq(n, d=1.0 / fs)
+	power = np.empty((X.shape[0], len(freqs)))
+	for start in range(0, X.shape[0], batch_size):
+		rows = slice(start, start + batch_size)
+		spectrum = np.fft.rfft(_detrend_linear(X[rows]) * window, axis=1)
+		power[rows] = (spectrum.real**2 + spectrum.imag**2) * scale
+
+	# Espectro unilateral: se duplican todas las frecuencias salvo 0 y Nyquist
+	power[:, 1:n - n // 2] *= 2
+	return freqs, power
+
+
+def welch(X, fs=1.0, nperseg=None, batch_size=BATCH_SIZE):
+	"""
+	Densidad espectral de Welch de cada fila (segmentos con 50% de solape).
+
+	Args:
+		X: Series (n_series × n) o una serie 1D
+		nperseg: Longitud de segmento (por defecto, toda la serie); fija la
+			resolución en frecuencia, 1 / nperseg
+
+	Returns:
+		freqs, power (como periodogram)
+	"""
+	# scipy.signal tarda en importarse: solo lo carga quien usa welch
+	from scipy import signal
+
+	X = np.atleast_2d(as_float(X))
+	nperseg = min(nperseg or X.shape[1], X.shape[1])
+
+	freqs, power = None, np.empty((X.shape[0], nperseg // 2 + 1))
+	for start in range(0, X.shape[0], batch_size):
+		rows = slice(start, start + batch_size)
+		freqs, power[rows] = signal.welch(X[rows], fs=fs, nperseg=nperseg, detrend='linear', axis=-1)
+	return freqs, power
+
+
+def dominant_periods(freqs, power, n_peaks=3, min_period=None, max_period=None):
+	"""
+	Los n_peaks máximos locales de mayor potencia de cada espectro, como períodos.
+
+	La frecuencia de cada pico se refina con una parábola sobre el logaritmo
+	de la potencia en los tres puntos vecinos.
+
+	Args:
+		freqs, power: Salida de periodogram o welch
+		min_period, max_period: Banda de períodos considerada (en 1 / unidades de freqs)
+
+	Returns:
+		periods: Período de cada pico (n_series × n_peaks; NaN si hay menos picos)
+		peak_power: Potencia de cada pico
+		ratios: Potencia del pico / mediana del espectro (relación pico/fondo)
+	"""
+	power = np.atleast_2d(power)
+	n_series = power.shape[0]
+	with np.errstate(divide='ignore'):
+		period_of = np.where(freqs > 0, 1.0 / freqs, np.inf)
+
+	valid = freqs > 0
+	if min_period is not None:
+		valid &= period_of >= min_period
+	if max_period is not None:
+		valid &= period_of <= max_period
+
+	# Máximos locales interiores dentro de la banda
+	is_peak = np.zeros_like(power, dtype=bool)
+	is_peak[:, 1:-1] = (power[:, 1:-1] > power[:, :-2]) & (power[:, 1:-1] >= power[:, 2:])
+	is_peak &= valid
+	candidates = np.where(is_peak, power, -np.inf)
+
+	order = np.argsort(-candidates, axis=1)[:, :n_peaks]
+	found = np.take_along_axis(candidates, order, axis=1) > -np.inf
+	peak_power = np.where(found, np.take_along_axis(power, order, axis=1), np.nan)
+
+	# Interpolación parabólica (en log) del máximo
+	idx = np.clip(order, 1, power.shape[1] - 2)
+	with np.errstate(divide='ignore', invalid='ignore'):
+		left, center, right = (np.log(np.take_along_axis(power, idx + shift, axis=1)) for shift in (-1, 0, 1))
+		delta = 0.5 * (left - right) / (left - 2 * center + right)
+	delta = np.where(np.isfinite(delta), np.clip(delta, -0.5, 0.5), 0.0)
+	step = freqs[1] - freqs[0] if len(freqs) > 1 else 1.0
+	periods = np.where(found, 1.0 / (freqs[idx] + delta * step), np.nan)
+
+	background = np.median(power[:, valid], axis=1, keepdims=True) if valid.any() else np.full((n_series, 1), np.nan)
+	with np.errstate(divide='ignore', invalid='ignore'):
+		ratios = peak_power / background
+
+	return periods, peak_power, ratios
+
+
+def dmd_hints(y, max_period=None, n_peaks=5, significance=SIGNIFICANCIA):
+	"""
+	Rango y retardos DMD sugeridos por el espectro de una serie.
+
+	Cada período significativo necesita un par de autovalores conjugados y
+	la media/tendencia uno más; los retardos cubren el período dominante
+	(p. ej. 12 meses), que es lo que HODMD necesita para resolverlo.
+
+	Args:
+		y: Serie agregada (p. ej. X.sum(axis=0) de la matriz snapshot)
+		max_period: Período máximo considerado (por defecto, la mitad de la serie)
+
+	Returns:
+		Dict con 'period' (dominante o None), 'periods' (significativos),
+		'rank' y 'delays'
+	"""
+	y = np.asarray(y, dtype=float)
+	freqs, power = periodogram(y)
+	periods, _, ratios = dominant_periods(freqs, power, n_peaks, min_period=2,
+	                                      max_period=max_period or len(y) / 2)
+	significant = periods[0][ratios[0] >= significance]
+
+	period = float(significant[0]) if len(significant) else None
+	return {
+		'period': period,
+		'periods': significant,
+		'rank': 1 + 2 * len(significant),
+		'delays': int(round(period)) if period else 1,
+	}
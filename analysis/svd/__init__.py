@@ -0,0 +1 @@
+"""SVD de ventanas deslizantes sobre la serie diaria."""
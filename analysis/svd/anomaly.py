@@ -0,0 +1,221 @@
+"""
+Detección de anomalías en línea sobre la serie diaria con la base POD de ventanas.
+
+La base se calcula una sola vez (SVD de la matriz de ventanas de `window_size`
+días). Cada ventana nueva se puntúa por la norma de su residuo fuera de los
+primeros k modos, r = w - U_k (U_k^T w), en O(k·window_size) sin repetir la SVD.
+Una ventana es anómala si su residuo supera el umbral móvil
+media + n_sigma · desviación de los últimos `history` residuos.
+
+El estado (base, historial de scores y últimos días) se guarda con `save` y se
+recupera con `load`, de modo que un refresco solo procesa los días nuevos.
+
+Solo depende de numpy.
+"""
+
+from collections import deque
+
+import numpy as np
+
+from analysis.svd.svd_core import modes_for_energy, sliding_window_matrix
+
+WINDOW_SIZE = 30
+ENERGY_FRACTION = 0.95
+HISTORY = 365
+N_SIGMA = 3.0
+
+
+def residual_norms(U_k, X):
+	"""Norma del residuo de cada columna de X fuera del subespacio de U_k."""
+	X = np.asarray(X, dtype=float)
+	return np.linalg.norm(X - U_k @ (U_k.T @ X), axis=0)
+
+
+def rolling_thresholds(scores, history=HISTORY, n_sigma=N_SIGMA, prior=()):
+	"""
+	Umbral de cada score calculado con los `history` scores anteriores.
+
+	Args:
+		scores: Scores a evaluar, en orden temporal
+		history: Número de scores previos que definen el umbral
+		n_sigma: Desviaciones sobre la media
+		prior: Scores anteriores a `scores` (historial ya acumulado)
+
+	Returns:
+		Array de umbrales (NaN mientras no haya al menos 2 scores previos)
+	"""
+	prior = np.asarray(prior, dtype=float)[-history:]
+	all_scores = np.concatenate([prior, np.asarray(scores, dtype=float)])
+	s1 = np.concatenate([[0.0], np.cumsum(all_scores)])
+	s2 = np.concatenate([[0.0], np.cumsum(all_scores**2)])
+
+	# Ventana de scores previos [start, end) para cada score nuevo
+	end = np.arange(len(prior), len(all_scores))
+	start = np.maximum(end - history, 0)
+	n = end - start
+
+	with np.errstate(invalid="ignore", divide="ignore"):
+		mean = (s1[end] - s1[start]) / n
+		var = (s2[end] - s2[start]) / n - mean**2
+		thresholds = mean + n_sigma * np.sqrt(np.maximum(var, 0.0))
+	thresholds[n < 2] = np.nan
+
+	return thresholds
+
+
+class ModeAnomalyDetector:
+	"""
+	Detector de anomalías por residuo respecto a la base POD de ventanas.
+
+	API batch: `detect(y)` puntúa todas las ventanas de una serie.
+	API streaming: `update(value)` añade un día y puntúa la ventana que termina en él.
+	"""
+
+	def __init__(self, U_k, history=HISTORY, n_sigma=N_SIGMA, scores=(), recent=()):
+		"""
+		Args:
+			U_k: Base de k modos (window_size × k), columnas ortonormales
+			history: Número de scores previos que definen el umbral
+			n_sigma: Desviaciones sobre la media
+			scores: Scores previos con los que se inicializa el umbral
+			recent: Últimos días observados (para completar la próxima ventana)
+		"""
+		self.U_k = np.ascontiguousarray(U_k, dtype=float)
+		self.window_size = self.U_k.shape[0]
+		self.history = history
+		self.n_sigma = n_sigma
+
+		self._buffer = deque(np.asarray(recent, dtype=float)[-self.window_size:], maxlen=self.window_size)
+		self._scores = deque(np.asarray(scores, dtype=float)[-history:], maxlen=history)
+		self._sum = float(np.sum(self._scores))
+		self._sum_sq = float(np.sum(np.square(self._scores)))
+
+	@classmethod
+	def from_svd(cls, U, S, k=None, energy=ENERGY_FRACTION, **kwargs):
+		"""
+		Crea el detector a partir de una SVD ya calculada de la matriz de ventanas.
+
+		Args:
+			U, S: SVD de la matriz de ventanas
+			k: Número de modos (por defecto, los que capturan `energy`)
+			energy: Fracción de energía usada si k es None
+		"""
+		if k is None:
+			k = modes_for_energy(S, energy)
+		return cls(U[:, :k], **kwargs)
+
+	@classmethod
+	def fit(cls, y, window_size=WINDOW_SIZE, k=None, energy=ENERGY_FRACTION,
+	        history=HISTORY, n_sigma=N_SIGMA):
+		"""
+		Calcula la base POD de la serie y deja el detector listo para recibir días nuevos.
+
+		Los scores de las ventanas de entrenamiento inicializan el umbral móvil.
+
+		Args:
+			y: Serie diaria histórica
+			window_size: Días por ventana
+			k: Número de modos (por defecto, los que capturan `energy`)
+			energy: Fracción de energía usada si k es None
+		"""
+		X = sliding_window_matrix(y, window_size)
+		U, S, _ = np.linalg.svd(X, full_matrices=False)
+		if k is None:
+			k = modes_for_energy(S, energy)
+
+		U_k = U[:, :k]
+		return cls(U_k, history=history, n_sigma=n_sigma,
+		           scores=residual_norms(U_k, X), recent=y)
+
+	@property
+	def k(self):
+		"""Número de modos de la base."""
+		return self.U_k.shape[1]
+
+	@property
+	def threshold(self):
+		"""Umbral actual (NaN mientras no haya al menos 2 scores)."""
+		n = len(self._scores)
+		if n < 2:
+			return np.nan
+		mean = self._sum / n
+		var = max(self._sum_sq / n - mean**2, 0.0)
+		return mean + self.n_sigma * np.sqrt(var)
+
+	def save(self, path, **extra):
+		"""
+		Guarda la base, el historial de scores y los últimos días en un .npz.
+
+		Args:
+			path: Archivo de destino
+			**extra: Arrays adicionales guardados junto al estado (p. ej. la última fecha procesada)
+		"""
+		np.savez(path, U_k=self.U_k, history=self.history, n_sigma=self.n_sigma,
+		         scores=np.asarray(self._scores, dtype=float),
+		         recent=np.asarray(self._buffer, dtype=float), **extra)
+
+	@classmethod
+	def load(cls, path):
+		"""
+		Recupera un detector guardado con `save`.
+
+		Returns:
+			(detector, extra): el detector con su historial y un dict con los arrays adicionales
+		"""
+		with np.load(path, allow_pickle=False) as data:
+			state = {name: data[name] for name in data.files}
+
+		detector = cls(state.pop("U_k"), history=int(state.pop("history")), n_sigma=float(state.pop("n_sigma")),
+		               scores=state.pop("scores"), recent=state.pop("recent"))
+		return detector, state
+
+	def score(self, window):
+		"""Norma del residuo de una ventana de `window_size` días (O(k·window_size))."""
+		w = np.asarray(window, dtype=float)
+		return float(np.linalg.norm(w - self.U_k @ (self.U_k.T @ w)))
+
+	def _push_score(self, score):
+		if len(self._scores) == self._scores.maxlen:
+			old = self._scores[0]
+			self._sum -= old
+			self._sum_sq -= old * old
+		self._scores.append(score)
+		self._sum += score
+		self._sum_sq += score * score
+
+	def update(self, value):
+		"""
+		Añade un día y puntúa la ventana de los últimos `window_size` días.
+
+		El score se compara con el umbral de los scores anteriores y después
+		pasa a formar parte del historial.
+
+		Returns:
+			(score, threshold, is_anomaly), o None mientras la ventana no esté completa
+		"""
+		self._buffer.append(float(value))
+		if len(self._buffer) < self.window_size:
+			return None
+
+		score = self.score(self._buffer)
+		threshold = self.threshold
+		self._push_score(score)
+
+		return score, threshold, bool(score > threshold)
+
+	def detect(self, y):
+		"""
+		Puntúa todas las ventanas de una serie sin modificar el estado del detector.
+
+		Equivale a llamar a `update` día a día con la serie (partiendo del
+		historial de scores actual y de una ventana vacía), pero vectorizado.
+
+		Returns:
+			scores, thresholds, flags: un valor por ventana (ventana j = días j..j+window_size-1)
+		"""
+		scores = residual_norms(self.U_k, sliding_window_matrix(y, self.window_size))
+		thresholds = rolling_thresholds(scores, self.history, self.n_sigma, prior=list(self._scores))
+		with np.errstate(invalid="ignore"):
+			flags = scores > thresholds
+
+		return scores, thresholds, flags
@@ -0,0 +1,76 @@
+"""
+SVD/POD de ventanas deslizantes sobre una serie temporal.
+
+Cada columna de la matriz de snapshots es una ventana de `window_size` días
+consecutivos de la serie. Solo depende de numpy.
+"""
+
+import numpy as np
+
+
+def sliding_window_matrix(y, window_size, dtype=float):
+	"""
+	Matriz de snapshots (window_size × n_windows) con una ventana por columna.
+
+	Con dtype='float32' la matriz ocupa la mitad.
+
+	Returns:
+		X: Copia contigua de las ventanas de y
+	"""
+	return np.lib.stride_tricks.sliding_window_view(np.asarray(y, dtype=dtype), window_size).T.copy()
+
+
+def diagonal_average(X):
+	"""
+	Serie diaria a partir de una matriz de ventanas (inversa de sliding_window_matrix).
+
+	El día t aparece en X[i, t - i] para cada posición i de la ventana; se
+	promedian esas apariciones.
+	"""
+	window_size, n_windows = X.shape
+	total = np.zeros(window_size + n_windows - 1)
+	counts = np.zeros(window_size + n_windows - 1)
+	for i in range(window_size):
+		total[i:i + n_windows] += X[i]
+		counts[i:i + n_windows] += 1
+	return total / counts
+
+
+def cumulative_energy(S):
+	"""Fracción de energía acumulada por los primeros k modos (k = 1..len(S))."""
+	energy = S**2
+	return np.cumsum(energy) / np.sum(energy)
+
+
+def modes_for_energy(S, fraction=0.95):
+	"""Número de modos necesario para capturar `fraction` de la energía."""
+	return int(np.searchsorted(cumulative_energy(S), fraction) + 1)
+
+
+def reconstruction_errors(S):
+	"""
+	Error ||X - X_k||_F de la reconstrucción con k modos, para k = 1..len(S).
+
+	Por Eckart–Young el error es la raíz de la energía de los modos descartados,
+	así que no hace falta reconstruir X_k.
+	"""
+	tail_energy = np.cumsum((S**2)[::-1])[::-1]
+	return np.sqrt(np.append(tail_energy[1:], 0.0))
+
+
+def reconstruct(U, S, Vt, k, columns=None):
+	"""
+	Reconstrucción de rango k (opcionalmente solo de algunas columnas).
+
+	Args:
+		U, S, Vt: SVD de X
+		k: Número de modos
+		columns: Índice/slice de columnas a reconstruir (todas por defecto)
+	"""
+	V_k = Vt[:k, :] if columns is None else Vt[:k, columns]
+	return (U[:, :k] * S[:k]) @ V_k
+
+
+def window_errors(X, U, S, Vt, k):
+	"""Error de reconstrucción de cada ventana (columna) con k modos."""
+	return np.linalg.norm(X - reconstruct(U, S, Vt, k), axis=0)
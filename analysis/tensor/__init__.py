@@ -0,0 +1 @@
+"""Descomposiciones tensoriales (HOSVD/Tucker, CP) de cubos de conteos."""
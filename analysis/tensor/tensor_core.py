@@ -0,0 +1,232 @@
+"""
+Tensores dispersos de conteos y sus descomposiciones HOSVD/Tucker y CP.
+
+Los tensores se guardan en formato coordenado (una fila de índices por celda
+no nula). Todas las operaciones trabajan sobre las celdas no nulas, por lotes:
+- Gram de cada desdoblamiento X_(n) X_(n)^T con una matriz dispersa
+- Productos modo-n con todos los factores (núcleo de Tucker, HOOI) y MTTKRP (CP)
+  acumulados celda a celda
+
+Nunca se materializa un desdoblamiento denso, así que la memoria depende del
+número de celdas no nulas y de los rangos, no del tamaño del cubo completo.
+"""
+
+import string
+
+import numpy as np
+from scipy import sparse
+
+BATCH_SIZE = 100000
+
+
+class SparseTensor:
+	"""
+	Tensor disperso en formato coordenado.
+
+	Attributes:
+		coords: Índices de las celdas no nulas (nnz × n_modos)
+		values: Valores de esas celdas
+		shape: Tamaño de cada modo
+		labels: Etiquetas de los índices de cada modo (opcional)
+		modes: Nombres de los modos (opcional)
+	"""
+
+	def __init__(self, coords, values, shape, labels=None, modes=None):
+		self.coords = np.asarray(coords, dtype=np.int64)
+		self.values = np.asarray(values, dtype=float)
+		self.shape = tuple(int(size) for size in shape)
+		self.labels = labels
+		self.modes = modes
+
+	@property
+	def ndim(self):
+		return len(self.shape)
+
+	@property
+	def nnz(self):
+		return len(self.values)
+
+	def norm(self):
+		"""Norma de Frobenius."""
+		return float(np.sqrt(np.sum(self.values**2)))
+
+	def unfolding(self, mode):
+		"""Desdoblamiento modo-n como matriz dispersa (shape[mode] × resto)."""
+		others = [m for m in range(self.ndim) if m != mode]
+		columns = np.ravel_multi_index(self.coords[:, others].T, [self.shape[m] for m in others])
+		n_columns = int(np.prod([self.shape[m] for m in others]))
+		return sparse.csr_matrix((self.values, (self.coords[:, mode], columns)), shape=(self.shape[mode], n_columns))
+
+	def gram(self, mode):
+		"""X_(n) X_(n)^T (shape[mode] × shape[mode]), denso."""
+		X_n = self.unfolding(mode)
+		return (X_n @ X_n.T).toarray()
+
+	def to_dense(self):
+		"""Tensor denso (solo para cubos pequeños)."""
+		dense = np.zeros(self.shape)
+		np.add.at(dense, tuple(self.coords.T), self.values)
+		return dense
+
+
+def _batches(tensor, batch_size):
+	for start in range(0, tensor.nnz, batch_size):
+		stop = min(start + batch_size, tensor.nnz)
+		yield tensor.coords[start:stop], tensor.values[start:stop]
+
+
+def multi_mode_product(tensor, factors, skip=None, batch_size=BATCH_SIZE):
+	"""
+	X ×_1 A_1^T ×_2 A_2^T ... (saltando el modo `skip`), celda a celda.
+
+	Args:
+		tensor: SparseTensor
+		factors: Matriz (shape[m] × r_m) de cada modo
+		skip: Modo que no se contrae (su índice se conserva)
+
+	Returns:
+		Tensor denso de tamaño r_1 × ... × r_N (con shape[skip] en el modo `skip`)
+	"""
+	letters = string.ascii_lowercase
+	subscripts = []
+	for m in range(tensor.ndim):
+		if m != skip:
+			subscripts.append("z" + letters[m])
+	output = "".join(letters[m] if m != skip else "y" for m in range(tensor.ndim))
+	out_shape = [factors[m].shape[1] if m != skip else tensor.shape[m] for m in range(tensor.ndim)]
+
+	result = np.zeros(out_shape)
+	for coords, values in _batches(tensor, batch_size):
+		operands = [values] + [factors[m][coords[:, m]] for m in range(tensor.ndim) if m != skip]
+		if skip is None:
+			result += np.einsum(",".join(["z"] + subscripts) + "->" + output, *operands)
+		else:
+			# El modo conservado se acumula por su índice
+			contracted = np.einsum(",".join(["z"] + subscripts) + "->z" + output.replace("y", ""), *operands)
+			moved = np.zeros([tensor.shape[skip]] + [out_shape[m] for m in range(tensor.ndim) if m != skip])
+			np.add.at(moved, coords[:, skip], contracted)
+			result += np.moveaxis(moved, 0, skip)
+
+	return result
+
+
+def hosvd(tensor, ranks):
+	"""
+	HOSVD truncada.
+
+	Cada factor son los vectores propios principales de la Gram del
+	desdoblamiento; el núcleo se obtiene contrayendo las celdas no nulas.
+
+	Args:
+		tensor: SparseTensor
+		ranks: Rango de cada modo
+
+	Returns:
+		core: Núcleo denso (r_1 × ... × r_N)
+		factors: Lista de matrices ortonormales (shape[m] × r_m)
+		singular_values: Valores singulares de cada desdoblamiento (energía por modo)
+	"""
+	factors, singular_values = [], []
+	for mode, rank in enumerate(ranks):
+		eigenvalues, eigenvectors = np.linalg.eigh(tensor.gram(mode))
+		order = np.argsort(eigenvalues)[::-1]
+		factors.append(eigenvectors[:, order[:rank]])
+		singular_values.append(np.sqrt(np.maximum(eigenvalues[order], 0.0)))
+
+	core = multi_mode_product(tensor, factors)
+	return core, factors, singular_values
+
+
+def tucker(tensor, ranks, n_iter=10, tol=1e-6):
+	"""
+	Tucker por HOOI (iteraciones ortogonales), inicializado con la HOSVD.
+
+	Returns:
+		core, factors, fit (1 - error relativo)
+	"""
+	core, factors, _ = hosvd(tensor, ranks)
+	norm_x = tensor.norm()
+	fit = 1 - np.sqrt(max(norm_x**2 - np.sum(core**2), 0.0)) / norm_x
+
+	for _ in range(n_iter):
+		for mode in range(tensor.ndim):
+			Y = multi_mode_product(tensor, factors, skip=mode)
+			Y_n = np.moveaxis(Y, mode, 0).reshape(tensor.shape[mode], -1)
+			U, _, _ = np.linalg.svd(Y_n, full_matrices=False)
+			factors[mode] = U[:, :ranks[mode]]
+
+		core = multi_mode_product(tensor, factors)
+		# Con factores ortonormales ||X - X̂||² = ||X||² - ||G||²
+		new_fit = 1 - np.sqrt(max(norm_x**2 - np.sum(core**2), 0.0)) / norm_x
+		converged = abs(new_fit - fit) < tol
+		fit = new_fit
+		if converged:
+			break
+
+	return core, factors, fit
+
+
+def mttkrp(tensor, factors, mode, batch_size=BATCH_SIZE):
+	"""
+	Producto del desdoblamiento modo-n por el Khatri–Rao de los demás factores,
+	acumulado celda a celda (shape[mode] × R).
+	"""
+	rank = factors[0].shape[1]
+	result = np.zeros((tensor.shape[mode], rank))
+	for coords, values in _batches(tensor, batch_size):
+		rows = values[:, None] * np.ones((1, rank))
+		for m in range(tensor.ndim):
+			if m != mode:
+				rows *= factors[m][coords[:, m]]
+		np.add.at(result, coords[:, mode], rows)
+	return result
+
+
+def cp_als(tensor, rank, n_iter=100, tol=1e-6, rng=None):
+	"""
+	Descomposición CP (PARAFAC) por mínimos cuadrados alternados.
+
+	X ≈ Σ_r weights[r] · a_1r ∘ a_2r ∘ ... ∘ a_Nr
+
+	Args:
+		tensor: SparseTensor
+		rank: Número de componentes
+		rng: Generador o semilla de la inicialización
+
+	Returns:
+		weights: Peso de cada componente (ordenados de mayor a menor)
+		factors: Lista de matrices (shape[m] × rank) con columnas de norma 1
+		fit: 1 - error relativo
+	"""
+	rng = np.random.default_rng(rng)
+	factors = [rng.random((size, rank)) for size in tensor.shape]
+	weights = np.ones(rank)
+	norm_x = tensor.norm()
+	fit = 0.0
+
+	for _ in range(n_iter):
+		for mode in range(tensor.ndim):
+			V = np.ones((rank, rank))
+			for m in range(tensor.ndim):
+				if m != mode:
+					V *= factors[m].T @ factors[m]
+			A = mttkrp(tensor, factors, mode) @ np.linalg.pinv(V)
+			weights = np.linalg.norm(A, axis=0)
+			weights[weights == 0] = 1.0
+			factors[mode] = A / weights
+
+		# ||X - X̂||² = ||X||² - 2<X, X̂> + ||X̂||², sin reconstruir X̂
+		V = np.ones((rank, rank))
+		for m in range(tensor.ndim):
+			V *= factors[m].T @ factors[m]
+		norm_approx_sq = weights @ V @ weights
+		inner = np.sum(mttkrp(tensor, factors, tensor.ndim - 1) * factors[-1] * weights)
+		new_fit = 1 - np.sqrt(max(norm_x**2 - 2 * inner + norm_approx_sq, 0.0)) / norm_x
+
+		converged = abs(new_fit - fit) < tol
+		fit = new_fit
+		if converged:
+			break
+
+	order = np.argsort(weights)[::-1]
+	return weights[order], [factor[:, order] for factor in factors], fit
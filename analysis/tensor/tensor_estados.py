@@ -0,0 +1,110 @@
+"""
+Análisis tensorial: estados × causa del accidente × mes
+
+Extiende el POD de estados (estados × meses) con la dimensión de causa:
+- HOSVD/Tucker: energía de cada modo y núcleo que acopla estados, causas y tiempo
+- CP: componentes interpretables (cada una = perfil de estados × causas × evolución temporal)
+
+El tensor se arma con una consulta agregada sobre `accidents_fact` y solo
+contiene las celdas no nulas.
+"""
+
+import os
+import sys
+
+import numpy as np
+
+# Raíz del repositorio en el path para los paquetes analysis y pipeline
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from analysis.data import load_count_tensor
+from analysis.tensor.tensor_core import cp_als, tucker
+from pipeline.instrumentation import print_summary, save_metrics, stage
+
+# ============================================================
+# Configuración
+# ============================================================
+
+DB_PATH = "extracted/analysis_data.db"
+
+MODOS = ['uf', 'causa_acidente', 'mes_anio']
+RANGOS_TUCKER = (5, 5, 8)
+N_COMPONENTES_CP = 4
+
+# ============================================================
+# Funciones
+# ============================================================
+
+def print_tucker(tensor, core, factors, fit):
+	"""Imprime la energía capturada por cada modo de la descomposición Tucker."""
+	print("\n" + "="*60)
+	print("TUCKER (HOOI)")
+	print("="*60)
+	print(f"Tensor: {' × '.join(f'{size} {mode}' for size, mode in zip(tensor.shape, tensor.modes))} "
+	      f"({tensor.nnz:,} celdas no nulas)")
+	print(f"Rangos: {tuple(f.shape[1] for f in factors)}")
+	print(f"Ajuste (1 - error relativo): {fit:.3f}")
+
+	# Energía del núcleo por índice de cada modo
+	energia = core**2
+	for mode, name in enumerate(tensor.modes):
+		por_modo = energia.sum(axis=tuple(m for m in range(core.ndim) if m != mode))
+		print(f"  {name}: " + ", ".join(f"{100 * e / energia.sum():.1f}%" for e in por_modo))
+
+
+def print_cp(tensor, weights, factors, fit, top=3):
+	"""Imprime, para cada componente CP, los estados y causas con más peso."""
+	print("\n" + "="*60)
+	print("CP (PARAFAC)")
+	print("="*60)
+	print(f"Ajuste (1 - error relativo): {fit:.3f}")
+
+	for r, weight in enumerate(weights):
+		print(f"\nComponente {r+1} (peso {weight:.1f}):")
+		for mode, name in enumerate(tensor.modes[:-1]):
+			loadings = factors[mode][:, r]
+			idx = np.argsort(np.abs(loadings))[::-1][:top]
+			print(f"  {name}: " + ", ".join(f"{tensor.labels[mode][i]} ({loadings[i]:+.2f})" for i in idx))
+
+		temporal = factors[-1][:, r]
+		pico = int(np.argmax(np.abs(temporal)))
+		print(f"  {tensor.modes[-1]}: máximo en {tensor.labels[-1][pico]}")
+
+
+# ============================================================
+# Main
+# ============================================================
+
+def main(modos=MODOS, rangos=RANGOS_TUCKER, n_componentes=N_COMPONENTES_CP):
+	"""Ejecuta las descomposiciones Tucker y CP del tensor de conteos."""
+	print("="*60)
+	print(f"ANÁLISIS TENSORIAL: {' × '.join(modos)}")
+	print("="*60)
+
+	print("\n1. Construyendo tensor disperso...")
+	with stage("tensor.load") as metrics:
+		tensor = load_count_tensor(modos, db_path=DB_PATH)
+		metrics.rows_out = tensor.nnz
+	print(f"   ✓ Tensor {tensor.shape} con {tensor.nnz:,} celdas no nulas")
+
+	rangos = tuple(min(r, size) for r, size in zip(rangos, tensor.shape))
+
+	print(f"\n2. Tucker (rangos {rangos})...")
+	with stage("tensor.tucker", rows_in=tensor.nnz):
+		core, factors, fit = tucker(tensor, rangos)
+	print_tucker(tensor, core, factors, fit)
+
+	print(f"\n3. CP ({n_componentes} componentes)...")
+	with stage("tensor.cp_als", rows_in=tensor.nnz):
+		weights, cp_factors, cp_fit = cp_als(tensor, n_componentes, rng=0)
+	print_cp(tensor, weights, cp_factors, cp_fit)
+
+	print("\n✅ Análisis tensorial completado!")
+	print("="*60)
+
+	print_summary()
+	save_metrics(DB_PATH)
+
+
+if __name__ == "__main__":
+	main()
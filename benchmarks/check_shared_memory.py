@@ -0,0 +1,77 @@
+"""
+Check that pool workers release the shared memory of closed SharedArrays.
+
+A pool that outlives several SharedArrays (one per matrix, bootstrap or
+backtest) must not keep the segments of the closed ones mapped. This script
+publishes `--generations` matrices one after another to the same pool of
+workers and reads Shmem from /proc/meminfo after closing each one. With the
+pool still alive, Shmem must be back at its baseline every time. Linux only.
+
+Usage:
+    python benchmarks/check_shared_memory.py
+    python benchmarks/check_shared_memory.py --size-mb 256 --generations 8
+"""
+
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+from analysis.shared import SharedArrays, attach, shared_task
+
+# Shmem changes of other processes on the machine below this are treated as noise
+TOLERANCE_MB = 16.0
+
+
+def shmem_mb():
+    """System-wide shared memory (Shmem in /proc/meminfo) in MB."""
+    with open("/proc/meminfo") as f:
+        for line in f:
+            if line.startswith("Shmem:"):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError("Shmem not found in /proc/meminfo")
+
+
+@shared_task
+def _touch(handle):
+    """Worker task: read every page of the shared matrix."""
+    return float(attach(handle)["X"].sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that workers release the shared memory of closed SharedArrays")
+    parser.add_argument("--size-mb", type=int, default=128, help="Size of each published matrix")
+    parser.add_argument("--generations", type=int, default=5, help="SharedArrays published one after another")
+    parser.add_argument("--jobs", type=int, default=2)
+    args = parser.parse_args()
+
+    if not os.path.exists("/proc/meminfo"):
+        print("Shmem is only available on Linux, nothing to check.")
+        return 0
+
+    X = np.ones((args.size_mb, 1 << 17))  # 1 MB per row of float64
+    baseline = shmem_mb()
+    print(f"Baseline Shmem: {baseline:.1f} MB ({args.generations} generations of {args.size_mb} MB, {args.jobs} workers)")
+
+    failed = False
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        for generation in range(args.generations):
+            with SharedArrays({"X": X}) as shared:
+                list(executor.map(_touch, [shared.handle] * (4 * args.jobs)))
+            excess = shmem_mb() - baseline
+            ok = excess <= TOLERANCE_MB
+            failed = failed or not ok
+            print(f"  generation {generation + 1}: +{excess:.1f} MB after close {'ok' if ok else 'LEAK'}")
+
+    print("Shared memory released." if not failed else "Workers kept closed segments mapped.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
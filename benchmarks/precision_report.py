@@ -0,0 +1,198 @@
+"""
+Memory and accuracy of the float32 / memory-mapped analysis backend.
+
+Builds a synthetic snapshot matrix (Poisson counts of a low-rank intensity,
+space × months) and runs POD and DMD on it with every dtype policy, each in
+its own process. For every configuration it reports the peak RSS increment,
+the peak of numpy allocations (tracemalloc) and the error against the float64
+reference: relative error of the leading singular values, largest principal
+angle between the leading POD subspaces and distance to the reference DMD
+eigenvalues.
+
+Usage:
+    python benchmarks/precision_report.py
+    python benchmarks/precision_report.py --rows 200000 --months 300
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import tracemalloc
+
+import numpy as np
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCHMARKS_DIR)
+
+
+# ============================================================
+# Configurations
+# Each one loads the matrix itself, so its input counts in its peak.
+# ============================================================
+
+def pod_float64_copy(paths, k):
+    from analysis.pod.pod_core import compute_pod
+    U, S, _, _ = compute_pod(np.load(paths["float64"]), center=True)
+    return {"S": S[:k], "U": U[:, :k]}
+
+
+def pod_float64_in_place(paths, k):
+    from analysis.pod.pod_core import compute_pod
+    U, S, _, _ = compute_pod(np.load(paths["float64"]), center=True, overwrite=True)
+    return {"S": S[:k], "U": U[:, :k]}
+
+
+def pod_float32_in_place(paths, k):
+    from analysis.pod.pod_core import compute_pod
+    U, S, _, _ = compute_pod(np.load(paths["float32"]), center=True, overwrite=True)
+    return {"S": S[:k], "U": U[:, :k]}
+
+
+def pod_float32_memmap(paths, k):
+    from analysis.pod.pod_core import compute_pod
+    # A memmap input goes through centered_svd
+    U, S, _, _ = compute_pod(np.load(paths["float32"], mmap_mode="r"), center=True)
+    return {"S": S[:k], "U": U[:, :k]}
+
+
+def dmd_float64(paths, k):
+    from analysis.dmd.dmd_core import dmd_exact
+    from analysis.linalg import center_rows
+    X_centered, _ = center_rows(np.load(paths["float64"]), overwrite=True)
+    _, eigenvalues, _ = dmd_exact(X_centered, r=k)
+    return {"eigenvalues": eigenvalues}
+
+
+def dmd_float32(paths, k):
+    from analysis.dmd.dmd_core import dmd_exact
+    from analysis.linalg import center_rows
+    X_centered, _ = center_rows(np.load(paths["float32"]), overwrite=True)
+    _, eigenvalues, _ = dmd_exact(X_centered, r=k)
+    return {"eigenvalues": eigenvalues}
+
+
+# (name, function, reference configuration for the error columns)
+CONFIGURATIONS = [
+    ("pod float64 (centered copy)", pod_float64_copy, None),
+    ("pod float64 (in place)", pod_float64_in_place, "pod float64 (centered copy)"),
+    ("pod float32 (in place)", pod_float32_in_place, "pod float64 (centered copy)"),
+    ("pod float32 (memmap, Gram)", pod_float32_memmap, "pod float64 (centered copy)"),
+    ("dmd float64", dmd_float64, None),
+    ("dmd float32", dmd_float32, "dmd float64"),
+]
+
+
+# ============================================================
+# Runner
+# ============================================================
+
+def generate_matrix(workdir, rows, months, rank, seed):
+    """Poisson counts of a rank-`rank` seasonal intensity, stored as float64 and float32 .npy files."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(months)
+    temporal = np.vstack([1 + 0.5 * np.sin(2 * np.pi * (j + 1) * t / 12 + rng.uniform(0, 2 * np.pi)) for j in range(rank)])
+    spatial = rng.gamma(2.0, 1.0, size=(rows, rank))
+    X = rng.poisson(spatial @ temporal).astype(np.float64)
+
+    paths = {"float64": os.path.join(workdir, "X_float64.npy"), "float32": os.path.join(workdir, "X_float32.npy")}
+    np.save(paths["float64"], X)
+    np.save(paths["float32"], X.astype(np.float32))
+    return paths
+
+
+def _worker(name, paths, k, queue):
+    """Run one configuration in a fresh process and report its memory and outputs."""
+    sys.path.insert(0, REPO_ROOT)
+    from pipeline.instrumentation import peak_rss_mb
+    function = {config_name: function for config_name, function, _ in CONFIGURATIONS}[name]
+
+    # Imports first, so they do not count in the increment
+    import analysis.dmd.dmd_core, analysis.linalg, analysis.pod.pod_core  # noqa: F401
+    rss_before = peak_rss_mb()
+
+    tracemalloc.start()
+    output = function(paths, k)
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    rss_after = peak_rss_mb()
+    queue.put({
+        "name": name,
+        "rss_mb": rss_after - rss_before if rss_before is not None else None,
+        "traced_mb": traced_peak / 1024 / 1024,
+        "output": output,
+    })
+
+
+def principal_angle_deg(U_a, U_b):
+    """Largest principal angle between the column spaces of two orthonormal bases."""
+    cosines = np.linalg.svd(U_a.astype(np.float64).T @ U_b.astype(np.float64), compute_uv=False)
+    return float(np.degrees(np.arccos(np.clip(cosines.min(), -1.0, 1.0))))
+
+
+def compare(output, reference):
+    """Error columns of a configuration against its reference."""
+    if "S" in output:
+        S, S_ref = output["S"].astype(np.float64), reference["S"]
+        return {
+            "sv_rel_err": float(np.max(np.abs(S - S_ref) / S_ref)),
+            "angle_deg": principal_angle_deg(output["U"], reference["U"]),
+        }
+    eigenvalues = output["eigenvalues"].astype(np.complex128)
+    distances = np.abs(reference["eigenvalues"][:, None] - eigenvalues[None, :]).min(axis=1)
+    return {"eig_err": float(distances.max())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory and accuracy of the float32 / memmap analysis backend")
+    parser.add_argument("--rows", type=int, default=50000, help="Spatial bins (rows of X)")
+    parser.add_argument("--months", type=int, default=240, help="Snapshots (columns of X)")
+    parser.add_argument("--rank", type=int, default=5, help="Rank of the synthetic intensity")
+    parser.add_argument("--modes", type=int, default=10, help="POD modes / DMD rank compared")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="datatran_precision_")
+    context = multiprocessing.get_context("spawn")
+    outputs, rows = {}, []
+    try:
+        # In a child process: a forked worker starts with this process's RSS as its peak
+        with context.Pool(1) as pool:
+            paths = pool.apply(generate_matrix, (workdir, args.rows, args.months, args.rank, args.seed))
+        print(f"Synthetic snapshot matrix: {args.rows:,} × {args.months} "
+              f"({os.path.getsize(paths['float64']) / 1024 / 1024:.0f} MB as float64)")
+
+        for name, _, reference in CONFIGURATIONS:
+            queue = context.Queue()
+            process = context.Process(target=_worker, args=(name, paths, args.modes, queue))
+            process.start()
+            result = queue.get()
+            process.join()
+
+            outputs[name] = result["output"]
+            errors = compare(result["output"], outputs[reference]) if reference else {}
+            rows.append((name, result["rss_mb"], result["traced_mb"], errors))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print("\n" + "=" * 96)
+    print(f"{'Configuration':<30}{'Peak RSS +MB':>14}{'numpy peak MB':>15}{'SV rel. err':>13}{'Angle (deg)':>12}{'Eig. err':>12}")
+    print("-" * 96)
+    for name, rss, traced, errors in rows:
+        rss_text = f"{rss:.1f}" if rss is not None else "n/a"
+        error_text = "".join(
+            f"{errors[key]:>{width}.2e}" if key in errors else f"{'-':>{width}}"
+            for key, width in (("sv_rel_err", 13), ("angle_deg", 12), ("eig_err", 12))
+        )
+        print(f"{name:<30}{rss_text:>14}{traced:>15.1f}{error_text}")
+    print("=" * 96)
+    print("Peak RSS counts the mapped file pages of the memmap run; the numpy peak does not include LAPACK workspaces.")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
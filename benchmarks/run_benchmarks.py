@@ -0,0 +1,340 @@
+"""
+Benchmark harness for the ETL and analysis pipeline.
+
+Generates a synthetic dataset (see synthetic_datatran.py) in a temporary
+working directory and runs every stage in its own process, recording wall
+time, CPU time and peak RSS. Results are compared against a stored baseline
+so that performance regressions show up offline.
+
+Usage:
+    python benchmarks/run_benchmarks.py                  # run and compare with baseline
+    python benchmarks/run_benchmarks.py --save-baseline  # run and store as new baseline
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCHMARKS_DIR)
+BASELINE_PATH = os.path.join(BENCHMARKS_DIR, "baseline.json")
+RESULTS_DIR = os.path.join(BENCHMARKS_DIR, "results")
+
+# Differences below these floors are treated as noise
+MIN_WALL_DIFF_S = 0.05
+MIN_RSS_DIFF_MB = 10.0
+
+
+# ============================================================
+# Stages
+# Each stage does its setup (imports, loading inputs) and returns
+# the zero-argument callable that is actually timed.
+# ============================================================
+
+def _add_import_paths():
+    for path in (REPO_ROOT, os.path.join(REPO_ROOT, "etl")):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+
+def _busiest_corridor():
+    """(uf, br) with the most accidents in the synthetic analysis database."""
+    import sqlite3
+    with sqlite3.connect("extracted/analysis_data.db") as conn:
+        return conn.execute("""
+            SELECT uf, br FROM rollup_uf_br_km10_month
+            GROUP BY uf, br ORDER BY SUM(count) DESC LIMIT 1
+        """).fetchone()
+
+
+def _corridor_matrix():
+    from analysis.data import build_snapshot_matrix, load_spatial_data
+    from pipeline.stages import DEFAULT_BIN_SIZE
+    uf, br = _busiest_corridor()
+    X, _, _ = build_snapshot_matrix(load_spatial_data(uf, br, bin_size=DEFAULT_BIN_SIZE))
+    return X
+
+
+def stage_create_sqlite_db(params):
+    from create_sqlite_db import create_sqlite_db
+    return create_sqlite_db
+
+
+def stage_extract_timeseries(params):
+    from extract_timeseries import extract_timeseries
+    return extract_timeseries
+
+
+def stage_extract_spatial(params):
+    from extract_spatial import extract_spatial
+    return extract_spatial
+
+
+def stage_extract_rollups(params):
+    from extract_rollups import extract_rollups
+    return extract_rollups
+
+
+def stage_extract_km_index(params):
+    from extract_km_index import extract_km_index
+    return extract_km_index
+
+
+def stage_extract_facts(params):
+    from extract_facts import extract_facts
+    return extract_facts
+
+
+def stage_build_snapshot_matrix(params):
+    from analysis.data import build_snapshot_matrix, load_spatial_data
+    from pipeline.stages import DEFAULT_BIN_SIZE
+    uf, br = _busiest_corridor()
+
+    def run():
+        return build_snapshot_matrix(load_spatial_data(uf, br, bin_size=DEFAULT_BIN_SIZE))
+
+    return run
+
+
+def stage_compute_pod(params):
+    from analysis.pod.pod_core import compute_pod
+    X = _corridor_matrix()
+    return lambda: compute_pod(X, center=True)
+
+
+def stage_dmd_exact(params):
+    from analysis.dmd.dmd_core import dmd_exact
+    from pipeline.stages import DEFAULT_RANK
+    X = _corridor_matrix()
+    X_centered = X - X.mean(axis=1, keepdims=True)
+    r = min(DEFAULT_RANK, X.shape[0], X.shape[1] - 1)
+    return lambda: dmd_exact(X_centered, r=r)
+
+
+# (name, setup function, repetitions: ETL stages mutate state and run once)
+STAGES = [
+    ("create_sqlite_db", stage_create_sqlite_db, False),
+    ("extract_timeseries", stage_extract_timeseries, False),
+    ("extract_spatial", stage_extract_spatial, False),
+    ("extract_rollups", stage_extract_rollups, False),
+    ("extract_km_index", stage_extract_km_index, False),
+    ("extract_facts", stage_extract_facts, False),
+    ("build_snapshot_matrix", stage_build_snapshot_matrix, True),
+    ("compute_pod", stage_compute_pod, True),
+    ("dmd_exact", stage_dmd_exact, True),
+]
+
+
+# ============================================================
+# Runner
+# ============================================================
+
+def _stage_worker(stage_name, workdir, params, queue):
+    """Run a single stage inside a fresh process and report its measurements."""
+    os.chdir(workdir)
+    _add_import_paths()
+    # Process peak since exec (VmHWM on Linux): ru_maxrss would include this process's parent
+    from pipeline.instrumentation import peak_rss_mb
+    setup = {name: function for name, function, _ in STAGES}[stage_name]
+    repeatable = {name: repeat for name, _, repeat in STAGES}[stage_name]
+
+    try:
+        output = sys.stdout if params["verbose"] else open(os.devnull, "w")
+        with contextlib.redirect_stdout(output):
+            run = setup(params)
+            repetitions = params["repeat"] if repeatable else 1
+            walls, cpus = [], []
+            for _ in range(repetitions):
+                wall_start, cpu_start = time.perf_counter(), time.process_time()
+                run()
+                walls.append(time.perf_counter() - wall_start)
+                cpus.append(time.process_time() - cpu_start)
+
+        queue.put({
+            "stage": stage_name,
+            "wall_s": min(walls),
+            "cpu_s": min(cpus),
+            "peak_rss_mb": peak_rss_mb(),
+            "repetitions": repetitions,
+        })
+    except Exception as e:
+        queue.put({"stage": stage_name, "error": f"{type(e).__name__}: {e}"})
+
+
+def _generate_worker(workdir, params):
+    sys.path.insert(0, BENCHMARKS_DIR)
+    from synthetic_datatran import generate_datatran
+
+    generate_datatran(
+        os.path.join(workdir, "data"),
+        range(params["start_year"], params["end_year"] + 1),
+        params["rows_per_year"],
+        seed=params["seed"]
+    )
+
+
+def run_benchmarks(workdir, params):
+    """
+    Generate the synthetic dataset in workdir and run every stage in order.
+
+    Returns:
+        List of per-stage result dicts
+    """
+    print(f"Generating synthetic data ({params['rows_per_year']:,} rows/year, "
+          f"{params['start_year']}-{params['end_year']}) in {workdir}...")
+    context = multiprocessing.get_context("spawn")
+
+    # Generated in its own process so that this one stays small (ru_maxrss outside Linux is inherited)
+    generator = context.Process(target=_generate_worker, args=(workdir, params))
+    generator.start()
+    generator.join()
+    if generator.exitcode != 0:
+        raise RuntimeError(f"Synthetic data generation failed (exit code {generator.exitcode})")
+
+    # Headless plotting backend for the analysis modules
+    os.environ.setdefault("MPLBACKEND", "Agg")
+
+    results = []
+    for stage_name, _, _ in STAGES:
+        queue = context.Queue()
+        process = context.Process(target=_stage_worker, args=(stage_name, workdir, params, queue))
+        process.start()
+        result = queue.get()
+        process.join()
+        results.append(result)
+
+        if "error" in result:
+            print(f"  ✗ {stage_name}: {result['error']}")
+            break
+        print(f"  ✓ {stage_name}: {result['wall_s']:.3f} s")
+
+    return results
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """
+    Compare results with a baseline run.
+
+    A stage regresses when its wall time or peak RSS exceeds the baseline by more
+    than `tolerance` (relative) and by more than the noise floors.
+
+    Returns:
+        List of (stage, metric, baseline value, current value) regressions
+    """
+    baseline_by_stage = {stage["stage"]: stage for stage in baseline["stages"]}
+    regressions = []
+
+    for result in results:
+        base = baseline_by_stage.get(result["stage"])
+        if base is None or "error" in result or "error" in base:
+            continue
+        for metric, floor in (("wall_s", MIN_WALL_DIFF_S), ("peak_rss_mb", MIN_RSS_DIFF_MB)):
+            current, reference = result.get(metric), base.get(metric)
+            if current is None or reference is None:
+                continue
+            if current > reference * (1 + tolerance) and current - reference > floor:
+                regressions.append((result["stage"], metric, reference, current))
+
+    return regressions
+
+
+def print_summary(results, baseline):
+    baseline_by_stage = {stage["stage"]: stage for stage in baseline["stages"]} if baseline else {}
+
+    print("\n" + "=" * 78)
+    print(f"{'Stage':<24}{'Wall (s)':>10}{'CPU (s)':>10}{'Peak RSS (MB)':>15}{'vs baseline':>16}")
+    print("-" * 78)
+    for result in results:
+        if "error" in result:
+            print(f"{result['stage']:<24}{'ERROR':>10}")
+            continue
+        rss = f"{result['peak_rss_mb']:.1f}" if result["peak_rss_mb"] is not None else "n/a"
+        base = baseline_by_stage.get(result["stage"])
+        ratio = f"{result['wall_s'] / base['wall_s']:.2f}x" if base and base.get("wall_s") else "-"
+        print(f"{result['stage']:<24}{result['wall_s']:>10.3f}{result['cpu_s']:>10.3f}{rss:>15}{ratio:>16}")
+    print("=" * 78)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ETL and analysis pipeline on synthetic data")
+    parser.add_argument("--rows-per-year", type=int, default=20000)
+    parser.add_argument("--start-year", type=int, default=2007)
+    parser.add_argument("--end-year", type=int, default=2025)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions of the analysis stages (best is kept)")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Relative slowdown tolerated before failing")
+    parser.add_argument("--save-baseline", action="store_true", help=f"Store this run as {BASELINE_PATH}")
+    parser.add_argument("--workdir", help="Working directory (default: temporary, removed at the end)")
+    parser.add_argument("--verbose", action="store_true", help="Show the output of each stage")
+    args = parser.parse_args()
+
+    params = {
+        "rows_per_year": args.rows_per_year,
+        "start_year": args.start_year,
+        "end_year": args.end_year,
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "verbose": args.verbose,
+    }
+    config = {key: params[key] for key in ("rows_per_year", "start_year", "end_year", "seed")}
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="datatran_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    try:
+        results = run_benchmarks(workdir, params)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    run = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config,
+        "stages": results,
+    }
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    results_path = os.path.join(RESULTS_DIR, "latest.json")
+    with open(results_path, "w") as f:
+        json.dump(run, f, indent=2)
+
+    baseline = None
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+        if baseline["config"] != config:
+            print(f"\nBaseline was recorded with a different configuration ({baseline['config']}), not comparing.")
+            baseline = None
+
+    print_summary(results, baseline)
+    print(f"Results saved to: {results_path}")
+
+    if args.save_baseline:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(run, f, indent=2)
+        print(f"Baseline saved to: {BASELINE_PATH}")
+        return 0
+
+    failed = any("error" in result for result in results)
+    if baseline:
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+        for stage, metric, reference, current in regressions:
+            print(f"  REGRESSION {stage}.{metric}: {reference:.3f} → {current:.3f}")
+        if not regressions:
+            print(f"No regressions against baseline ({baseline['timestamp']}, tolerance {args.tolerance:.0%}).")
+        failed = failed or bool(regressions)
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""
+Synthetic DATATRAN generator.
+
+Writes datatran{year}.csv files with the same layout as the real downloads,
+so the ETL and analysis pipeline can be exercised offline at any scale:
+
+- Column sets per year: 2007-2015 (26 columns, with "ano"), 2016 (25 columns),
+  2017+ (30 columns, with latitude/longitude/regional/delegacia/uop)
+- Date formats: dd/mm/yyyy (2007-2011), yyyy-mm-dd (2012-2015, 2017+), dd/mm/yy (2016)
+- Comma decimal separators in km (all years) and in coordinates (2017-2020)
+- '(null)' markers for missing values, ';' separator and ISO-8859-1 encoding
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+COLUMNS_2007_2015 = [
+    "id", "data_inversa", "dia_semana", "horario", "uf", "br", "km", "municipio",
+    "causa_acidente", "tipo_acidente", "classificacao_acidente", "fase_dia", "sentido_via",
+    "condicao_metereologica", "tipo_pista", "tracado_via", "uso_solo", "ano", "pessoas", "mortos",
+    "feridos_leves", "feridos_graves", "ilesos", "ignorados", "feridos", "veiculos"
+]
+COLUMNS_2016 = [column for column in COLUMNS_2007_2015 if column != "ano"]
+COLUMNS_2017_ON = COLUMNS_2016 + ["latitude", "longitude", "regional", "delegacia", "uop"]
+
+DIAS_SEMANA = ["segunda-feira", "terça-feira", "quarta-feira", "quinta-feira", "sexta-feira", "sábado", "domingo"]
+
+CATEGORIES = {
+    "causa_acidente": ["Falta de atenção", "Velocidade incompatível", "Ingestão de álcool",
+                       "Desobediência à sinalização", "Defeito mecânico no veículo", "Animais na Pista"],
+    "tipo_acidente": ["Colisão traseira", "Colisão frontal", "Saída de Pista", "Capotamento",
+                      "Atropelamento de pessoa", "Colisão lateral"],
+    "classificacao_acidente": ["Sem Vítimas", "Com Vítimas Feridas", "Com Vítimas Fatais"],
+    "fase_dia": ["Pleno dia", "Plena noite", "Amanhecer", "Anoitecer"],
+    "sentido_via": ["Crescente", "Decrescente"],
+    "condicao_metereologica": ["Céu Claro", "Nublado", "Chuva", "Garoa/Chuvisco", "Nevoeiro/neblina"],
+    "tipo_pista": ["Simples", "Dupla", "Múltipla"],
+    "tracado_via": ["Reta", "Curva", "Interseção de vias", "Declive"],
+    "uso_solo": ["Urbano", "Rural"],
+}
+
+HORARIOS = np.array([f"{minute // 60:02d}:{minute % 60:02d}:00" for minute in range(24 * 60)])
+
+# Monthly weights (December/January peaks) and weekday weights (weekend peaks)
+MONTH_WEIGHTS = np.array([1.15, 0.95, 1.0, 0.95, 0.95, 0.95, 1.05, 1.0, 0.95, 1.0, 1.0, 1.2])
+WEEKDAY_WEIGHTS = np.array([0.9, 0.85, 0.85, 0.9, 1.1, 1.25, 1.2])
+
+
+def build_corridors(n_corridors, rng):
+    """
+    Create a fixed set of highway corridors (uf, br) with a straight-line geometry.
+
+    Returns:
+        DataFrame with uf, br, length_km, lat0, lon0, dlat, dlon, municipio, weight
+    """
+    ufs = ["MG", "SC", "PR", "RJ", "RS", "SP", "BA", "GO", "PE", "ES", "MT", "MS", "CE", "PB"]
+    brs = [101, 116, 381, 40, 153, 262, 364, 470, 277, 163, 60, 230]
+
+    uf = rng.choice(ufs, n_corridors)
+    br = rng.choice(brs, n_corridors)
+    length_km = rng.uniform(150, 600, n_corridors)
+    heading = rng.uniform(0, 2 * np.pi, n_corridors)
+    # ~1/111 degrees per km
+    return pd.DataFrame({
+        "uf": uf,
+        "br": br,
+        "length_km": length_km,
+        "lat0": rng.uniform(-30, -5, n_corridors),
+        "lon0": rng.uniform(-55, -38, n_corridors),
+        "dlat": np.sin(heading) / 111.0,
+        "dlon": np.cos(heading) / 111.0,
+        "municipio": [f"MUNICIPIO {i:03d}" for i in range(n_corridors)],
+        "weight": rng.pareto(1.5, n_corridors) + 1,
+    }).drop_duplicates(subset=["uf", "br"]).reset_index(drop=True)
+
+
+def sample_dates(year, n_rows, rng):
+    """Sample accident dates of a year following the monthly/weekday weights."""
+    days = pd.date_range(f"{year}-01-01", f"{year}-12-31", freq="D")
+    weights = MONTH_WEIGHTS[days.month - 1] * WEEKDAY_WEIGHTS[days.dayofweek]
+    weights = weights / weights.sum()
+    return days[rng.choice(len(days), n_rows, p=weights)]
+
+
+def format_decimal(values, decimals, comma):
+    """Format floats as text with the requested decimal separator."""
+    text = np.char.mod(f"%.{decimals}f", values)
+    return np.char.replace(text, ".", ",") if comma else text
+
+
+def generate_year(year, n_rows, corridors, rng, missing_fraction=0.01):
+    """
+    Generate one year of synthetic accidents with that year's column set and quirks.
+
+    Args:
+        year: Year of the file
+        n_rows: Number of accidents
+        corridors: Output of build_corridors
+        rng: numpy Generator
+        missing_fraction: Fraction of '(null)' values in uf and coordinates
+
+    Returns:
+        DataFrame with the columns of the real file for that year
+    """
+    dates = sample_dates(year, n_rows, rng)
+    corridor_idx = rng.choice(len(corridors), n_rows, p=(corridors["weight"] / corridors["weight"].sum()).to_numpy())
+    corridor = corridors.iloc[corridor_idx].reset_index(drop=True)
+    km = rng.uniform(0, 1, n_rows) * corridor["length_km"].to_numpy()
+
+    if year == 2016:
+        date_text = dates.strftime("%d/%m/%y")
+    elif year <= 2011:
+        date_text = dates.strftime("%d/%m/%Y")
+    else:
+        date_text = dates.strftime("%Y-%m-%d")
+
+    mortos = rng.poisson(0.08, n_rows)
+    feridos_leves = rng.poisson(0.8, n_rows)
+    feridos_graves = rng.poisson(0.25, n_rows)
+    ilesos = rng.poisson(1.0, n_rows)
+    ignorados = rng.poisson(0.05, n_rows)
+
+    df = pd.DataFrame({
+        "id": np.arange(1, n_rows + 1) + year * 1_000_000,
+        "data_inversa": date_text,
+        "dia_semana": np.array(DIAS_SEMANA)[dates.dayofweek],
+        "horario": HORARIOS[rng.integers(0, len(HORARIOS), n_rows)],
+        "uf": corridor["uf"].to_numpy(),
+        "br": corridor["br"].to_numpy(),
+        "km": format_decimal(km, 1, comma=True),
+        "municipio": corridor["municipio"].to_numpy(),
+        "ano": year,
+        "pessoas": mortos + feridos_leves + feridos_graves + ilesos + ignorados,
+        "mortos": mortos,
+        "feridos_leves": feridos_leves,
+        "feridos_graves": feridos_graves,
+        "ilesos": ilesos,
+        "ignorados": ignorados,
+        "feridos": feridos_leves + feridos_graves,
+        "veiculos": rng.integers(1, 4, n_rows),
+    })
+    for column, values in CATEGORIES.items():
+        df[column] = rng.choice(values, n_rows)
+
+    df.loc[rng.random(n_rows) < missing_fraction, "uf"] = "(null)"
+
+    if year >= 2017:
+        latitude = corridor["lat0"].to_numpy() + km * corridor["dlat"].to_numpy() + rng.normal(0, 0.002, n_rows)
+        longitude = corridor["lon0"].to_numpy() + km * corridor["dlon"].to_numpy() + rng.normal(0, 0.002, n_rows)
+        comma = year <= 2020
+        df["latitude"] = format_decimal(latitude, 6, comma)
+        df["longitude"] = format_decimal(longitude, 6, comma)
+        missing_coords = rng.random(n_rows) < missing_fraction
+        df.loc[missing_coords, ["latitude", "longitude"]] = "(null)"
+        df["regional"] = "SPRF-" + corridor["uf"]
+        df["delegacia"] = "DEL" + pd.Series(rng.integers(1, 10, n_rows)).astype(str) + "-" + corridor["uf"]
+        df["uop"] = "UOP0" + pd.Series(rng.integers(1, 5, n_rows)).astype(str) + "-" + df["delegacia"]
+
+    if year <= 2015:
+        columns = COLUMNS_2007_2015
+    elif year == 2016:
+        columns = COLUMNS_2016
+    else:
+        columns = COLUMNS_2017_ON
+
+    return df[columns]
+
+
+def generate_datatran(output_dir, years, rows_per_year, n_corridors=200, seed=0):
+    """
+    Write synthetic datatran{year}.csv files.
+
+    Args:
+        output_dir: Destination folder (created if needed)
+        years: Iterable of years
+        rows_per_year: Accidents per year
+        n_corridors: Number of (uf, br) corridors
+        seed: Random seed (same seed → same files)
+
+    Returns:
+        List of written file paths
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    corridors = build_corridors(n_corridors, rng)
+
+    paths = []
+    for year in years:
+        df = generate_year(year, rows_per_year, corridors, rng)
+        path = os.path.join(output_dir, f"datatran{year}.csv")
+        df.to_csv(path, sep=";", index=False, encoding="ISO-8859-1")
+        paths.append(path)
+
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic DATATRAN CSV files")
+    parser.add_argument("--output", default="data", help="Output folder (default: data)")
+    parser.add_argument("--start-year", type=int, default=2007)
+    parser.add_argument("--end-year", type=int, default=2025)
+    parser.add_argument("--rows-per-year", type=int, default=10000)
+    parser.add_argument("--corridors", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    paths = generate_datatran(
+        args.output,
+        range(args.start_year, args.end_year + 1),
+        args.rows_per_year,
+        n_corridors=args.corridors,
+        seed=args.seed
+    )
+    print(f"Generated {len(paths)} files in {args.output} ({args.rows_per_year:,} rows per year)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,15 @@
 import os
+import sys
 import sqlite3
 import pandas as pd
 from glob import glob
 
+# Repository root on the path for the shared pipeline package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline.instrumentation import instrumented, record_rows
+
+@instrumented("create_sqlite_db")
 def create_sqlite_db():
     # Configuration
     DATA_PATH = 'data'
@@ -85,6 +92,7 @@ def create_sqlite_db():
 
     # Import each CSV into the database
     expected_columns = columns  # full set of 30 columns
+    imported_rows = 0
 
     for file in csv_files:
         print(f"Importing {file}...")
@@ -107,8 +115,10 @@ def create_sqlite_db():
 
         # Insert into SQLite
         csv_dataframe.to_sql(TABLE_NAME, db_connection, if_exists='append', index=False)
+        imported_rows += len(csv_dataframe)
 
     print("All files imported successfully into SQLite.")
+    record_rows(rows_in=imported_rows, rows_out=imported_rows)
     db_connection.close()
 
     # Cleanup: Delete CSV files after successful import
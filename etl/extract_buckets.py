@@ -0,0 +1,173 @@
+import sqlite3
+import os
+import sys
+
+# Repository root on the path for the shared pipeline package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline.instrumentation import instrumented, record_rows, stage
+
+from extract_rollups import STATE_TABLE_NAME
+
+# Multi-level day buckets of the daily series, for downsampled plots of any time range.
+# Level L groups 2^L consecutive days, aligned on the Unix epoch (bucket start day = day >> L << L),
+# so every bucket of level L is the union of two buckets of level L - 1 and levels are built
+# from the one below instead of from the source rows.
+BUCKET_MAX_LEVEL = 9  # 512-day buckets
+
+# Each entry: dimensions (name, SQL type, SQL expression over the source), the daily
+# source table, its count expression and its filter.
+BUCKET_TABLES = [
+	{
+		"table": "rollup_total_day_buckets",
+		"dimensions": [],
+		"source": "accidents_daily",
+		"count": "SUM(accidents_count)",
+		"where": "1 = 1",
+	},
+	{
+		"table": "rollup_uf_br_day_buckets",
+		"dimensions": [
+			("uf", "TEXT", "uf"),
+			("br", "INTEGER", "br"),
+		],
+		"source": "rollup_uf_br_km1_day",
+		"count": "SUM(count)",
+		"where": "1 = 1",
+	},
+]
+
+DAY_NUMBER = "CAST(julianday({0}) - 2440587.5 AS INTEGER)"
+
+
+def refresh_bucket_table(db_connection, definition, max_level=BUCKET_MAX_LEVEL):
+	"""
+	Rebuild a multi-level bucket table unless its source is unchanged.
+
+	Every row stores, for one bucket of one level:
+	- count: accidents in the bucket
+	- span: days of the bucket inside the source date range (the mean divides by it)
+	- dias: days with accidents
+	- min_count / max_count: smallest and largest daily count (days without
+	  accidents count as 0)
+	- mean: count / span
+
+	Args:
+		db_connection: sqlite3 connection to the analysis database
+		definition: Entry of BUCKET_TABLES
+		max_level: Coarsest level (buckets of 2^max_level days)
+
+	Returns:
+		Tuple (mode, rows_written) where mode is 'full' or 'up-to-date'
+	"""
+	table = definition["table"]
+	source = definition["source"]
+	dimension_names = [name for name, _, _ in definition["dimensions"]]
+	dims = "".join(f"{name}, " for name in dimension_names)
+
+	source_max_date, source_count, first_day, last_day = db_connection.execute(
+		f"SELECT MAX(date), {definition['count']}, {DAY_NUMBER.format('MIN(date)')}, {DAY_NUMBER.format('MAX(date)')} "
+		f"FROM {source} WHERE {definition['where']}"
+	).fetchone()
+
+	state = db_connection.execute(
+		f"SELECT max_date FROM {STATE_TABLE_NAME} WHERE table_name = ?", (table,)
+	).fetchone()
+	table_exists = db_connection.execute(
+		"SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+	).fetchone()
+	if state is not None and table_exists and state[0] == source_max_date:
+		bucket_count = db_connection.execute(f"SELECT SUM(count) FROM {table} WHERE level = 0").fetchone()[0]
+		if bucket_count == source_count:
+			return "up-to-date", 0
+
+	columns_sql = "".join(f"{name} {sql_type} NOT NULL,\n\t\t" for name, sql_type, _ in definition["dimensions"])
+	db_connection.execute(f"DROP TABLE IF EXISTS {table};")
+	db_connection.execute(f"""
+	CREATE TABLE {table}
+	(
+		{columns_sql}level INTEGER NOT NULL,
+		day INTEGER NOT NULL,
+		date TEXT NOT NULL,
+		count INTEGER NOT NULL,
+		span INTEGER NOT NULL,
+		dias INTEGER NOT NULL,
+		min_count INTEGER NOT NULL,
+		max_count INTEGER NOT NULL,
+		mean REAL NOT NULL,
+		PRIMARY KEY ({dims}level, day)
+	) WITHOUT ROWID
+	""")
+	if source_max_date is None:
+		return "full", 0
+
+	# Level 0: one row per day with accidents
+	select_dimensions = "".join(f"{expr} AS {name}, " for name, _, expr in definition["dimensions"])
+	rows_written = db_connection.execute(f"""
+	INSERT INTO {table} ({dims}level, day, date, count, span, dias, min_count, max_count, mean)
+	SELECT {dims}0, day, date, count, 1, 1, count, count, count
+	FROM (
+		SELECT {select_dimensions}{DAY_NUMBER.format('date')} AS day, date, {definition['count']} AS count
+		FROM {source}
+		WHERE {definition['where']}
+		GROUP BY {dims}date
+	)
+	""").rowcount
+
+	# Level L from level L - 1; buckets with fewer days with accidents than days in range have a 0 day
+	for level in range(1, max_level + 1):
+		size = 1 << level
+		rows_written += db_connection.execute(f"""
+		INSERT INTO {table} ({dims}level, day, date, count, span, dias, min_count, max_count, mean)
+		SELECT {dims}level, day, date(day * 86400, 'unixepoch'), count, span, dias,
+			CASE WHEN dias < span THEN 0 ELSE min_count END, max_count, CAST(count AS REAL) / span
+		FROM (
+			SELECT {dims}? AS level, (day >> ?) << ? AS day, SUM(count) AS count, SUM(dias) AS dias,
+				MIN(min_count) AS min_count, MAX(max_count) AS max_count,
+				MIN(((day >> ?) << ?) + ? - 1, ?) - MAX((day >> ?) << ?, ?) + 1 AS span
+			FROM {table}
+			WHERE level = ?
+			GROUP BY {dims}(day >> ?)
+		)
+		""", (level, level, level, level, level, size, last_day, level, level, first_day, level - 1, level)).rowcount
+
+	db_connection.execute(
+		f"INSERT OR REPLACE INTO {STATE_TABLE_NAME} (table_name, max_date) VALUES (?, ?)",
+		(table, source_max_date)
+	)
+	db_connection.commit()
+
+	return "full", rows_written
+
+
+@instrumented("extract_buckets")
+def extract_buckets():
+	# Configuration
+	EXTRACTED_DIR = "extracted"
+	TARGET_DB = os.path.join(EXTRACTED_DIR, "analysis_data.db")
+
+	total_written = 0
+	with sqlite3.connect(TARGET_DB) as analysis_db:
+		analysis_db.execute(f"""
+		CREATE TABLE IF NOT EXISTS {STATE_TABLE_NAME}
+		(
+			table_name TEXT PRIMARY KEY,
+			max_date TEXT
+		)
+		""")
+		for definition in BUCKET_TABLES:
+			with stage(f"extract_buckets.{definition['table']}") as metrics:
+				mode, rows_written = refresh_bucket_table(analysis_db, definition)
+				metrics.rows_out = rows_written
+			total_written += rows_written
+			print(f"   ✓ {definition['table']}: {mode} ({rows_written:,} rows written, levels 0-{BUCKET_MAX_LEVEL})")
+
+	analysis_db.close()
+
+	record_rows(rows_out=total_written)
+
+	print(f"   Day bucket tables refreshed successfully!")
+	print(f"   Output: {TARGET_DB}")
+
+if __name__ == "__main__":
+	extract_buckets()
@@ -6,11 +6,17 @@ Calls various extraction functions to prepare data for analysis.
 import sys
 import os
 
-# Add current directory to path for imports
+# Add current directory and repository root to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from extract_timeseries import extract_timeseries
 from extract_spatial import extract_spatial
+from extract_rollups import extract_rollups
+from extract_km_index import extract_km_index
+from extract_facts import extract_facts
+from extract_buckets import extract_buckets
+from pipeline.instrumentation import print_summary, save_metrics
 
 
 def main():
@@ -29,11 +35,31 @@ def main():
     print("\n2. Extracting spatial data...")
     extract_spatial()
 
+    # Refresh pre-aggregated rollups (uf/br/km-bin × month/day)
+    print("\n3. Refreshing rollup tables...")
+    extract_rollups()
+
+    # Validate km markers against coordinates
+    print("\n4. Building km → coordinate index...")
+    extract_km_index()
+
+    # Dictionary-encoded fact table with severity and cause attributes
+    print("\n5. Extracting fact table...")
+    extract_facts()
+
+    # Multi-level min/max/mean day buckets of the national and per-road daily series
+    print("\n6. Refreshing day bucket tables...")
+    extract_buckets()
+
     print("\n" + "=" * 60)
     print("EXTRACTION COMPLETE")
     print("=" * 60)
     print("Output: extracted/analysis_data.db")
-    print("Tables: accidents_daily, accidents_spatial")
+    print("Tables: accidents_daily, rollup_total_{week,month,quarter,dow_month}, accidents_spatial, rollup_uf_month, rollup_uf_br_km10_month, rollup_uf_br_km1_day, rollup_grid_month, rollup_{total,uf_br}_day_buckets, km_coordinate_index, accidents_km_check, accidents_fact, dim_*")
+
+    # Per-stage timing, memory and row counts (also stored in pipeline_metrics)
+    print_summary()
+    save_metrics("extracted/analysis_data.db")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,164 @@
+import sqlite3
+import os
+import sys
+
+# Repository root on the path for the shared pipeline package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline.instrumentation import instrumented, record_rows
+
+# Text attributes stored as integer codes; each gets a lookup table dim_<column> (id, value)
+DIMENSIONS = [
+	"uf",
+	"municipio",
+	"causa_acidente",
+	"tipo_acidente",
+	"classificacao_acidente",
+	"fase_dia",
+	"condicao_metereologica",
+	"tipo_pista",
+]
+
+# Integer measures copied as they are (NULL where the source year does not report them)
+MEASURES = [
+	"pessoas",
+	"mortos",
+	"feridos_leves",
+	"feridos_graves",
+	"ilesos",
+	"feridos",
+	"veiculos",
+]
+
+FACT_TABLE_NAME = "accidents_fact"
+
+
+def dimension_table(column):
+	"""Name of the lookup table of a dimension column."""
+	return f"dim_{column}"
+
+
+@instrumented("extract_facts")
+def extract_facts():
+	"""
+	Build the dictionary-encoded fact table from the raw database.
+
+	The raw database is attached to the analysis database and the whole
+	extraction runs as set-based SQL inside SQLite, so memory does not grow
+	with the dataset.
+	"""
+	# Configuration
+	SOURCE_DB = "data/datatran_raw.db"
+	SOURCE_TABLE_NAME = "accidents"
+
+	EXTRACTED_DIR = "extracted"
+	TARGET_DB = os.path.join(EXTRACTED_DIR, "analysis_data.db")
+
+	# Create extracted directory if it doesn't exist
+	os.makedirs(EXTRACTED_DIR, exist_ok=True)
+
+	with sqlite3.connect(TARGET_DB) as analysis_db:
+		analysis_db.execute("ATTACH DATABASE ? AS raw", (SOURCE_DB,))
+
+		# Lookup tables: one row per distinct (trimmed) value, ids in value order
+		for column in DIMENSIONS:
+			table = dimension_table(column)
+			analysis_db.execute(f"DROP TABLE IF EXISTS {table};")
+			analysis_db.execute(f"""
+			CREATE TABLE {table}
+			(
+				id INTEGER PRIMARY KEY,
+				value TEXT NOT NULL UNIQUE
+			)
+			""")
+			analysis_db.execute(f"""
+			INSERT INTO {table} (value)
+			SELECT DISTINCT TRIM({column}) AS value
+			FROM raw.{SOURCE_TABLE_NAME}
+			WHERE TRIM({column}) <> ''
+			ORDER BY value
+			""")
+
+		dimension_columns = "".join(f"\n\t\t\t{column}_id INTEGER," for column in DIMENSIONS)
+		measure_columns = ",".join(f"\n\t\t\t{column} INTEGER" for column in MEASURES)
+		analysis_db.execute(f"DROP TABLE IF EXISTS {FACT_TABLE_NAME};")
+		analysis_db.execute(f"""
+		CREATE TABLE {FACT_TABLE_NAME}
+		(
+			id INTEGER PRIMARY KEY,
+			date TEXT NOT NULL,
+			hora INTEGER,
+			br INTEGER,
+			km REAL,{dimension_columns}{measure_columns}
+		)
+		""")
+
+		select_dimensions = "".join(f"\n\t\t\t{dimension_table(column)}.id," for column in DIMENSIONS)
+		select_measures = ",".join(f"\n\t\t\tsource.{column}" for column in MEASURES)
+		dimension_joins = "".join(
+			f"\n\t\tLEFT JOIN {dimension_table(column)} ON {dimension_table(column)}.value = TRIM(source.{column})"
+			for column in DIMENSIONS
+		)
+		insert_query = f"""
+		INSERT INTO {FACT_TABLE_NAME}
+		(id, date, hora, br, km, {", ".join(f"{column}_id" for column in DIMENSIONS)}, {", ".join(MEASURES)})
+		SELECT
+			source.row_id,
+			source.date_normalized,
+			CAST(SUBSTR(source.horario, 1, 2) AS INTEGER),
+			source.br,
+			CAST(REPLACE(source.km, ',', '.') AS REAL),{select_dimensions}{select_measures}
+		FROM
+		(
+			SELECT
+				*,
+				CASE
+				WHEN data_inversa LIKE '__/__/__' THEN
+					'20' ||
+					SUBSTR(data_inversa, 7, 2) ||
+					'-' ||
+					SUBSTR(data_inversa, 4, 2) ||
+					'-' ||
+					SUBSTR(data_inversa, 1, 2)
+				WHEN data_inversa LIKE '__/__/____' THEN
+					SUBSTR(data_inversa, 7, 4) ||
+					'-' ||
+					SUBSTR(data_inversa, 4, 2) ||
+					'-' ||
+					SUBSTR(data_inversa, 1, 2)
+				WHEN data_inversa LIKE '____-__-__' THEN
+					data_inversa
+				ELSE
+					NULL
+				END AS date_normalized
+			FROM raw.{SOURCE_TABLE_NAME}
+		) AS source{dimension_joins}
+		WHERE source.date_normalized IS NOT NULL
+		"""
+		rows_written = analysis_db.execute(insert_query).rowcount
+
+		# Corridor/time filters of the severity-weighted analyses
+		analysis_db.execute(
+			f"CREATE INDEX IF NOT EXISTS idx_{FACT_TABLE_NAME}_uf_br_date ON {FACT_TABLE_NAME}(uf_id, br, date);"
+		)
+
+		rows_in = analysis_db.execute(f"SELECT COUNT(*) FROM raw.{SOURCE_TABLE_NAME}").fetchone()[0]
+		dimension_sizes = {
+			column: analysis_db.execute(f"SELECT COUNT(*) FROM {dimension_table(column)}").fetchone()[0]
+			for column in DIMENSIONS
+		}
+		analysis_db.commit()
+		analysis_db.execute("DETACH DATABASE raw")
+
+	analysis_db.close()
+
+	record_rows(rows_in=rows_in, rows_out=rows_written)
+
+	print(f"   Fact table extracted successfully!")
+	print(f"   Source: {SOURCE_DB}")
+	print(f"   Output: {TARGET_DB} (table: {FACT_TABLE_NAME})")
+	print(f"   Records: {rows_written:,} (of {rows_in:,}; records without a valid date are skipped)")
+	print(f"   Lookup tables: " + ", ".join(f"{dimension_table(column)} ({size})" for column, size in dimension_sizes.items()))
+
+if __name__ == "__main__":
+	extract_facts()
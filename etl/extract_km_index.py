@@ -0,0 +1,226 @@
+import sqlite3
+import numpy as np
+import pandas as pd
+import os
+import sys
+from scipy.spatial import cKDTree
+
+# Repository root on the path for the shared pipeline package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline.instrumentation import instrumented, record_rows
+
+EARTH_RADIUS_KM = 6371.0
+
+# Separation between highways in the concatenated km axis and in the KD-tree,
+# larger than any km marker / distance so lookups never cross highways
+HIGHWAY_KEY_OFFSET = 100000.0
+
+
+def latlon_to_xyz(latitude, longitude):
+	"""
+	Project coordinates onto a sphere of Earth radius (km).
+	Euclidean distances between the points approximate great-circle distances.
+	"""
+	latitude_rad = np.radians(latitude)
+	longitude_rad = np.radians(longitude)
+	return np.column_stack([
+		EARTH_RADIUS_KM * np.cos(latitude_rad) * np.cos(longitude_rad),
+		EARTH_RADIUS_KM * np.cos(latitude_rad) * np.sin(longitude_rad),
+		EARTH_RADIUS_KM * np.sin(latitude_rad),
+	])
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+	"""Vectorized great-circle distance in km."""
+	lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+	a = (
+		np.sin((lat2 - lat1) / 2) ** 2
+		+ np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+	)
+	return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def build_km_index(records, min_samples=3):
+	"""
+	Build the km → coordinate index of every highway from the records themselves.
+
+	Each (uf, br, integer km) bin is represented by the median coordinates of its
+	records, which is robust to the minority of records with wrong km or GPS.
+
+	Args:
+		records: DataFrame with columns uf, br, km, latitude, longitude
+		min_samples: Minimum number of records for a km bin to enter the index
+
+	Returns:
+		DataFrame with columns uf, br, km, latitude, longitude, n sorted by (uf, br, km)
+	"""
+	binned = records.assign(km=np.floor(records['km']).astype(np.int64))
+	km_index = (
+		binned
+		.groupby(['uf', 'br', 'km'], sort=True)
+		.agg(latitude=('latitude', 'median'), longitude=('longitude', 'median'), n=('latitude', 'size'))
+		.reset_index()
+	)
+	return km_index[km_index['n'] >= min_samples].reset_index(drop=True)
+
+
+def validate_km_positions(records, km_index, max_offset_km=5.0):
+	"""
+	Compare each record's coordinates with the position implied by its km marker.
+
+	All lookups are vectorized over the full record set:
+	- Expected coordinates: every highway's index is concatenated on a single
+	  sorted key (highway code * offset + km) and located with one searchsorted,
+	  interpolating between the two surrounding km bins.
+	- Snapped km (flagged records only): one KD-tree over the index points
+	  (projected to 3-D, plus a coordinate that separates highways) returns the
+	  km bin nearest to each record's coordinates on its own highway.
+
+	Args:
+		records: DataFrame with columns id, uf, br, km, latitude, longitude
+		km_index: Output of build_km_index
+		max_offset_km: Distance above which a record is flagged
+
+	Returns:
+		DataFrame with columns id, latitude_km, longitude_km, offset_km, km_snapped, flagged
+		(NaN expectations for highways absent from the index, NaN km_snapped for unflagged records)
+	"""
+	# Common highway codes for records and index: uf code * 10000 + br
+	uf_codes, _ = pd.factorize(pd.concat([records['uf'], km_index['uf']]))
+	highway_codes = uf_codes * 10000 + np.concatenate([records['br'].to_numpy(), km_index['br'].to_numpy()])
+	record_codes = highway_codes[:len(records)].astype(np.float64)
+	index_codes = highway_codes[len(records):].astype(np.float64)
+
+	# Index sorted by (highway code, km) for the searchsorted lookup
+	order = np.lexsort((km_index['km'].to_numpy(), index_codes))
+	index_codes = index_codes[order]
+	index_km = km_index['km'].to_numpy(dtype=np.float64)[order]
+	index_lat = km_index['latitude'].to_numpy()[order]
+	index_lon = km_index['longitude'].to_numpy()[order]
+	record_km = records['km'].to_numpy(dtype=np.float64)
+	record_lat = records['latitude'].to_numpy()
+	record_lon = records['longitude'].to_numpy()
+
+	latitude_km = np.full(len(records), np.nan)
+	longitude_km = np.full(len(records), np.nan)
+	km_snapped = np.full(len(records), np.nan)
+
+	if len(km_index) > 0:
+		# 1. Expected coordinates from km (interpolated between surrounding bins)
+		index_key = index_codes * HIGHWAY_KEY_OFFSET + index_km
+		record_key = record_codes * HIGHWAY_KEY_OFFSET + record_km
+		right = np.clip(np.searchsorted(index_key, record_key), 0, len(index_key) - 1)
+		left = np.clip(right - 1, 0, len(index_key) - 1)
+
+		left_ok = index_codes[left] == record_codes
+		right_ok = index_codes[right] == record_codes
+		# Outside the indexed range of a highway: clamp to the nearest bin
+		left = np.where(left_ok, left, right)
+		right = np.where(right_ok, right, left)
+		has_index = left_ok | right_ok
+
+		span = index_km[right] - index_km[left]
+		weight = np.where(span > 0, (record_km - index_km[left]) / np.where(span > 0, span, 1.0), 0.0)
+		weight = np.clip(weight, 0.0, 1.0)
+		latitude_km = np.where(has_index, index_lat[left] + weight * (index_lat[right] - index_lat[left]), np.nan)
+		longitude_km = np.where(has_index, index_lon[left] + weight * (index_lon[right] - index_lon[left]), np.nan)
+
+	offset_km = haversine_km(record_lat, record_lon, latitude_km, longitude_km)
+	flagged = offset_km > max_offset_km
+
+	if flagged.any():
+		# 2. Km implied by the coordinates of flagged records (nearest index bin on the same highway)
+		index_points = np.column_stack([latlon_to_xyz(index_lat, index_lon), index_codes * HIGHWAY_KEY_OFFSET])
+		record_points = np.column_stack([
+			latlon_to_xyz(record_lat[flagged], record_lon[flagged]),
+			record_codes[flagged] * HIGHWAY_KEY_OFFSET
+		])
+		tree = cKDTree(index_points)
+		_, nearest = tree.query(record_points, k=1)
+		km_snapped[flagged] = index_km[nearest]
+
+	return pd.DataFrame({
+		'id': records['id'].to_numpy(),
+		'latitude_km': latitude_km,
+		'longitude_km': longitude_km,
+		'offset_km': offset_km,
+		'km_snapped': km_snapped,
+		'flagged': flagged.astype(np.int64),
+	})
+
+
+@instrumented("extract_km_index")
+def extract_km_index():
+	# Configuration
+	EXTRACTED_DIR = "extracted"
+	TARGET_DB = os.path.join(EXTRACTED_DIR, "analysis_data.db")
+	SOURCE_TABLE_NAME = "accidents_spatial"
+	INDEX_TABLE_NAME = "km_coordinate_index"
+	CHECK_TABLE_NAME = "accidents_km_check"
+	MIN_SAMPLES_PER_KM = 3   # Records needed for a km bin to enter the index
+	MAX_OFFSET_KM = 5.0      # Distance between coordinates and km position to flag a record
+
+	query = f"""
+	SELECT id, uf, br, km, latitude, longitude
+	FROM {SOURCE_TABLE_NAME}
+	WHERE uf IS NOT NULL
+		AND br IS NOT NULL
+		AND km >= 0
+		AND latitude BETWEEN -34 AND 6
+		AND longitude BETWEEN -75 AND -30
+	"""
+
+	with sqlite3.connect(TARGET_DB) as analysis_db:
+		records = pd.read_sql_query(query, analysis_db)
+		print(f"   ✓ Loaded {len(records):,} records with uf, br, km and valid coordinates")
+
+		km_index = build_km_index(records, min_samples=MIN_SAMPLES_PER_KM)
+		check = validate_km_positions(records, km_index, max_offset_km=MAX_OFFSET_KM)
+
+		analysis_db.execute(f"DROP TABLE IF EXISTS {INDEX_TABLE_NAME};")
+		analysis_db.execute(f"""
+		CREATE TABLE {INDEX_TABLE_NAME}
+		(
+			uf TEXT NOT NULL,
+			br INTEGER NOT NULL,
+			km INTEGER NOT NULL,
+			latitude REAL NOT NULL,
+			longitude REAL NOT NULL,
+			n INTEGER NOT NULL,
+			PRIMARY KEY (uf, br, km)
+		) WITHOUT ROWID
+		""")
+		km_index.to_sql(INDEX_TABLE_NAME, analysis_db, index=False, if_exists="append")
+
+		analysis_db.execute(f"DROP TABLE IF EXISTS {CHECK_TABLE_NAME};")
+		analysis_db.execute(f"""
+		CREATE TABLE {CHECK_TABLE_NAME}
+		(
+			id INTEGER PRIMARY KEY,
+			latitude_km REAL,
+			longitude_km REAL,
+			offset_km REAL,
+			km_snapped REAL,
+			flagged INTEGER NOT NULL
+		)
+		""")
+		check.to_sql(CHECK_TABLE_NAME, analysis_db, index=False, if_exists="append")
+		analysis_db.execute(f"CREATE INDEX idx_{CHECK_TABLE_NAME}_flagged ON {CHECK_TABLE_NAME}(flagged);")
+
+	analysis_db.close()
+
+	record_rows(rows_in=len(records), rows_out=len(check))
+
+	flagged_count = int(check['flagged'].sum())
+	unchecked_count = int(check['offset_km'].isna().sum())
+
+	print(f"   Km index built successfully!")
+	print(f"   Output: {TARGET_DB} (tables: {INDEX_TABLE_NAME}, {CHECK_TABLE_NAME})")
+	print(f"   - Indexed km bins: {len(km_index):,} over {km_index.groupby(['uf', 'br']).ngroups:,} highways")
+	print(f"   - Records farther than {MAX_OFFSET_KM} km from their km position: {flagged_count:,}")
+	if unchecked_count > 0:
+		print(f"   - Records on highways without index (not checked): {unchecked_count:,}")
+
+if __name__ == "__main__":
+	extract_km_index()
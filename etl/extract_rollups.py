@@ -0,0 +1,289 @@
+import sqlite3
+import os
+import sys
+
+# Repository root on the path for the shared pipeline package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline.instrumentation import instrumented, record_rows, stage
+
+from spatial_grid import GRID_MAX_ZOOM, GRID_ZOOM_LEVELS
+
+# Rollup cubes materialized from accidents_spatial.
+# Each entry defines the grouping dimensions (name, SQL type, SQL expression),
+# the temporal granularity ('month' or 'day') and the filter applied to source rows.
+# Optional keys:
+#   join: clause appended to the source table (e.g. to expand rows per zoom level)
+#   measures: extra aggregated columns (name, SQL type, SQL aggregate expression)
+#   primary_key: order of the key columns (defaults to dimensions + period)
+#   count: SQL aggregate giving the number of accidents of the source rows (defaults to COUNT(*))
+ROLLUPS = [
+	{
+		"table": "rollup_uf_month",
+		"dimensions": [
+			("uf", "TEXT", "uf"),
+		],
+		"period": "month",
+		"where": "uf IS NOT NULL",
+	},
+	{
+		"table": "rollup_uf_br_km10_month",
+		"dimensions": [
+			("uf", "TEXT", "uf"),
+			("br", "INTEGER", "br"),
+			("km_bin", "INTEGER", "CAST(km / 10 AS INTEGER) * 10"),
+		],
+		"period": "month",
+		"where": "uf IS NOT NULL AND br IS NOT NULL AND km >= 0",
+	},
+	{
+		"table": "rollup_uf_br_km1_day",
+		"dimensions": [
+			("uf", "TEXT", "uf"),
+			("br", "INTEGER", "br"),
+			("km_bin", "INTEGER", "CAST(km AS INTEGER)"),
+		],
+		"period": "day",
+		"where": "uf IS NOT NULL AND br IS NOT NULL AND km >= 0",
+	},
+	{
+		"table": "rollup_grid_month",
+		"dimensions": [
+			("zoom", "INTEGER", "grid_levels.column1"),
+			("tile_x", "INTEGER", f"tile_x >> ({GRID_MAX_ZOOM} - grid_levels.column1)"),
+			("tile_y", "INTEGER", f"tile_y >> ({GRID_MAX_ZOOM} - grid_levels.column1)"),
+			("cell", "INTEGER", f"quadkey >> (2 * ({GRID_MAX_ZOOM} - grid_levels.column1))"),
+		],
+		"period": "month",
+		"join": "CROSS JOIN (VALUES " + ", ".join(f"({zoom})" for zoom in GRID_ZOOM_LEVELS) + ") AS grid_levels",
+		"where": "quadkey IS NOT NULL AND latitude BETWEEN -34 AND 6 AND longitude BETWEEN -75 AND -30",
+		"measures": [
+			("latitude", "REAL", "AVG(latitude)"),
+			("longitude", "REAL", "AVG(longitude)"),
+		],
+		# Tile column and row lead the key: a bounding box is one seek per column with a range of rows
+		"primary_key": ["zoom", "tile_x", "tile_y", "mes_anio"],
+	},
+]
+
+# Rollup cubes of the daily series (accidents_daily, one row per day), refreshed by
+# extract_timeseries. 'dias' is the number of days with accidents in each period.
+TIMESERIES_ROLLUPS = [
+	{
+		"table": f"rollup_total_{period}",
+		"dimensions": [],
+		"period": period,
+		"where": "1 = 1",
+		"count": "SUM(accidents_count)",
+		"measures": [
+			("dias", "INTEGER", "COUNT(*)"),
+		],
+	}
+	for period in ("week", "month", "quarter")
+] + [
+	{
+		"table": "rollup_total_dow_month",
+		"dimensions": [
+			("dia_semana", "INTEGER", "CAST(strftime('%w', date) AS INTEGER)"),
+		],
+		"period": "month",
+		"where": "1 = 1",
+		"count": "SUM(accidents_count)",
+		"measures": [
+			("dias", "INTEGER", "COUNT(*)"),
+		],
+		"primary_key": ["mes_anio", "dia_semana"],
+	},
+]
+
+# Period column name, SQL template mapping a date to its period and
+# SQL template mapping a date to the first day of its period
+# (templates may reference the date several times as {0})
+PERIODS = {
+	"quarter": (
+		"trimestre",
+		"strftime('%Y', {0}) || '-Q' || ((CAST(strftime('%m', {0}) AS INTEGER) + 2) / 3)",
+		"printf('%s-%02d-01', strftime('%Y', {0}), ((CAST(strftime('%m', {0}) AS INTEGER) - 1) / 3) * 3 + 1)",
+	),
+	"month": ("mes_anio", "strftime('%Y-%m', {0})", "strftime('%Y-%m-01', {0})"),
+	# Weeks start on Monday; the period is the date of that Monday
+	"week": ("semana", "date({0}, '-6 days', 'weekday 1')", "date({0}, '-6 days', 'weekday 1')"),
+	"day": ("date", "{0}", "date({0})"),
+}
+
+STATE_TABLE_NAME = "rollup_state"
+
+
+def refresh_rollup(db_connection, rollup, source_table):
+	"""
+	Refresh a single rollup table from the source table.
+
+	The refresh is incremental: only the periods starting at the last
+	date seen in the previous refresh are deleted and re-aggregated.
+	If the rows before that point no longer match what the rollup holds
+	(e.g. the source was rebuilt with corrected data), it falls back to
+	a full rebuild.
+
+	Args:
+		db_connection: sqlite3 connection to the analysis database
+		rollup: Rollup definition (entry of ROLLUPS)
+		source_table: Name of the table with one row per accident
+
+	Returns:
+		Tuple (mode, rows_written) where mode is 'full', 'incremental' or 'up-to-date'
+	"""
+	table = rollup["table"]
+	period_column, period_template, period_start_template = PERIODS[rollup["period"]]
+	period_expr = period_template.format("date")
+	dimension_names = [name for name, _, _ in rollup["dimensions"]]
+	key_columns = ", ".join(dimension_names + [period_column])
+	primary_key = ", ".join(rollup.get("primary_key", dimension_names + [period_column]))
+	measures = rollup.get("measures", [])
+	value_columns = ", ".join(["count"] + [name for name, _, _ in measures])
+	count_expr = rollup.get("count", "COUNT(*)")
+	source_sql = f"{source_table} {rollup.get('join', '')}"
+
+	columns_sql = "".join(f"{name} {sql_type} NOT NULL,\n\t\t" for name, sql_type, _ in rollup["dimensions"])
+	measures_sql = "".join(f"\n\t\t{name} {sql_type}," for name, sql_type, _ in measures)
+	create_table_query = f"""
+	CREATE TABLE IF NOT EXISTS {table}
+	(
+		{columns_sql}{period_column} TEXT NOT NULL,
+		count INTEGER NOT NULL,{measures_sql}
+		PRIMARY KEY ({primary_key})
+	) WITHOUT ROWID
+	"""
+
+	# Group by the expressions: a dimension named like a source column (tile_x) would group by the column
+	group_by = ", ".join([expr for _, _, expr in rollup["dimensions"]] + [period_expr])
+	select_dimensions = "".join(f"{expr} AS {name},\n\t\t" for name, _, expr in rollup["dimensions"])
+	select_measures = "".join(f",\n\t\t{expr} AS {name}" for name, _, expr in measures)
+	aggregate_query = f"""
+	INSERT INTO {table} ({key_columns}, {value_columns})
+	SELECT
+		{select_dimensions}{period_expr} AS {period_column},
+		{count_expr} AS count{select_measures}
+	FROM {source_sql}
+	WHERE {rollup["where"]}
+		AND date >= ?
+	GROUP BY {group_by}
+	"""
+
+	state = db_connection.execute(
+		f"SELECT max_date FROM {STATE_TABLE_NAME} WHERE table_name = ?", (table,)
+	).fetchone()
+	# A table written with another definition (columns or key) is rebuilt
+	expected_columns = dimension_names + [period_column, "count"] + [name for name, _, _ in measures]
+	table_info = db_connection.execute(f"PRAGMA table_info({table})").fetchall()
+	existing_columns = [row[1] for row in table_info]
+	existing_key = [row[1] for row in sorted(table_info, key=lambda row: row[5]) if row[5]]
+	table_current = existing_columns == expected_columns and existing_key == primary_key.split(", ")
+	source_max_date = db_connection.execute(f"SELECT MAX(date) FROM {source_table}").fetchone()[0]
+
+	mode = "full"
+	from_date = ""
+	if state is not None and table_current:
+		from_date = db_connection.execute(
+			f"SELECT {period_start_template.format(':date')}", {"date": state[0]}
+		).fetchone()[0]
+
+		# Rows before the refresh point must still match the rollup, otherwise rebuild
+		source_before = db_connection.execute(
+			f"SELECT COALESCE({count_expr}, 0) FROM {source_sql} WHERE {rollup['where']} AND date < ?", (from_date,)
+		).fetchone()[0]
+		rollup_before = db_connection.execute(
+			f"SELECT COALESCE(SUM(count), 0) FROM {table} WHERE {period_column} < {period_template.format(':date')}",
+			{"date": from_date}
+		).fetchone()[0]
+
+		if source_before == rollup_before:
+			source_after = db_connection.execute(
+				f"SELECT COALESCE({count_expr}, 0) FROM {source_sql} WHERE {rollup['where']} AND date >= ?", (from_date,)
+			).fetchone()[0]
+			rollup_after = db_connection.execute(
+				f"SELECT COALESCE(SUM(count), 0) FROM {table} WHERE {period_column} >= {period_template.format(':date')}",
+				{"date": from_date}
+			).fetchone()[0]
+			unchanged = source_max_date == state[0] and source_after == rollup_after
+			mode = "up-to-date" if unchanged else "incremental"
+		else:
+			from_date = ""
+
+	if mode == "up-to-date":
+		return mode, 0
+
+	if mode == "full":
+		db_connection.execute(f"DROP TABLE IF EXISTS {table};")
+		db_connection.execute(create_table_query)
+	else:
+		db_connection.execute(
+			f"DELETE FROM {table} WHERE {period_column} >= {period_template.format(':date')}", {"date": from_date}
+		)
+
+	rows_written = db_connection.execute(aggregate_query, (from_date,)).rowcount
+
+	db_connection.execute(
+		f"INSERT OR REPLACE INTO {STATE_TABLE_NAME} (table_name, max_date) VALUES (?, ?)",
+		(table, source_max_date)
+	)
+	db_connection.commit()
+
+	return mode, rows_written
+
+
+def refresh_rollups(db_connection, rollups, source_table, stage_prefix):
+	"""
+	Refresh a list of rollup tables from the same source table.
+
+	Args:
+		db_connection: sqlite3 connection to the analysis database
+		rollups: Rollup definitions (e.g. ROLLUPS)
+		source_table: Name of the source table
+		stage_prefix: Prefix of the per-rollup instrumentation stages
+
+	Returns:
+		Total number of rows written
+	"""
+	# Index on date so that incremental refreshes only scan the newest rows
+	db_connection.execute(
+		f"CREATE INDEX IF NOT EXISTS idx_{source_table}_date ON {source_table}(date);"
+	)
+	db_connection.execute(f"""
+	CREATE TABLE IF NOT EXISTS {STATE_TABLE_NAME}
+	(
+		table_name TEXT PRIMARY KEY,
+		max_date TEXT
+	)
+	""")
+
+	total_written = 0
+	for rollup in rollups:
+		with stage(f"{stage_prefix}.{rollup['table']}") as metrics:
+			mode, rows_written = refresh_rollup(db_connection, rollup, source_table)
+			metrics.rows_out = rows_written
+		total_written += rows_written
+		print(f"   ✓ {rollup['table']}: {mode} ({rows_written:,} rows written)")
+
+	return total_written
+
+
+@instrumented("extract_rollups")
+def extract_rollups():
+	# Configuration
+	EXTRACTED_DIR = "extracted"
+	TARGET_DB = os.path.join(EXTRACTED_DIR, "analysis_data.db")
+	SOURCE_TABLE_NAME = "accidents_spatial"
+
+	with sqlite3.connect(TARGET_DB) as analysis_db:
+		total_written = refresh_rollups(analysis_db, ROLLUPS, SOURCE_TABLE_NAME, "extract_rollups")
+
+	analysis_db.close()
+
+	record_rows(rows_out=total_written)
+
+	print(f"   Rollup tables refreshed successfully!")
+	print(f"   Source: {TARGET_DB} (table: {SOURCE_TABLE_NAME})")
+	print(f"   Output: {TARGET_DB}")
+
+if __name__ == "__main__":
+	extract_rollups()
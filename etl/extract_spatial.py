@@ -1,6 +1,32 @@
 import sqlite3
+import numpy as np
 import pandas as pd
 import os
+import sys
+
+# Repository root on the path for the shared pipeline package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline.instrumentation import instrumented, record_rows
+
+from spatial_grid import GRID_MAX_ZOOM, latlon_to_tile, tile_to_quadkey
+
+# Records processed per batch
+CHUNK_SIZE = 100000
+
+SPATIAL_COLUMNS = ['date', 'uf', 'municipio', 'br', 'km', 'latitude', 'longitude']
+NUMERIC_COLUMNS = ['br', 'km', 'latitude', 'longitude']
+
+# UF of municipalities that appear with a missing UF
+MUNICIPIO_TO_UF = {
+	'TERRA NOVA DO NORTE': 'MT',
+	'GUARANTA DO NORTE': 'MT',
+	'MATUPA': 'MT',
+	'PEIXOTO DE AZEVEDO': 'MT',
+	'VALPARAISO DE GOIAS': 'GO',
+	'SAO JOAO DE MERITI': 'RJ',
+	'TABOAO DA SERRA': 'SP'
+}
 
 def normalize_to_float(series):
 	"""
@@ -24,7 +50,101 @@ def normalize_to_float(series):
 		.astype(float)
 	)
 
-def extract_spatial():
+def compute_sample_keys(dataframe, max_tier=20):
+	"""
+	Assign each record a deterministic sampling key and tier.
+
+	The key is a uniform value in (0, 1] derived from a hash of the record
+	content, so it is stable across extractions. The content is normalized
+	before hashing (numbers as float64, text as str, NULL as NaN / ''), so the
+	hash does not depend on the dtypes pandas infers for each chunk. The
+	records with the smallest keys form a uniform random sample. The tier is
+	floor(-log2(key)), so a record has tier >= k with probability 2^-k: the
+	sample is read tier by tier (highest first) with an index seek each, and
+	only the last tier needed is sorted by key.
+
+	Args:
+		dataframe: DataFrame with the spatial records
+		max_tier: Highest tier assigned
+
+	Returns:
+		Tuple (tiers, keys) of pandas Series (int 0 to max_tier, float in (0, 1])
+	"""
+	normalized = pd.DataFrame({
+		column: (
+			pd.to_numeric(dataframe[column], errors='coerce').astype('float64')
+			if column in NUMERIC_COLUMNS
+			else dataframe[column].astype(object).where(dataframe[column].notna(), '').astype(str)
+		)
+		for column in SPATIAL_COLUMNS
+	})
+	hashes = pd.util.hash_pandas_object(normalized, index=False).to_numpy()
+
+	# Uniform value in (0, 1] from the top 53 bits of the hash
+	keys = ((hashes >> np.uint64(11)).astype(np.float64) + 1.0) / 2.0**53
+	tiers = np.minimum(np.floor(-np.log2(keys)), max_tier).astype(np.int64)
+
+	return pd.Series(tiers, index=dataframe.index), pd.Series(keys, index=dataframe.index)
+
+def clean_spatial_chunk(chunk):
+	"""
+	Clean a chunk of raw spatial records.
+
+	Every step only depends on the row itself, so the dataset can be cleaned
+	chunk by chunk with the same result as cleaning it all at once.
+
+	1. Normalize lat/long/km: convert comma to period, then to float
+	2. Fill missing UF values based on municipality
+	3. Drop records whose coordinates are NULL/invalid after conversion
+	4. Add the grid cell (tile and quadkey) and the sampling tier and key
+
+	Args:
+		chunk: DataFrame with columns date, uf, municipio, br, km, latitude, longitude
+
+	Returns:
+		Tuple (clean, dropped, uf_filled_count): clean records with quadkey,
+		tile_x, tile_y, sample_tier and sample_key, dropped records, and number of UF values filled
+	"""
+	chunk = chunk.copy()
+
+	# Handles both formats: 3.14 and 3,14
+	chunk['latitude'] = normalize_to_float(chunk['latitude'])
+	chunk['longitude'] = normalize_to_float(chunk['longitude'])
+	chunk['km'] = normalize_to_float(chunk['km'])
+
+	# Fill UF where it's null and the municipality is known
+	missing_uf = chunk['uf'].isna() | (chunk['uf'] == '')
+	inferred_uf = chunk['municipio'].map(MUNICIPIO_TO_UF)
+	fill_mask = missing_uf & inferred_uf.notna()
+	chunk.loc[fill_mask, 'uf'] = inferred_uf[fill_mask]
+
+	invalid_coords_mask = chunk[['latitude', 'longitude']].isna().any(axis=1)
+	dropped = chunk[invalid_coords_mask]
+	clean = chunk[~invalid_coords_mask].copy()
+
+	# Hierarchical grid cell (Web Mercator tile and quadkey) used by the map rollups
+	tile_x, tile_y = latlon_to_tile(
+		clean['latitude'].to_numpy(),
+		clean['longitude'].to_numpy(),
+		GRID_MAX_ZOOM
+	)
+	clean['quadkey'] = tile_to_quadkey(tile_x, tile_y)
+	clean['tile_x'] = tile_x
+	clean['tile_y'] = tile_y
+
+	# Deterministic sampling tier and key for map sampling queries
+	clean['sample_tier'], clean['sample_key'] = compute_sample_keys(clean)
+
+	return clean, dropped, int(fill_mask.sum())
+
+@instrumented("extract_spatial")
+def extract_spatial(chunksize=CHUNK_SIZE):
+	"""
+	Extract the records with coordinates from the raw database into accidents_spatial.
+
+	Args:
+		chunksize: Records read, cleaned and written per batch (bounds peak memory)
+	"""
 	# Configuration
 	SOURCE_DB = "data/datatran_raw.db"
 	SOURCE_TABLE_NAME = "accidents"
@@ -124,102 +244,102 @@ def extract_spatial():
 			print(f"\n   Sample of records WITHOUT coordinates (first 5):")
 			print(sample_no_coords.to_string(index=False))
 
-		# Load spatial data into DataFrame
-		print(f"\n   Extracting records with valid coordinates...")
-		spatial_dataframe = pd.read_sql_query(query, source_db_connection)
-		print(f"   ✓ Extracted {len(spatial_dataframe):,} records")
+		# Query to create the target table
+		create_table_query = f"""
+		CREATE TABLE {TARGET_TABLE_NAME}
+		(
+			id INTEGER PRIMARY KEY AUTOINCREMENT,
+			date TEXT NOT NULL,
+			uf TEXT,
+			municipio TEXT,
+			br INTEGER,
+			km REAL,
+			latitude REAL,
+			longitude REAL,
+			quadkey INTEGER,
+			tile_x INTEGER,
+			tile_y INTEGER,
+			sample_tier INTEGER,
+			sample_key REAL
+		)
+		"""
+
+		dropped_csv_path = os.path.join(EXTRACTED_DIR, "dropped_spatial_records.csv")
+		invalid_range_csv_path = os.path.join(EXTRACTED_DIR, "invalid_range_spatial_records.csv")
+
+		extracted_count = 0
+		final_count = 0
+		uf_filled_count = 0
+		dropped_count = 0
+		invalid_range_count = 0
+		dropped_sample = []
+		invalid_range_sample = []
+
+		# Stream the records in chunks: clean each chunk and append it to the target table,
+		# so memory stays bounded by the chunk size instead of the dataset size
+		print(f"\n   Extracting and cleaning records with valid coordinates (chunks of {chunksize:,})...")
+
+		with sqlite3.connect(TARGET_DB) as analysis_db:
+			analysis_db.execute(f"DROP TABLE IF EXISTS {TARGET_TABLE_NAME};")
+			analysis_db.execute(create_table_query)
+
+			for chunk in pd.read_sql_query(query, source_db_connection, chunksize=chunksize):
+				extracted_count += len(chunk)
+				clean_chunk, dropped_records, chunk_uf_filled = clean_spatial_chunk(chunk)
+				uf_filled_count += chunk_uf_filled
+
+				clean_chunk.to_sql(TARGET_TABLE_NAME, analysis_db, index=False, if_exists="append")
+				final_count += len(clean_chunk)
+
+				# Check for coordinates outside valid ranges (after conversion to float)
+				# Brazil's approximate bounding box:
+				#   Latitude:  -33.75° (south, Uruguay border) to 5.27° (north, Venezuela border)
+				#   Longitude: -73.98° (west, Acre) to -28.84° (east, Paraíba/RN)
+				# Using slightly wider bounds (-34 to 6, -75 to -30) to include border areas
+				valid_brazil_mask = (
+					(clean_chunk['latitude'].between(-34, 6)) &
+					(clean_chunk['longitude'].between(-75, -30))
+				)
+				invalid_range_records = clean_chunk.loc[~valid_brazil_mask, SPATIAL_COLUMNS]
+
+				# Append the records to review to their CSV files (overwritten on the first write of a run)
+				if len(dropped_records) > 0:
+					dropped_records.to_csv(dropped_csv_path, index=False, encoding='utf-8',
+					                       mode='a' if dropped_count else 'w', header=not dropped_count)
+					dropped_sample.append(dropped_records.head())
+					dropped_count += len(dropped_records)
+
+				if len(invalid_range_records) > 0:
+					invalid_range_records.to_csv(invalid_range_csv_path, index=False, encoding='utf-8',
+					                             mode='a' if invalid_range_count else 'w', header=not invalid_range_count)
+					invalid_range_sample.append(invalid_range_records.head())
+					invalid_range_count += len(invalid_range_records)
+
+			# Index on the grid cell: cells of any zoom level are contiguous quadkey ranges
+			analysis_db.execute(f"CREATE INDEX IF NOT EXISTS idx_{TARGET_TABLE_NAME}_quadkey ON {TARGET_TABLE_NAME}(quadkey);")
+
+			# Index for sampling: one seek per tier on the date range
+			analysis_db.execute(f"CREATE INDEX IF NOT EXISTS idx_{TARGET_TABLE_NAME}_sample ON {TARGET_TABLE_NAME}(sample_tier, date);")
+
+		analysis_db.close()
 
 	# Close source DB
 	source_db_connection.close()
 
-	# Data cleaning and normalization
-	print("\n   Cleaning and normalizing numeric fields...")
-
-	# 1. Normalize lat/long/km: convert comma to period, then to float
-	# Handles both formats: 3.14 and 3,14
-	spatial_dataframe['latitude'] = normalize_to_float(spatial_dataframe['latitude'])
-	spatial_dataframe['longitude'] = normalize_to_float(spatial_dataframe['longitude'])
-	spatial_dataframe['km'] = normalize_to_float(spatial_dataframe['km'])
-
-	# 2. Fill missing UF values based on municipality
-	municipio_to_uf = {
-		'TERRA NOVA DO NORTE': 'MT',
-		'GUARANTA DO NORTE': 'MT',
-		'MATUPA': 'MT',
-		'PEIXOTO DE AZEVEDO': 'MT',
-		'VALPARAISO DE GOIAS': 'GO',
-		'SAO JOAO DE MERITI': 'RJ',
-		'TABOAO DA SERRA': 'SP'
-	}
-
-	# Fill UF where it's null
-	def fill_uf(row):
-		if pd.isna(row['uf']) or row['uf'] == '':
-			return municipio_to_uf.get(row['municipio'], row['uf'])
-		return row['uf']
-
-	# Count how many UFs were filled
-	uf_filled_count = spatial_dataframe['uf'].apply(lambda x: municipio_to_uf.get(x, None) is not None).sum()
-
-	spatial_dataframe['uf'] = spatial_dataframe.apply(fill_uf, axis=1)
-
-	# Remove records with invalid coordinates after normalization
-	initial_count = len(spatial_dataframe)
-
-	# Identify records to be dropped (for logging)
-	invalid_coords_mask = spatial_dataframe[['latitude', 'longitude']].isna().any(axis=1)
-	dropped_records = spatial_dataframe[invalid_coords_mask].copy()
-
-	# Drop invalid records
-	spatial_dataframe = spatial_dataframe.dropna(subset=['latitude', 'longitude'])
-	dropped_count = initial_count - len(spatial_dataframe)
-
-	# Check for coordinates outside valid ranges (after conversion to float)
-	# Brazil's approximate bounding box:
-	#   Latitude:  -33.75° (south, Uruguay border) to 5.27° (north, Venezuela border)
-	#   Longitude: -73.98° (west, Acre) to -28.84° (east, Paraíba/RN)
-	# Using slightly wider bounds (-34 to 6, -75 to -30) to include border areas
-	valid_brazil_mask = (
-		(spatial_dataframe['latitude'].between(-34, 6)) &
-		(spatial_dataframe['longitude'].between(-75, -30))
-	)
-	invalid_range_count = (~valid_brazil_mask).sum()
-	invalid_range_records = spatial_dataframe[~valid_brazil_mask].copy()
+	record_rows(rows_in=stats['total_records'], rows_out=final_count)
 
+	print(f"   ✓ Extracted {extracted_count:,} records")
 	print(f"   ✓ Coordinate normalization complete")
-	print(f"   - Valid coordinates after conversion: {len(spatial_dataframe):,}")
+	print(f"   - Valid coordinates after conversion: {final_count:,}")
 	print(f"   - Invalid/NULL coordinates dropped: {dropped_count:,}")
 	print(f"   - Coordinates outside Brazil bounds: {invalid_range_count:,}")
 
-	# Query to create the target table
-	create_table_query = f"""
-	CREATE TABLE {TARGET_TABLE_NAME}
-	(
-		id INTEGER PRIMARY KEY AUTOINCREMENT,
-		date TEXT NOT NULL,
-		uf TEXT,
-		municipio TEXT,
-		br INTEGER,
-		km REAL,
-		latitude REAL,
-		longitude REAL
-	)
-	"""
-
-	# Create/update table in analysis database
-	with sqlite3.connect(TARGET_DB) as analysis_db:
-		analysis_db.execute(f"DROP TABLE IF EXISTS {TARGET_TABLE_NAME};")
-		analysis_db.execute(create_table_query)
-		spatial_dataframe.to_sql(TARGET_TABLE_NAME, analysis_db, index=False, if_exists="append")
-
-	analysis_db.close()
-
 	print(f"\n{'='*60}")
 	print(f"   ✓ SPATIAL DATA EXTRACTION COMPLETE")
 	print(f"{'='*60}")
 	print(f"   Source: {SOURCE_DB}")
 	print(f"   Output: {TARGET_DB} (table: {TARGET_TABLE_NAME})")
-	print(f"   Final records in table: {len(spatial_dataframe):,}")
+	print(f"   Final records in table: {final_count:,}")
 
 	# Summary of data cleaning
 	print(f"\n   Data quality summary:")
@@ -231,23 +351,15 @@ def extract_spatial():
 		print(f"   - Coordinates outside Brazil (included but flagged): {invalid_range_count:,}")
 
 	# Show sample of dropped records (NULL/invalid after conversion)
-	if dropped_count > 0 and len(dropped_records) > 0:
-		print(f"\n   Sample of DROPPED records with NULL/invalid coordinates (first {min(5, len(dropped_records))}):")
-		print(dropped_records.head().to_string(index=False))
-
-		# Save all dropped records to CSV for inspection
-		dropped_csv_path = os.path.join(EXTRACTED_DIR, "dropped_spatial_records.csv")
-		dropped_records.to_csv(dropped_csv_path, index=False, encoding='utf-8')
+	if dropped_count > 0:
+		print(f"\n   Sample of DROPPED records with NULL/invalid coordinates (first {min(5, dropped_count)}):")
+		print(pd.concat(dropped_sample).head().to_string(index=False))
 		print(f"   Full list saved to: {dropped_csv_path}")
 
 	# Show sample of records with coordinates outside Brazil bounds
-	if invalid_range_count > 0 and len(invalid_range_records) > 0:
-		print(f"\n   Sample of records with coordinates OUTSIDE Brazil bounds (first {min(5, len(invalid_range_records))}):")
-		print(invalid_range_records[['date', 'uf', 'municipio', 'br', 'km', 'latitude', 'longitude']].head().to_string(index=False))
-
-		# Save invalid range records to CSV
-		invalid_range_csv_path = os.path.join(EXTRACTED_DIR, "invalid_range_spatial_records.csv")
-		invalid_range_records.to_csv(invalid_range_csv_path, index=False, encoding='utf-8')
+	if invalid_range_count > 0:
+		print(f"\n   Sample of records with coordinates OUTSIDE Brazil bounds (first {min(5, invalid_range_count)}):")
+		print(pd.concat(invalid_range_sample).head().to_string(index=False))
 		print(f"   Full list saved to: {invalid_range_csv_path}")
 		print(f"\n   Note: These records are INCLUDED in the database for manual review.")
 		print(f"         Filter them out for analysis: WHERE latitude BETWEEN -34 AND 6 AND longitude BETWEEN -75 AND -30")
@@ -1,7 +1,16 @@
 import sqlite3
 import pandas as pd
 import os
+import sys
 
+# Repository root on the path for the shared pipeline package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline.instrumentation import instrumented, record_rows
+
+from extract_rollups import TIMESERIES_ROLLUPS, refresh_rollups
+
+@instrumented("extract_timeseries")
 def extract_timeseries():
 	# Configuration
 	SOURCE_DB = "data/datatran_raw.db"
@@ -76,11 +85,13 @@ def extract_timeseries():
 		time_series_db.execute(create_table_query)
 		time_series_dataframe.to_sql(TARGET_TABLE_NAME, time_series_db, index=False, if_exists="append")
 
-		# Create index on the date field (optional)
-		# time_series_db.execute(f"CREATE INDEX IF NOT EXISTS idx_accidents_date ON {TARGET_TABLE_NAME}(date);")
+		# Weekly, monthly, quarterly and day-of-week × month rollups (only the newest periods are re-aggregated)
+		refresh_rollups(time_series_db, TIMESERIES_ROLLUPS, TARGET_TABLE_NAME, "extract_timeseries")
 
 	time_series_db.close()
 
+	record_rows(rows_in=time_series_dataframe['accidents_count'].sum(), rows_out=len(time_series_dataframe))
+
 	print(f"   Daily time series extracted successfully!")
 	print(f"   Source: {SOURCE_DB}")
 	print(f"   Output: {TARGET_DB}")
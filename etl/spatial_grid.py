@@ -0,0 +1,116 @@
+import numpy as np
+
+# Deepest zoom level stored per accident (tiles of ~600 m at the equator).
+# Coarser cells are obtained by shifting: cell(z) = quadkey >> (2 * (GRID_MAX_ZOOM - z))
+GRID_MAX_ZOOM = 16
+
+# Zoom levels materialized in the rollup_grid_month table
+GRID_ZOOM_LEVELS = [4, 6, 8, 10, 12, 14]
+
+# Web Mercator latitude limit
+MAX_MERCATOR_LATITUDE = 85.05112878
+
+
+def _spread_bits(values):
+	"""
+	Insert a zero bit between each of the lower 16 bits of every value
+	(0b1011 → 0b01000101), used to interleave x/y tile coordinates.
+	"""
+	values = values.astype(np.int64) & 0xFFFF
+	values = (values | (values << 8)) & 0x00FF00FF
+	values = (values | (values << 4)) & 0x0F0F0F0F
+	values = (values | (values << 2)) & 0x33333333
+	values = (values | (values << 1)) & 0x55555555
+	return values
+
+
+def _compact_bits(values):
+	"""Inverse of _spread_bits: keep every other bit of each value."""
+	values = values.astype(np.int64) & 0x55555555
+	values = (values | (values >> 1)) & 0x33333333
+	values = (values | (values >> 2)) & 0x0F0F0F0F
+	values = (values | (values >> 4)) & 0x00FF00FF
+	values = (values | (values >> 8)) & 0x0000FFFF
+	return values
+
+
+def latlon_to_tile(latitude, longitude, zoom):
+	"""
+	Convert coordinates to Web Mercator tile indices (same tiling as OSM/Grafana maps).
+
+	Args:
+		latitude: Array-like of latitudes in degrees
+		longitude: Array-like of longitudes in degrees
+		zoom: Zoom level (0 to GRID_MAX_ZOOM)
+
+	Returns:
+		Tuple (x, y) of int64 arrays with the tile column and row
+	"""
+	latitude = np.clip(np.asarray(latitude, dtype=float), -MAX_MERCATOR_LATITUDE, MAX_MERCATOR_LATITUDE)
+	longitude = np.asarray(longitude, dtype=float)
+	n_tiles = 2 ** zoom
+
+	latitude_rad = np.radians(latitude)
+	x = (longitude + 180.0) / 360.0 * n_tiles
+	y = (1.0 - np.log(np.tan(latitude_rad) + 1.0 / np.cos(latitude_rad)) / np.pi) / 2.0 * n_tiles
+
+	x = np.clip(np.floor(x), 0, n_tiles - 1).astype(np.int64)
+	y = np.clip(np.floor(y), 0, n_tiles - 1).astype(np.int64)
+	return x, y
+
+
+def latlon_to_quadkey(latitude, longitude, zoom=GRID_MAX_ZOOM):
+	"""
+	Compute the integer quadkey of the tile containing each coordinate.
+
+	The quadkey interleaves the bits of the tile row and column (Morton order),
+	so its base-4 digits are the usual quadkey string and the parent cell at a
+	coarser zoom is obtained with a right shift. Cells of one parent form a
+	contiguous integer range, which lets a single index serve every zoom level.
+
+	Args:
+		latitude: Array-like of latitudes in degrees
+		longitude: Array-like of longitudes in degrees
+		zoom: Zoom level (0 to GRID_MAX_ZOOM)
+
+	Returns:
+		int64 array of quadkeys
+	"""
+	x, y = latlon_to_tile(latitude, longitude, zoom)
+	return tile_to_quadkey(x, y)
+
+
+def tile_to_quadkey(x, y):
+	"""Interleave tile columns and rows into integer quadkeys (see latlon_to_quadkey)."""
+	return _spread_bits(np.asarray(x)) | (_spread_bits(np.asarray(y)) << 1)
+
+
+def quadkey_parent(quadkey, zoom, parent_zoom):
+	"""Return the quadkey of the enclosing cell at a coarser zoom level."""
+	return np.asarray(quadkey, dtype=np.int64) >> (2 * (zoom - parent_zoom))
+
+
+def quadkey_bounds(quadkey, zoom):
+	"""
+	Compute the bounding box of cells.
+
+	Args:
+		quadkey: Array-like of integer quadkeys
+		zoom: Zoom level of the quadkeys
+
+	Returns:
+		Tuple (lat_min, lat_max, lon_min, lon_max) of float arrays
+	"""
+	quadkey = np.asarray(quadkey, dtype=np.int64)
+	x = _compact_bits(quadkey)
+	y = _compact_bits(quadkey >> 1)
+	n_tiles = 2 ** zoom
+
+	def tile_row_to_latitude(row):
+		return np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * row / n_tiles))))
+
+	lon_min = x / n_tiles * 360.0 - 180.0
+	lon_max = (x + 1) / n_tiles * 360.0 - 180.0
+	lat_max = tile_row_to_latitude(y)
+	lat_min = tile_row_to_latitude(y + 1)
+	return lat_min, lat_max, lon_min, lon_max
@@ -7,6 +7,27 @@ WHERE time BETWEEN $__from/1000 AND $__to/1000
 ORDER BY time
 ;
 
+-- Gráfico de accidentes diarios por cubetas (rollup_total_day_buckets)
+-- Cubetas de 2^level días: se usa el menor nivel cuyas cubetas cubren al menos el intervalo del
+-- panel ($__interval_ms), así cualquier rango devuelve como mucho un punto por píxel. Cada cubeta
+-- trae la media diaria y el mínimo y máximo diarios (bandas), de modo que los picos no desaparecen.
+-- Para la serie de un corredor: rollup_uf_br_day_buckets con uf = '$uf' AND br = $br.
+SELECT
+  bucket_t.day * 86400 AS time,
+  bucket_t.mean AS accidents_mean,
+  bucket_t.min_count,
+  bucket_t.max_count
+FROM rollup_total_day_buckets AS bucket_t
+WHERE bucket_t.level = (
+    SELECT COALESCE(MIN(column1), 9)
+    FROM (VALUES (0), (1), (2), (3), (4), (5), (6), (7), (8), (9))
+    WHERE (1 << column1) * 86400000 >= $__interval_ms
+  )
+  AND bucket_t.day <= $__to/86400000
+  AND bucket_t.day + (1 << bucket_t.level) > $__from/86400000
+ORDER BY time
+;
+
 -- Mapa de accidentes
 SELECT
   unixepoch(accident_t.date) AS time,
@@ -20,16 +41,158 @@ FROM accidents_spatial AS accident_t
 WHERE time BETWEEN $__from/1000 AND $__to/1000
 ;
 
--- Mapa de accidentes, muestras aleatorias de 1000 registros (para no sobrecargar el grafico)
-SELECT
-	unixepoch(accident_t.date) AS time,
-	accident_t.uf,
-	accident_t.municipio,
-	accident_t.br,
-	accident_t.km,
-	accident_t.latitude,
-	accident_t.longitude
-FROM accidents_spatial AS accident_t
-WHERE time BETWEEN $__from/1000 AND $__to/1000
-ORDER BY RANDOM()
+-- Mapa de accidentes, muestra de 1000 registros (para no sobrecargar el grafico)
+-- Muestra uniforme y estable entre refrescos: los 1000 registros del rango con menor sample_key
+-- (valor uniforme precalculado a partir del contenido del registro). sample_tier = floor(-log2(sample_key)),
+-- así que los de menor clave están en los niveles más altos: cada nivel es una búsqueda en el índice
+-- (sample_tier, date) sobre el rango de fechas, se leen de mayor a menor y la consulta se detiene al
+-- llegar a 1000 filas. Solo se ordena por clave el último nivel leído (unas 1000 filas), no todo el rango.
+-- Los niveles >= 10 (1 de cada 1024 registros) se leen juntos.
+SELECT * FROM (
+	SELECT
+		unixepoch(accident_t.date) AS time, accident_t.uf, accident_t.municipio, accident_t.br, accident_t.km,
+		accident_t.latitude, accident_t.longitude
+	FROM accidents_spatial AS accident_t INDEXED BY idx_accidents_spatial_sample
+	WHERE accident_t.sample_tier >= 10 AND accident_t.date BETWEEN date($__from/1000, 'unixepoch') AND date($__to/1000, 'unixepoch')
+	ORDER BY accident_t.sample_key
+	LIMIT 1000
+)
+UNION ALL
+SELECT * FROM (
+	SELECT
+		unixepoch(accident_t.date) AS time, accident_t.uf, accident_t.municipio, accident_t.br, accident_t.km,
+		accident_t.latitude, accident_t.longitude
+	FROM accidents_spatial AS accident_t INDEXED BY idx_accidents_spatial_sample
+	WHERE accident_t.sample_tier = 9 AND accident_t.date BETWEEN date($__from/1000, 'unixepoch') AND date($__to/1000, 'unixepoch')
+	ORDER BY accident_t.sample_key
+	LIMIT 1000
+)
+UNION ALL
+SELECT * FROM (
+	SELECT
+		unixepoch(accident_t.date) AS time, accident_t.uf, accident_t.municipio, accident_t.br, accident_t.km,
+		accident_t.latitude, accident_t.longitude
+	FROM accidents_spatial AS accident_t INDEXED BY idx_accidents_spatial_sample
+	WHERE accident_t.sample_tier = 8 AND accident_t.date BETWEEN date($__from/1000, 'unixepoch') AND date($__to/1000, 'unixepoch')
+	ORDER BY accident_t.sample_key
+	LIMIT 1000
+)
+UNION ALL
+SELECT * FROM (
+	SELECT
+		unixepoch(accident_t.date) AS time, accident_t.uf, accident_t.municipio, accident_t.br, accident_t.km,
+		accident_t.latitude, accident_t.longitude
+	FROM accidents_spatial AS accident_t INDEXED BY idx_accidents_spatial_sample
+	WHERE accident_t.sample_tier = 7 AND accident_t.date BETWEEN date($__from/1000, 'unixepoch') AND date($__to/1000, 'unixepoch')
+	ORDER BY accident_t.sample_key
+	LIMIT 1000
+)
+UNION ALL
+SELECT * FROM (
+	SELECT
+		unixepoch(accident_t.date) AS time, accident_t.uf, accident_t.municipio, accident_t.br, accident_t.km,
+		accident_t.latitude, accident_t.longitude
+	FROM accidents_spatial AS accident_t INDEXED BY idx_accidents_spatial_sample
+	WHERE accident_t.sample_tier = 6 AND accident_t.date BETWEEN date($__from/1000, 'unixepoch') AND date($__to/1000, 'unixepoch')
+	ORDER BY accident_t.sample_key
+	LIMIT 1000
+)
+UNION ALL
+SELECT * FROM (
+	SELECT
+		unixepoch(accident_t.date) AS time, accident_t.uf, accident_t.municipio, accident_t.br, accident_t.km,
+		accident_t.latitude, accident_t.longitude
+	FROM accidents_spatial AS accident_t INDEXED BY idx_accidents_spatial_sample
+	WHERE accident_t.sample_tier = 5 AND accident_t.date BETWEEN date($__from/1000, 'unixepoch') AND date($__to/1000, 'unixepoch')
+	ORDER BY accident_t.sample_key
+	LIMIT 1000
+)
+UNION ALL
+SELECT * FROM (
+	SELECT
+		unixepoch(accident_t.date) AS time, accident_t.uf, accident_t.municipio, accident_t.br, accident_t.km,
+		accident_t.latitude, accident_t.longitude
+	FROM accidents_spatial AS accident_t INDEXED BY idx_accidents_spatial_sample
+	WHERE accident_t.sample_tier = 4 AND accident_t.date BETWEEN date($__from/1000, 'unixepoch') AND date($__to/1000, 'unixepoch')
+	ORDER BY accident_t.sample_key
+	LIMIT 1000
+)
+UNION ALL
+SELECT * FROM (
+	SELECT
+		unixepoch(accident_t.date) AS time, accident_t.uf, accident_t.municipio, accident_t.br, accident_t.km,
+		accident_t.latitude, accident_t.longitude
+	FROM accidents_spatial AS accident_t INDEXED BY idx_accidents_spatial_sample
+	WHERE accident_t.sample_tier = 3 AND accident_t.date BETWEEN date($__from/1000, 'unixepoch') AND date($__to/1000, 'unixepoch')
+	ORDER BY accident_t.sample_key
+	LIMIT 1000
+)
+UNION ALL
+SELECT * FROM (
+	SELECT
+		unixepoch(accident_t.date) AS time, accident_t.uf, accident_t.municipio, accident_t.br, accident_t.km,
+		accident_t.latitude, accident_t.longitude
+	FROM accidents_spatial AS accident_t INDEXED BY idx_accidents_spatial_sample
+	WHERE accident_t.sample_tier = 2 AND accident_t.date BETWEEN date($__from/1000, 'unixepoch') AND date($__to/1000, 'unixepoch')
+	ORDER BY accident_t.sample_key
+	LIMIT 1000
+)
+UNION ALL
+SELECT * FROM (
+	SELECT
+		unixepoch(accident_t.date) AS time, accident_t.uf, accident_t.municipio, accident_t.br, accident_t.km,
+		accident_t.latitude, accident_t.longitude
+	FROM accidents_spatial AS accident_t INDEXED BY idx_accidents_spatial_sample
+	WHERE accident_t.sample_tier = 1 AND accident_t.date BETWEEN date($__from/1000, 'unixepoch') AND date($__to/1000, 'unixepoch')
+	ORDER BY accident_t.sample_key
+	LIMIT 1000
+)
+UNION ALL
+SELECT * FROM (
+	SELECT
+		unixepoch(accident_t.date) AS time, accident_t.uf, accident_t.municipio, accident_t.br, accident_t.km,
+		accident_t.latitude, accident_t.longitude
+	FROM accidents_spatial AS accident_t INDEXED BY idx_accidents_spatial_sample
+	WHERE accident_t.sample_tier = 0 AND accident_t.date BETWEEN date($__from/1000, 'unixepoch') AND date($__to/1000, 'unixepoch')
+	ORDER BY accident_t.sample_key
+	LIMIT 1000
+)
 LIMIT 1000;
+
+-- Mapa de accidentes agregado por celda de grilla (rollup_grid_month)
+-- Variables del dashboard: $zoom (4, 6, 8, 10, 12 o 14) y el bounding box $lat_min, $lat_max, $lon_min, $lon_max
+-- Devuelve una fila por celda (centroide de los accidentes) en lugar de un punto por accidente.
+-- La clave empieza por (zoom, tile_x, tile_y): se busca cada columna de teselas del bounding box
+-- (lineal en la longitud) en lugar de recorrer todas las celdas del zoom; como mucho 5000 celdas.
+WITH RECURSIVE tile_columns(x) AS (
+	SELECT CAST(($lon_min + 180.0) / 360.0 * (1 << $zoom) AS INTEGER)
+	UNION ALL
+	SELECT x + 1 FROM tile_columns WHERE x < CAST(($lon_max + 180.0) / 360.0 * (1 << $zoom) AS INTEGER)
+)
+SELECT
+	grid_t.cell,
+	SUM(grid_t.count) AS accidents_count,
+	SUM(grid_t.latitude * grid_t.count) / SUM(grid_t.count) AS latitude,
+	SUM(grid_t.longitude * grid_t.count) / SUM(grid_t.count) AS longitude
+FROM rollup_grid_month AS grid_t
+WHERE grid_t.zoom = $zoom
+  AND grid_t.tile_x IN tile_columns
+  AND grid_t.mes_anio BETWEEN strftime('%Y-%m', $__from/1000, 'unixepoch') AND strftime('%Y-%m', $__to/1000, 'unixepoch')
+  AND grid_t.latitude BETWEEN $lat_min AND $lat_max
+  AND grid_t.longitude BETWEEN $lon_min AND $lon_max
+GROUP BY grid_t.cell
+ORDER BY accidents_count DESC
+LIMIT 5000
+;
+
+-- Rendimiento del pipeline (pipeline_metrics): duración y memoria pico por etapa en cada ejecución
+-- started_at está en UTC con zona (2025-12-01T10:15:03+00:00): se compara como instante, no como texto
+SELECT
+	unixepoch(metrics_t.started_at) AS time,
+	metrics_t.stage,
+	metrics_t.wall_s,
+	metrics_t.peak_rss_mb
+FROM pipeline_metrics AS metrics_t
+WHERE unixepoch(metrics_t.started_at) BETWEEN $__from/1000 AND $__to/1000
+ORDER BY time
+;
@@ -1,17 +1,75 @@
 #!/usr/bin/env python3
 """
-Sample main.py file to test the Makefile setup
+Pipeline entry point.
+
+Runs the stages download → create_sqlite_db → extract → analyses (pod_estados,
+pod_spatial, dmd, svd), skipping the ones that are up to date and running the
+independent analyses concurrently.
+
+Usage:
+    python main.py                                  # bring every stage up to date
+    python main.py pod_spatial dmd --uf MG --br 381 # only these analyses (and what they need)
+    python main.py --dry-run                        # show what would run
+    python main.py --force extract                  # rerun extract and everything downstream
+    python main.py --adopt all                      # trust artifacts built before the runner was used
 """
 
+import argparse
+import os
 import sys
 
+from pipeline.dag import run_stages
+from pipeline.stages import DEFAULT_BIN_SIZE, DEFAULT_BR, DEFAULT_DELAYS, DEFAULT_DTYPE, DEFAULT_RANK, DEFAULT_UF, build_stages
+
+
+def int_or_auto(value):
+    """argparse type: a positive integer or 'auto'."""
+    return value if value == "auto" else int(value)
+
 
 def main():
-    print("Hello from main.py!")
-    print(f"Python version: {sys.version}")
-    print(f"Python executable: {sys.executable}")
-    print("\nThe Makefile is working correctly!")
+    stage_names = [stage.name for stage in build_stages()]
+
+    parser = argparse.ArgumentParser(description="Run the DATATRAN pipeline (only stale stages are run)")
+    parser.add_argument("targets", nargs="*", metavar="STAGE",
+                        help=f"Stages to bring up to date (default: all). One of: {', '.join(stage_names)}")
+    parser.add_argument("--uf", default=DEFAULT_UF, help=f"State of the corridor analyses (default: {DEFAULT_UF})")
+    parser.add_argument("--br", type=int, default=DEFAULT_BR, help=f"Federal highway of the corridor analyses (default: {DEFAULT_BR})")
+    parser.add_argument("--bin", type=int, default=DEFAULT_BIN_SIZE, dest="bin_size",
+                        help=f"Spatial bin in km (default: {DEFAULT_BIN_SIZE})")
+    parser.add_argument("--rank", type=int_or_auto, default=DEFAULT_RANK,
+                        help=f"Number of DMD modes, 'auto' to derive it from the spectrum (default: {DEFAULT_RANK})")
+    parser.add_argument("--delays", type=int_or_auto, default=DEFAULT_DELAYS,
+                        help=f"Time delays of the DMD stage, > 1 uses HODMD, 'auto' uses the dominant period (default: {DEFAULT_DELAYS})")
+    parser.add_argument("--dtype", default=DEFAULT_DTYPE, choices=["float64", "float32"],
+                        help=f"Compute dtype of the corridor analyses, float32 halves memory (default: {DEFAULT_DTYPE})")
+    parser.add_argument("--force", nargs="+", default=[], metavar="STAGE", choices=stage_names + ["all"],
+                        help="Rerun these stages even if up to date ('all' for every stage)")
+    parser.add_argument("--adopt", nargs="+", default=[], metavar="STAGE", choices=stage_names + ["all"],
+                        help="Record these never-run stages as up to date when their outputs exist ('all' for every stage)")
+    parser.add_argument("--jobs", type=int, default=min(4, os.cpu_count() or 1), help="Concurrent stages, and processes of each stage's bootstrap pool (default: min(4, CPUs))")
+    parser.add_argument("--dry-run", action="store_true", help="Only show which stages would run")
+    parser.add_argument("--verbose", action="store_true", help="Show stage output instead of writing it to extracted/logs/")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.targets if name not in stage_names]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)}")
+
+    # Stage scripts use paths relative to the repository root
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    stages = build_stages(uf=args.uf.upper(), br=args.br, bin_size=args.bin_size, rank=args.rank,
+                          delays=args.delays, dtype=args.dtype)
+    force = stage_names if "all" in args.force else args.force
+    adopt = stage_names if "all" in args.adopt else args.adopt
+    if args.verbose:
+        args.jobs = 1
+
+    ok = run_stages(stages, targets=args.targets or None, force=force, adopt=adopt, jobs=args.jobs,
+                    dry_run=args.dry_run, verbose=args.verbose)
+    return 0 if ok else 1
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
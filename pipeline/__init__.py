@@ -0,0 +1,3 @@
+"""
+Pipeline infrastructure shared by the ETL and analysis scripts.
+"""
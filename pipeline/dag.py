@@ -0,0 +1,350 @@
+"""
+Dependency-aware, cached stage runner.
+
+A stage is up to date when the fingerprint recorded after its last successful
+run matches its current fingerprint and its outputs exist. The fingerprint
+covers:
+- the content of the stage's source files
+- its parameters
+- size and modification time of its external input files
+- the fingerprints of the stages it depends on
+so editing a script, changing a parameter or rebuilding an upstream artifact
+makes the stage, and everything downstream of it, stale.
+
+Stages whose dependencies are satisfied run concurrently in worker processes.
+Fingerprints are kept in extracted/pipeline_state.json.
+"""
+
+import ast
+import hashlib
+import importlib
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import redirect_stderr, redirect_stdout
+from glob import glob
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATE_PATH = os.path.join("extracted", "pipeline_state.json")
+LOG_DIR = os.path.join("extracted", "logs")
+
+
+class Stage:
+    """
+    A pipeline stage.
+
+    Args:
+        name: Stage name
+        target: Function run by the stage, as "module:function" (importable with
+                the repository root and etl/ on sys.path)
+        params: Keyword arguments of the function (part of the fingerprint)
+        deps: Names of the stages that must run before
+        sources: Code/config files (glob patterns) whose content is fingerprinted
+        inputs: External input files (glob patterns) fingerprinted by size and mtime
+        outputs: Files (glob patterns) the stage must produce
+        superseded_by: Files that make the outputs unnecessary once they exist
+                       (e.g. downloaded CSVs deleted after import into a database)
+        jobs_param: Keyword argument of the function that receives the runner's
+                    --jobs as the size of the stage's own process pool (not
+                    part of the fingerprint)
+    """
+
+    def __init__(self, name, target, params=None, deps=(), sources=(), inputs=(), outputs=(), superseded_by=(),
+                 jobs_param=None):
+        self.name = name
+        self.target = target
+        self.params = params or {}
+        self.deps = list(deps)
+        self.sources = list(sources)
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.superseded_by = list(superseded_by)
+        self.jobs_param = jobs_param
+
+
+def _expand(patterns):
+    return sorted(path for pattern in patterns for path in glob(pattern))
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _module_path(module):
+    """Repository-relative file of a module, or None if it is not part of the repository."""
+    base = module.replace(".", "/")
+    for path in (base + ".py", base + "/__init__.py"):
+        if os.path.isfile(os.path.join(REPO_ROOT, path)):
+            return path
+    return None
+
+
+def module_sources(module, packages=("analysis",)):
+    """
+    Source files of a module and of everything it imports from the given packages.
+
+    Follows imports transitively, including the ones inside functions, and adds
+    the __init__.py of every package on the way, so a stage's fingerprint covers
+    all the repository code it runs.
+
+    Args:
+        module: Dotted name of the stage's module (e.g. "analysis.pod.pod_spatial")
+        packages: Top-level packages whose imports are followed
+
+    Returns:
+        Sorted list of repository-relative paths
+    """
+    seen = set()
+    pending = [module]
+    while pending:
+        name = pending.pop()
+        parts = name.split(".")
+        # The module itself and the packages that contain it
+        for i in range(1, len(parts) + 1):
+            path = _module_path(".".join(parts[:i]))
+            if path is None or path in seen:
+                continue
+            seen.add(path)
+            with open(os.path.join(REPO_ROOT, path), encoding="utf-8") as f:
+                tree = ast.parse(f.read(), filename=path)
+            for node in ast.walk(tree):
+                if isinstance(node, ast.Import):
+                    names = [alias.name for alias in node.names]
+                elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                    # "from package import submodule" imports the submodule too
+                    names = [node.module] + [f"{node.module}.{alias.name}" for alias in node.names]
+                else:
+                    continue
+                pending.extend(n for n in names if n.split(".")[0] in packages)
+
+    return sorted(seen)
+
+
+def compute_fingerprint(stage, dep_fingerprints):
+    """
+    Fingerprint of a stage given the fingerprints of its dependencies.
+
+    Returns:
+        Hex digest
+    """
+    payload = {
+        "target": stage.target,
+        "params": stage.params,
+        "sources": {path: _file_digest(path) for path in _expand(stage.sources)},
+        "inputs": {path: [os.path.getsize(path), os.stat(path).st_mtime_ns] for path in _expand(stage.inputs)},
+        "deps": {dep: dep_fingerprints.get(dep) for dep in stage.deps},
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def outputs_present(stage):
+    """True if every output pattern matches a file, or a superseding file exists."""
+    if any(glob(pattern) for pattern in stage.superseded_by):
+        return True
+    return all(glob(pattern) for pattern in stage.outputs)
+
+
+def resolve_order(stages, targets=None):
+    """
+    Stages needed to build the targets (all stages by default), in dependency order.
+
+    Raises:
+        ValueError: Unknown stage or dependency cycle
+    """
+    by_name = {stage.name: stage for stage in stages}
+    order, visiting, visited = [], set(), set()
+
+    def visit(name):
+        if name not in by_name:
+            raise ValueError(f"Unknown stage: {name}")
+        if name in visited:
+            return
+        if name in visiting:
+            raise ValueError(f"Dependency cycle through stage: {name}")
+        visiting.add(name)
+        for dep in by_name[name].deps:
+            visit(dep)
+        visiting.discard(name)
+        visited.add(name)
+        order.append(by_name[name])
+
+    for name in targets or [stage.name for stage in stages]:
+        visit(name)
+    return order
+
+
+def load_state(state_path=STATE_PATH):
+    if not os.path.exists(state_path):
+        return {}
+    with open(state_path) as f:
+        return json.load(f)
+
+
+def save_state(state, state_path=STATE_PATH):
+    os.makedirs(os.path.dirname(state_path), exist_ok=True)
+    with open(state_path, "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+
+
+def plan(order, state, force=(), adopt=()):
+    """
+    Decide which stages must run.
+
+    A stage with no recorded fingerprint has never run through the runner and
+    runs, even if files matching its outputs exist: they may come from an older
+    version of its code. Stages listed in `adopt` whose outputs exist have their
+    current fingerprint recorded without running instead.
+
+    Args:
+        order: Stages in dependency order (output of resolve_order)
+        state: Recorded fingerprints {stage name: fingerprint}
+        force: Names of stages to run regardless of their state
+        adopt: Names of never-run stages whose existing outputs are trusted
+
+    Returns:
+        Tuple (reasons, fingerprints): reasons maps every stage to the reason it
+        must run, or None when up to date; fingerprints are the current ones
+    """
+    reasons, fingerprints = {}, {}
+
+    for stage in order:
+        fingerprint = compute_fingerprint(stage, fingerprints)
+        fingerprints[stage.name] = fingerprint
+
+        if stage.name in force:
+            reason = "forced"
+        elif any(reasons.get(dep) for dep in stage.deps):
+            reason = "upstream stale"
+        elif not outputs_present(stage):
+            reason = "missing outputs"
+        elif stage.name not in state:
+            if stage.name in adopt:
+                state[stage.name] = fingerprint
+                reason = None
+            else:
+                reason = "never run"
+        elif state[stage.name] != fingerprint:
+            reason = "changed"
+        else:
+            reason = None
+        reasons[stage.name] = reason
+
+    return reasons, fingerprints
+
+
+def _run_stage_worker(target, params, log_path):
+    """Run a stage function inside a worker process. Returns the elapsed wall time."""
+    os.chdir(REPO_ROOT)
+    for path in (REPO_ROOT, os.path.join(REPO_ROOT, "etl")):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    # Workers have no display: plots are only saved to files
+    os.environ.setdefault("MPLBACKEND", "Agg")
+
+    module_name, function_name = target.split(":")
+    start = time.perf_counter()
+
+    if log_path is None:
+        getattr(importlib.import_module(module_name), function_name)(**params)
+        return time.perf_counter() - start
+
+    with open(log_path, "w", encoding="utf-8") as log, redirect_stdout(log), redirect_stderr(log):
+        try:
+            getattr(importlib.import_module(module_name), function_name)(**params)
+        except BaseException:
+            traceback.print_exc()
+            raise
+    return time.perf_counter() - start
+
+
+def run_stages(stages, targets=None, force=(), adopt=(), jobs=None, dry_run=False, verbose=False, state_path=STATE_PATH):
+    """
+    Run the stale stages needed for the targets.
+
+    Args:
+        stages: All Stage definitions
+        targets: Names of the stages to bring up to date (default: all)
+        force: Names of stages to run even if up to date
+        adopt: Names of never-run stages whose existing outputs are recorded as up to date
+        jobs: Maximum number of concurrent worker processes, also passed to the
+              stages' own process pools (Stage.jobs_param)
+        dry_run: Only print the plan
+        verbose: Show stage output in the console instead of extracted/logs/
+
+    Returns:
+        True if every needed stage is up to date or ran successfully
+    """
+    order = resolve_order(stages, targets)
+    state = load_state(state_path)
+    reasons, fingerprints = plan(order, state, set(force), set(adopt))
+
+    print(f"{'Stage':<20}Status")
+    print("-" * 40)
+    for stage in order:
+        print(f"{stage.name:<20}{'run (' + reasons[stage.name] + ')' if reasons[stage.name] else 'up to date'}")
+
+    if dry_run:
+        return True
+    save_state(state, state_path)
+
+    by_name = {stage.name: stage for stage in order}
+    pending = [stage for stage in order if reasons[stage.name]]
+    done = {name for name, reason in reasons.items() if reason is None}
+    failed = set()
+    if not pending:
+        print("\nEverything is up to date.")
+        return True
+
+    os.makedirs(LOG_DIR, exist_ok=True)
+    print()
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        running = {}
+        while pending or running:
+            for stage in list(pending):
+                if any(dep in failed for dep in stage.deps):
+                    pending.remove(stage)
+                    failed.add(stage.name)
+                    print(f"  - {stage.name}: skipped (dependency failed)")
+                elif all(dep in done for dep in stage.deps):
+                    pending.remove(stage)
+                    # Dependencies have finished: fingerprint against their final artifacts
+                    fingerprints[stage.name] = compute_fingerprint(stage, fingerprints)
+                    log_path = None if verbose else os.path.join(LOG_DIR, f"{stage.name}.log")
+                    params = dict(stage.params, **({stage.jobs_param: jobs} if stage.jobs_param else {}))
+                    running[pool.submit(_run_stage_worker, stage.target, params, log_path)] = stage
+                    print(f"  ▶ {stage.name}" + (f" (log: {log_path})" if log_path else ""))
+
+            if not running:
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage = running.pop(future)
+                try:
+                    elapsed = future.result()
+                except Exception as e:
+                    failed.add(stage.name)
+                    print(f"  ✗ {stage.name}: {type(e).__name__}: {e}")
+                    continue
+
+                if not outputs_present(stage):
+                    failed.add(stage.name)
+                    print(f"  ✗ {stage.name}: finished without producing {', '.join(stage.outputs)}")
+                    continue
+
+                done.add(stage.name)
+                state[stage.name] = fingerprints[stage.name]
+                save_state(state, state_path)
+                print(f"  ✓ {stage.name} ({elapsed:.1f} s)")
+
+    # Stages never started because a dependency was missing from this run
+    failed.update(stage.name for stage in pending)
+    print(f"\n{len(done) - sum(reason is None for reason in reasons.values())} stage(s) run, {len(failed)} failed.")
+    return not failed and set(by_name) <= done
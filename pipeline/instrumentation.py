@@ -0,0 +1,298 @@
+"""
+Stage-level instrumentation for the ETL and analysis steps.
+
+Usage:
+    from pipeline.instrumentation import instrumented, record_rows, stage
+
+    with stage("compute_pod") as metrics:
+        ...
+        metrics.rows_in = X.shape[0]
+
+    @instrumented("extract_spatial")
+    def extract_spatial():
+        ...
+        record_rows(rows_in=len(raw), rows_out=len(clean))
+
+Every stage records its start time (UTC), wall time, CPU time, peak RSS and
+rows in/out, and emits one JSON line to PIPELINE_METRICS_LOG (default: extracted/pipeline_metrics.jsonl).
+Records of the current process are kept for print_summary() and save_metrics(),
+which stores them in the pipeline_metrics table of a SQLite database.
+
+Stages of one run share a run id (PIPELINE_RUN_ID, generated if not set), so
+subprocesses launched by an orchestrator report under the same run.
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import wraps
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+METRICS_TABLE_NAME = "pipeline_metrics"
+DEFAULT_METRICS_LOG = os.path.join("extracted", "pipeline_metrics.jsonl")
+
+RUN_ID = os.environ.setdefault(
+    "PIPELINE_RUN_ID", datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S") + f"-{os.getpid()}"
+)
+
+# Stage records of the current process, in completion order
+_records = []
+
+# Stages currently running (innermost last)
+_active = []
+
+# Highest VmHWM (kB) seen before the last reset of the high-water mark
+_process_peak_kb = 0
+
+# Whether the RSS high-water mark can be reset (None: not tried yet)
+_peak_resettable = None
+
+
+class StageMetrics:
+    """Measurements of a single stage. rows_in/rows_out are set by the caller."""
+
+    def __init__(self, name, rows_in=None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.started_at = None
+        self.wall_s = None
+        self.cpu_s = None
+        self.peak_rss_mb = None
+        self._peak_kb = 0
+        self.status = "running"
+        self.error = None
+
+    def as_dict(self):
+        return {
+            "run_id": RUN_ID,
+            "stage": self.name,
+            "started_at": self.started_at,
+            "wall_s": self.wall_s,
+            "cpu_s": self.cpu_s,
+            "peak_rss_mb": self.peak_rss_mb,
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "status": self.status,
+            "error": self.error,
+        }
+
+
+def _status_kb(field):
+    """Value in kB of a field of /proc/self/status (None where unavailable)."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as status:
+            for line in status:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak():
+    """Reset the RSS high-water mark (VmHWM) to the current RSS; False if not supported."""
+    global _peak_resettable
+    if _peak_resettable is False:
+        return False
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as clear_refs:
+            clear_refs.write("5")
+        _peak_resettable = True
+    except OSError:
+        _peak_resettable = False
+    return _peak_resettable
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of the current process in MB (None if unavailable).
+
+    On Linux this is VmHWM, which starts over at exec (ru_maxrss would include
+    the parent's peak in a spawned process), combined with the peaks seen
+    before each per-stage reset.
+    """
+    hwm = _status_kb("VmHWM")
+    if hwm is not None:
+        return max(hwm, _process_peak_kb) / 1024
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def _start_peak():
+    """
+    Start measuring the peak RSS of a stage.
+
+    The high-water mark is reset when the stage starts. The peak reached so
+    far is first credited to the stages still running and to the process, so
+    an enclosing stage still reports the peak of its earlier steps.
+
+    Returns:
+        True if the stage's own peak can be measured
+    """
+    global _process_peak_kb
+    hwm = _status_kb("VmHWM")
+    if hwm is None:
+        return False
+    for running in _active:
+        running._peak_kb = max(running._peak_kb, hwm)
+    _process_peak_kb = max(_process_peak_kb, hwm)
+    return _reset_peak()
+
+
+def _stage_peak_mb(metrics, per_stage):
+    """Peak RSS of a stage in MB: its own peak, or the process peak where it cannot be reset."""
+    if not per_stage:
+        return peak_rss_mb()
+    return max(metrics._peak_kb, _status_kb("VmHWM") or 0) / 1024
+
+
+def _emit(record):
+    log_path = os.environ.get("PIPELINE_METRICS_LOG", DEFAULT_METRICS_LOG)
+    log_dir = os.path.dirname(log_path)
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+    with open(log_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record.as_dict(), ensure_ascii=False) + "\n")
+
+
+@contextmanager
+def stage(name, rows_in=None):
+    """
+    Measure a pipeline stage.
+
+    Args:
+        name: Stage name
+        rows_in: Number of input rows, if known up front (can also be set later)
+
+    Yields:
+        StageMetrics whose rows_in/rows_out can be filled in by the stage.
+        Its peak_rss_mb is the highest RSS while the stage ran (nested stages
+        included); where the high-water mark cannot be reset (outside Linux),
+        it is the process peak at the end of the stage.
+    """
+    metrics = StageMetrics(name, rows_in)
+    metrics.started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    per_stage_peak = _start_peak()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+
+    _active.append(metrics)
+    try:
+        yield metrics
+        metrics.status = "ok"
+    except BaseException as e:
+        metrics.status = "error"
+        metrics.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _active.remove(metrics)
+        metrics.wall_s = round(time.perf_counter() - wall_start, 6)
+        metrics.cpu_s = round(time.process_time() - cpu_start, 6)
+        metrics.peak_rss_mb = _stage_peak_mb(metrics, per_stage_peak)
+        _records.append(metrics)
+        _emit(metrics)
+
+
+def instrumented(name):
+    """Decorator running the whole function as a stage (see stage())."""
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_rows(rows_in=None, rows_out=None):
+    """Set the row counts of the innermost running stage (no-op outside a stage)."""
+    if not _active:
+        return
+    if rows_in is not None:
+        _active[-1].rows_in = int(rows_in)
+    if rows_out is not None:
+        _active[-1].rows_out = int(rows_out)
+
+
+def get_records():
+    """Stage records of the current process."""
+    return list(_records)
+
+
+def _format_count(value):
+    return f"{value:,}" if value is not None else "-"
+
+
+def print_summary():
+    """Print a summary table of the stages run by this process."""
+    if not _records:
+        return
+
+    names = [record.name if record.status == "ok" else f"{record.name} ({record.status})" for record in _records]
+    name_width = max(len(name) for name in names + ["Stage"]) + 2
+    line_width = name_width + 59
+
+    print("\n" + "=" * line_width)
+    print(f"PIPELINE METRICS (run {RUN_ID})")
+    print("-" * line_width)
+    print(f"{'Stage':<{name_width}}{'Wall (s)':>10}{'CPU (s)':>10}{'Peak RSS (MB)':>15}{'Rows in':>12}{'Rows out':>12}")
+    print("-" * line_width)
+    for name, record in zip(names, _records):
+        rss = f"{record.peak_rss_mb:.1f}" if record.peak_rss_mb is not None else "n/a"
+        print(f"{name:<{name_width}}{record.wall_s:>10.3f}{record.cpu_s:>10.3f}{rss:>15}"
+              f"{_format_count(record.rows_in):>12}{_format_count(record.rows_out):>12}")
+    print("=" * line_width)
+
+
+def save_metrics(db_path):
+    """
+    Store the stage records of this process in the pipeline_metrics table.
+
+    Args:
+        db_path: SQLite database (typically the analysis database, so that
+                 Grafana can chart pipeline performance next to the data)
+    """
+    if not _records:
+        return
+
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {METRICS_TABLE_NAME}
+        (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id TEXT NOT NULL,
+            stage TEXT NOT NULL,
+            started_at TEXT NOT NULL,
+            wall_s REAL,
+            cpu_s REAL,
+            peak_rss_mb REAL,
+            rows_in INTEGER,
+            rows_out INTEGER,
+            status TEXT NOT NULL,
+            error TEXT
+        )
+        """)
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{METRICS_TABLE_NAME}_stage ON {METRICS_TABLE_NAME}(stage, started_at);")
+        conn.executemany(
+            f"""
+            INSERT INTO {METRICS_TABLE_NAME}
+                (run_id, stage, started_at, wall_s, cpu_s, peak_rss_mb, rows_in, rows_out, status, error)
+            VALUES
+                (:run_id, :stage, :started_at, :wall_s, :cpu_s, :peak_rss_mb, :rows_in, :rows_out, :status, :error)
+            """,
+            [record.as_dict() for record in _records]
+        )
+    conn.close()
+
+    _records.clear()
@@ -0,0 +1,100 @@
+"""
+Stage definitions of the project: download → raw DB → extract → analyses.
+"""
+
+import os
+
+from pipeline.dag import Stage, module_sources
+
+RAW_DB = os.path.join("data", "datatran_raw.db")
+ANALYSIS_DB = os.path.join("extracted", "analysis_data.db")
+
+DEFAULT_UF = "SC"
+DEFAULT_BR = 101
+DEFAULT_BIN_SIZE = 10
+DEFAULT_RANK = 15
+DEFAULT_DELAYS = 1
+DEFAULT_DTYPE = "float64"
+
+
+def download_data():
+    """Download the yearly CSV files listed in etl/enlaces.csv (existing files are kept)."""
+    from descarga import descargar_y_descomprimir_datos
+    descargar_y_descomprimir_datos(os.path.join("etl", "enlaces.csv"))
+
+
+def build_stages(uf=DEFAULT_UF, br=DEFAULT_BR, bin_size=DEFAULT_BIN_SIZE, rank=DEFAULT_RANK, delays=DEFAULT_DELAYS,
+                 dtype=DEFAULT_DTYPE):
+    """
+    Build the stage DAG for a corridor.
+
+    Args:
+        uf: State of the corridor analyses
+        br: Federal highway of the corridor analyses
+        bin_size: Spatial bin (km) of the corridor analyses
+        rank: Number of DMD modes ("auto" derives it from the spectrum)
+        delays: Time delays of the DMD stage (> 1 uses HODMD, "auto" uses the dominant period)
+        dtype: Compute dtype of the corridor analyses ("float64" or "float32")
+
+    Returns:
+        List of Stage
+    """
+    corridor = f"br{br}_{uf}"
+
+    return [
+        Stage(
+            "download",
+            "pipeline.stages:download_data",
+            sources=["etl/descarga.py", "etl/enlaces.csv"],
+            outputs=["data/datatran*.csv"],
+            # The CSVs are deleted once imported into the raw database
+            superseded_by=[RAW_DB],
+        ),
+        Stage(
+            "create_sqlite_db",
+            "create_sqlite_db:create_sqlite_db",
+            deps=["download"],
+            sources=["etl/create_sqlite_db.py"],
+            outputs=[RAW_DB],
+        ),
+        Stage(
+            "extract",
+            "extract_data:main",
+            deps=["create_sqlite_db"],
+            sources=["etl/extract_*.py", "etl/spatial_grid.py"],
+            inputs=[RAW_DB],
+            outputs=[ANALYSIS_DB],
+        ),
+        Stage(
+            "pod_estados",
+            "analysis.pod.pod_estados:main",
+            deps=["extract"],
+            sources=module_sources("analysis.pod.pod_estados"),
+            outputs=["analysis/pod/results/pod_estados_macro.png", "analysis/pod/results/pod_estados_energia.png"],
+        ),
+        Stage(
+            "pod_spatial",
+            "analysis.pod.pod_spatial:main",
+            params={"estado": uf, "carretera": br, "bin_size": bin_size, "dtype": dtype},
+            deps=["extract"],
+            sources=module_sources("analysis.pod.pod_spatial"),
+            outputs=[f"analysis/pod/results/pod_spatial_{corridor}.png", f"analysis/pod/results/matriz_original_{corridor}.png"],
+            jobs_param="jobs",
+        ),
+        Stage(
+            "dmd",
+            "analysis.dmd.dmd_analysis:main",
+            params={"estado": uf, "carretera": br, "bin_size": bin_size, "n_modos": rank, "retardos": delays, "dtype": dtype},
+            deps=["extract"],
+            sources=module_sources("analysis.dmd.dmd_analysis"),
+            outputs=[f"analysis/dmd/results/dmd_prediction_{corridor}.png", f"analysis/dmd/results/dmd_comparison_{corridor}.png"],
+            jobs_param="jobs",
+        ),
+        Stage(
+            "svd",
+            "metodo_SVD.svd_pod_analysis:main",
+            deps=["extract"],
+            sources=module_sources("metodo_SVD.svd_pod_analysis"),
+            outputs=["metodo_SVD/fig1_original_daily_series.png", "metodo_SVD/fig10_X_heatmap.png", "metodo_SVD/anomaly_detector.npz"],
+        ),
+    ]
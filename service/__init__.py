@@ -0,0 +1,3 @@
+"""
+Local HTTP analytics service: JSON endpoints over the analysis database for dashboards.
+"""
@@ -0,0 +1,51 @@
+"""
+LRU cache of encoded responses, invalidated when the database changes.
+"""
+
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """
+    Least-recently-used cache of response bodies tagged with a data version.
+
+    A lookup with a version different from the stored one empties the cache
+    first, so responses computed from an older database are never served.
+
+    Args:
+        maxsize: Maximum number of cached responses
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def _check_version(self, version):
+        if version != self.version:
+            self._entries.clear()
+            self.version = version
+
+    def get(self, key, version):
+        """Cached value for key under this data version, or None."""
+        self._check_version(version)
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value, version):
+        """Store value, evicting the least recently used entries beyond maxsize."""
+        self._check_version(version)
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        return {"entries": len(self._entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
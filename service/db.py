@@ -0,0 +1,75 @@
+"""
+Read-only SQLite access for the analytics service.
+
+Every connection is opened with `mode=ro` and `PRAGMA query_only`, so the
+service can never write to the analysis database while the pipeline owns it.
+Queries run on a thread pool with one connection per thread, keeping blocking
+SQLite and numpy work off the event loop.
+"""
+
+import asyncio
+import os
+import queue
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import pathname2url
+
+
+def data_version(db_path):
+    """
+    Version of the database contents: size and modification time of the file and its WAL.
+
+    Any commit by the pipeline changes it, so it is a cheap cache key (one stat
+    per file) without querying the database.
+    """
+    version = []
+    for path in (db_path, db_path + "-wal"):
+        try:
+            info = os.stat(path)
+        except FileNotFoundError:
+            continue
+        version.append((info.st_mtime_ns, info.st_size))
+    return tuple(version)
+
+
+class ReadOnlyPool:
+    """
+    Fixed pool of read-only connections served through a thread pool.
+
+    Args:
+        db_path: SQLite database (must exist)
+        size: Connections (and worker threads)
+    """
+
+    def __init__(self, db_path, size=4):
+        if not os.path.exists(db_path):
+            raise FileNotFoundError(f"Database not found: {db_path}")
+
+        self.db_path = db_path
+        self._connections = queue.SimpleQueue()
+        uri = f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro"
+        for _ in range(size):
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            conn.execute("PRAGMA query_only = ON")
+            self._connections.put(conn)
+        self._size = size
+        # As many threads as connections: a running task always finds one free
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="sqlite-ro")
+
+    def _call(self, function, args):
+        conn = self._connections.get()
+        try:
+            return function(conn, *args)
+        finally:
+            self._connections.put(conn)
+
+    async def run(self, function, *args):
+        """Run function(conn, *args) on a pool thread with a read-only connection."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._call, function, args)
+
+    def close(self):
+        """Wait for running queries and close every connection."""
+        self._executor.shutdown(wait=True)
+        for _ in range(self._size):
+            self._connections.get().close()
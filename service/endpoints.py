@@ -0,0 +1,459 @@
+"""
+Endpoint handlers of the analytics service.
+
+Each handler is a plain function handler(conn, params) -> JSON-serializable
+dict, run on a pool thread with a read-only connection. Bad parameters raise
+ValueError (400) and unknown corridors LookupError (404).
+
+Times are epoch milliseconds (Grafana's $__from / $__to) or ISO dates, and
+are returned as epoch milliseconds (UTC), like unixepoch() in graficos.sql.
+"""
+
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from analysis.data import SERIES_TABLES, build_snapshot_matrix
+from analysis.dmd.dmd_core import dmd_exact, predict_future
+from analysis.downsample import lttb, minmax
+from analysis.linalg import center_rows
+from analysis.pod.pod_core import compute_pod, energy_percentages
+from etl.spatial_grid import latlon_to_tile
+
+DEFAULT_MAX_POINTS = 1000
+GRID_ZOOMS = (4, 6, 8, 10, 12, 14)  # Levels precomputed in rollup_grid_month
+GRID_EXTENT = (-34.0, 6.0, -75.0, -30.0)  # lat_min, lat_max, lon_min, lon_max of the cells in rollup_grid_month
+MAX_GRID_TILES = 16384  # Tiles of the bounding box read per request (a coarser zoom is used above it)
+DEFAULT_MAX_CELLS = 5000
+
+# Series tiers from finest to coarsest, with their approximate length in days
+SERIES_TIERS = (("day", 1), ("week", 7), ("month", 30.44), ("quarter", 91.31))
+
+# Downsampling of the daily series: calendar rollups, min/max/mean day buckets or LTTB over the buckets
+SERIES_METHODS = ("calendar", "buckets", "lttb")
+BUCKET_MAX_LEVEL = 9  # Levels built by etl/extract_buckets.py (buckets of 2^level days)
+LTTB_INPUT_FACTOR = 8  # LTTB input: the finest bucket level with at most this many buckets per output point
+EPOCH = date(1970, 1, 1)
+
+CORRIDOR_QUERY = """
+SELECT (km_bin / ?) * ? AS tramo_km, mes_anio, SUM(count) AS count
+FROM rollup_uf_br_km10_month
+WHERE uf = ? AND br = ?
+GROUP BY tramo_km, mes_anio
+ORDER BY mes_anio
+"""
+
+
+# ============================================================
+# Parameters
+# ============================================================
+
+def _int(params, name, default, minimum=None, maximum=None):
+    value = params.get(name)
+    if value is None:
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be an integer") from None
+    if minimum is not None and value < minimum:
+        raise ValueError(f"'{name}' must be at least {minimum}")
+    if maximum is not None and value > maximum:
+        raise ValueError(f"'{name}' must be at most {maximum}")
+    return value
+
+
+def _float(params, name, default):
+    value = params.get(name)
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be a number") from None
+
+
+def _date(params, name, default):
+    """Date of an epoch-milliseconds or ISO parameter."""
+    value = params.get(name)
+    if value is None:
+        return default
+    try:
+        if value.lstrip("-").isdigit():
+            return datetime.fromtimestamp(int(value) / 1000, tz=timezone.utc).date()
+        return date.fromisoformat(value[:10])
+    except ValueError:
+        raise ValueError(f"'{name}' must be epoch milliseconds or an ISO date") from None
+
+
+def _road(params):
+    uf = params.get("uf", "").upper()
+    if not uf:
+        raise ValueError("'uf' is required")
+    br = _int(params, "br", None)
+    if br is None:
+        raise ValueError("'br' is required")
+    return uf, br
+
+
+def _corridor(params):
+    uf, br = _road(params)
+    bin_size = _int(params, "bin", 10, minimum=10)
+    if bin_size % 10:
+        raise ValueError("'bin' must be a multiple of 10")
+    return uf, br, bin_size
+
+
+def epoch_ms(day):
+    return int(datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp() * 1000)
+
+
+# Period key of each tier → first day of the period
+PERIOD_START = {
+    "day": date.fromisoformat,
+    "week": date.fromisoformat,
+    "month": lambda key: date(int(key[:4]), int(key[5:7]), 1),
+    "quarter": lambda key: date(int(key[:4]), 3 * int(key[-1]) - 2, 1),
+}
+
+# Date → key of the period containing it (comparable as strings)
+PERIOD_KEY = {
+    "day": lambda day: day.isoformat(),
+    "week": lambda day: (day - timedelta(days=day.weekday())).isoformat(),
+    "month": lambda day: day.strftime("%Y-%m"),
+    "quarter": lambda day: f"{day.year}-Q{(day.month - 1) // 3 + 1}",
+}
+
+
+def series_tier(start, end, max_points):
+    """Finest tier whose number of periods in [start, end] fits in max_points."""
+    n_days = (end - start).days + 1
+    for tier, days in SERIES_TIERS:
+        if n_days / days <= max_points:
+            return tier
+    return SERIES_TIERS[-1][0]
+
+
+def _method(params, allowed, default):
+    method = params.get("method", default)
+    if method not in allowed:
+        raise ValueError(f"'method' must be one of {', '.join(allowed)}")
+    return method
+
+
+def bucket_level(start_day, end_day, max_points):
+    """
+    Finest bucket level whose buckets overlapping days [start_day, end_day] fit
+    in max_points, or the coarsest level when none does (the caller thins it).
+    """
+    for level in range(BUCKET_MAX_LEVEL + 1):
+        if (end_day >> level) - (start_day >> level) + 1 <= max_points:
+            return level
+    return BUCKET_MAX_LEVEL
+
+
+def _key_filter(keys):
+    return "".join(f"{name} = ? AND " for name in keys)
+
+
+def _bucket_columns(conn, table, keys, level, start_day, end_day, first_day, last_day):
+    """
+    Buckets of one level overlapping days [start_day, end_day], as column arrays.
+
+    The tables only hold buckets with accidents; the others (within the
+    series' range [first_day, last_day]) are filled in as zeros, so gaps are
+    drawn as zeros instead of being bridged by a line.
+    """
+    size = 1 << level
+    low, high = max(start_day, first_day), min(end_day, last_day)
+    days = np.arange((low >> level) << level, high + 1, size)
+    columns = {
+        "day": days,
+        "count": np.zeros(len(days), dtype=np.int64),
+        "days": np.minimum(days + size - 1, last_day) - np.maximum(days, first_day) + 1,
+        "mean": np.zeros(len(days)),
+        "min": np.zeros(len(days), dtype=np.int64),
+        "max": np.zeros(len(days), dtype=np.int64),
+    }
+    if not len(days):
+        return columns
+
+    where = _key_filter(keys)
+    rows = conn.execute(
+        f"SELECT day, count, span, mean, min_count, max_count FROM {table} "
+        f"WHERE {where}level = ? AND day BETWEEN ? AND ? ORDER BY day",
+        (*keys.values(), level, int(days[0]), int(days[-1])),
+    ).fetchall()
+    if rows:
+        day, count, span, mean, minimum, maximum = zip(*rows)
+        position = np.searchsorted(days, day)
+        columns["count"][position] = count
+        columns["days"][position] = span
+        columns["mean"][position] = mean
+        columns["min"][position] = minimum
+        columns["max"][position] = maximum
+    return columns
+
+
+def _bucket_series(conn, table, keys, params, method):
+    """
+    Series of a day-bucket table over [from, to] with at most max_points points.
+
+    'buckets' returns every bucket of the finest level that fits, with its
+    mean, min and max daily count, so spikes survive any zoom level. When even
+    the coarsest level has more than max_points buckets, the buckets with the
+    lowest and highest mean of max_points / 2 groups are kept (minmax). 'lttb'
+    reads a level up to LTTB_INPUT_FACTOR times finer and keeps max_points of
+    its buckets with Largest-Triangle-Three-Buckets.
+    """
+    # First and last day with accidents of the series (two lookups on the primary key)
+    where = _key_filter(keys)
+    first_day, last_day = conn.execute(
+        f"SELECT (SELECT MIN(day) FROM {table} WHERE {where}level = 0), (SELECT MAX(day) FROM {table} WHERE {where}level = 0)",
+        (*keys.values(), *keys.values()),
+    ).fetchone()
+    if first_day is None:
+        return {"method": method, "bucket_days": 1, "points": []}
+    start_day = (_date(params, "from", EPOCH + timedelta(days=first_day)) - EPOCH).days
+    end_day = (_date(params, "to", EPOCH + timedelta(days=last_day)) - EPOCH).days
+    if end_day < start_day:
+        raise ValueError("'to' is before 'from'")
+    max_points = _int(params, "max_points", DEFAULT_MAX_POINTS, minimum=1)
+    # The level follows the days with data, not the requested range
+    start_day, end_day = max(start_day, first_day), min(end_day, last_day)
+
+    read_points = max_points * LTTB_INPUT_FACTOR if method == "lttb" else max_points
+    level = bucket_level(start_day, end_day, read_points)
+    columns = _bucket_columns(conn, table, keys, level, start_day, end_day, first_day, last_day)
+
+    names = ("count", "days", "mean", "min", "max")
+    if method == "lttb":
+        keep = lttb(columns["day"], columns["mean"], max_points)
+        columns = {name: values[keep] for name, values in columns.items()}
+        names = ("count", "days", "mean")
+    elif len(columns["day"]) > max_points:
+        keep = minmax(columns["mean"], max_points)
+        columns = {name: values[keep] for name, values in columns.items()}
+
+    values = [columns[name].tolist() for name in names]
+    return {
+        "method": method,
+        "bucket_days": 1 << level,
+        "points": [
+            {"time": day * 86_400_000, **dict(zip(names, row))}
+            for day, *row in zip(columns["day"].tolist(), *values)
+        ],
+    }
+
+
+def _corridor_matrix(conn, uf, br, bin_size):
+    df = pd.read_sql_query(CORRIDOR_QUERY, conn, params=(bin_size, bin_size, uf, br))
+    if df.empty:
+        raise LookupError(f"No accidents for BR-{br}/{uf}")
+    return build_snapshot_matrix(df, dtype="float64")
+
+
+# ============================================================
+# Handlers
+# ============================================================
+
+def daily_series(conn, params):
+    """
+    National accident series over [from, to], at the finest resolution with at most max_points points.
+
+    With method=calendar (default), wide ranges are served from the weekly /
+    monthly / quarterly rollups instead of thinning the daily rows; `days`
+    gives the days covered by each point, so count / days is comparable
+    across resolutions. If even the quarterly rollup has more than max_points
+    periods, the periods with the lowest and highest count / days of
+    max_points / 2 groups are kept. method=buckets and method=lttb read the
+    power-of-two day buckets of rollup_total_day_buckets instead.
+    """
+    method = _method(params, SERIES_METHODS, "calendar")
+    if method != "calendar":
+        return _bucket_series(conn, "rollup_total_day_buckets", {}, params, method)
+
+    first, last = conn.execute("SELECT MIN(date), MAX(date) FROM accidents_daily").fetchone()
+    if first is None:
+        return {"method": method, "resolution": "day", "points": []}
+    start = _date(params, "from", date.fromisoformat(first))
+    end = _date(params, "to", date.fromisoformat(last))
+    if end < start:
+        raise ValueError("'to' is before 'from'")
+    max_points = _int(params, "max_points", DEFAULT_MAX_POINTS, minimum=1)
+    start, end = max(start, date.fromisoformat(first)), min(end, date.fromisoformat(last))
+
+    tier = series_tier(start, end, max_points)
+    table, period_column = SERIES_TABLES[tier]
+    count_column, days_column = ("accidents_count", "1") if tier == "day" else ("count", "dias")
+    rows = conn.execute(
+        f"SELECT {period_column}, {count_column}, {days_column} FROM {table} "
+        f"WHERE {period_column} BETWEEN ? AND ? ORDER BY {period_column}",
+        (PERIOD_KEY[tier](start), PERIOD_KEY[tier](end)),
+    ).fetchall()
+    # Ranges too long even for the coarsest tier (or whose partial periods at the ends
+    # exceed max_points): keep the periods with the lowest and highest daily rate
+    if len(rows) > max_points:
+        keep = minmax([count / days for _, count, days in rows], max_points)
+        rows = [rows[i] for i in keep]
+
+    to_start = PERIOD_START[tier]
+    return {
+        "method": method,
+        "resolution": tier,
+        "points": [{"time": epoch_ms(to_start(key)), "count": count, "days": days} for key, count, days in rows],
+    }
+
+
+def corridor_series(conn, params):
+    """Daily accident series of one road (BR-br in uf) from rollup_uf_br_day_buckets, as buckets or LTTB points."""
+    uf, br = _road(params)
+    method = _method(params, SERIES_METHODS[1:], "buckets")
+    if conn.execute(
+        "SELECT 1 FROM rollup_uf_br_day_buckets WHERE uf = ? AND br = ? AND level = ? LIMIT 1",
+        (uf, br, BUCKET_MAX_LEVEL),
+    ).fetchone() is None:
+        raise LookupError(f"No accidents for BR-{br}/{uf}")
+
+    return {"uf": uf, "br": br, **_bucket_series(conn, "rollup_uf_br_day_buckets", {"uf": uf, "br": br}, params, method)}
+
+
+def grid_map(conn, params):
+    """
+    Accidents per grid cell (centroid and count) of rollup_grid_month within a time range and bounding box.
+
+    The box is clipped to the extent of the rollup and converted to a range of
+    tile columns and rows, which lead the table's key: the query seeks each
+    column instead of scanning every cell of the zoom level. If the box holds
+    more than MAX_GRID_TILES tiles at the requested zoom, the finest coarser
+    zoom that fits is used. At most max_cells cells are returned, the busiest
+    first.
+    """
+    requested_zoom = _int(params, "zoom", 8)
+    if requested_zoom not in GRID_ZOOMS:
+        raise ValueError(f"'zoom' must be one of {', '.join(map(str, GRID_ZOOMS))}")
+    start = _date(params, "from", date(1900, 1, 1))
+    end = _date(params, "to", date(2999, 12, 31))
+    max_cells = _int(params, "max_cells", DEFAULT_MAX_CELLS, minimum=1, maximum=MAX_GRID_TILES)
+
+    extent_lat_min, extent_lat_max, extent_lon_min, extent_lon_max = GRID_EXTENT
+    lat_min = max(_float(params, "lat_min", extent_lat_min), extent_lat_min)
+    lat_max = min(_float(params, "lat_max", extent_lat_max), extent_lat_max)
+    lon_min = max(_float(params, "lon_min", extent_lon_min), extent_lon_min)
+    lon_max = min(_float(params, "lon_max", extent_lon_max), extent_lon_max)
+    if lat_min > lat_max or lon_min > lon_max:
+        return {"zoom": requested_zoom, "requested_zoom": requested_zoom, "truncated": False, "cells": []}
+
+    for zoom in sorted((z for z in GRID_ZOOMS if z <= requested_zoom), reverse=True):
+        # Top-left and bottom-right tiles of the box (tile rows grow southwards)
+        (x_min, x_max), (y_min, y_max) = latlon_to_tile([lat_max, lat_min], [lon_min, lon_max], zoom)
+        if (x_max - x_min + 1) * (y_max - y_min + 1) <= MAX_GRID_TILES:
+            break
+
+    rows = conn.execute(
+        """
+        WITH RECURSIVE tile_columns(x) AS (SELECT ? UNION ALL SELECT x + 1 FROM tile_columns WHERE x < ?)
+        SELECT cell, SUM(count) AS total, SUM(latitude * count) / SUM(count), SUM(longitude * count) / SUM(count)
+        FROM rollup_grid_month
+        WHERE zoom = ?
+          AND tile_x IN tile_columns
+          AND tile_y BETWEEN ? AND ?
+          AND mes_anio BETWEEN ? AND ?
+          AND latitude BETWEEN ? AND ?
+          AND longitude BETWEEN ? AND ?
+        GROUP BY cell
+        ORDER BY total DESC
+        LIMIT ?
+        """,
+        (int(x_min), int(x_max), zoom, int(y_min), int(y_max),
+         PERIOD_KEY["month"](start), PERIOD_KEY["month"](end),
+         lat_min, lat_max, lon_min, lon_max, max_cells + 1),
+    ).fetchall()
+
+    return {
+        "zoom": zoom,
+        "requested_zoom": requested_zoom,
+        "truncated": len(rows) > max_cells,
+        "cells": [
+            {"cell": cell, "count": count, "latitude": lat, "longitude": lon}
+            for cell, count, lat, lon in rows[:max_cells]
+        ],
+    }
+
+
+def pod_modes(conn, params):
+    """Leading POD modes (spatial, temporal, energy) of a corridor's centered snapshot matrix."""
+    uf, br, bin_size = _corridor(params)
+    n_modes = _int(params, "modes", 3, minimum=1, maximum=50)
+
+    X, km, months = _corridor_matrix(conn, uf, br, bin_size)
+    U, S, Vt, _ = compute_pod(X, center=True)
+    energy, _ = energy_percentages(S)
+    k = min(n_modes, len(S))
+
+    return {
+        "uf": uf,
+        "br": br,
+        "bin_km": bin_size,
+        "km": km.tolist(),
+        "months": [{"month": month, "time": epoch_ms(PERIOD_START["month"](month))} for month in months],
+        "energy_pct": energy[:k].tolist(),
+        "singular_values": S[:k].tolist(),
+        "spatial_modes": U[:, :k].T.tolist(),
+        "temporal_modes": Vt[:k].tolist(),
+    }
+
+
+def dmd_forecast(conn, params):
+    """Exact-DMD fit and forecast of a corridor, summed over its segments, with the DMD eigenvalues."""
+    uf, br, bin_size = _corridor(params)
+    rank = _int(params, "rank", 15, minimum=1, maximum=100)
+    horizon = _int(params, "horizon", 24, minimum=0, maximum=240)
+
+    X, _, observed_months = _corridor_matrix(conn, uf, br, bin_size)
+    if X.shape[1] < 3:
+        raise LookupError(f"Not enough months for BR-{br}/{uf}")
+    X_centered, X_mean = center_rows(X)
+    Phi, eigenvalues, b = dmd_exact(X_centered, r=min(rank, *X_centered[:, :-1].shape))
+    model = (predict_future(Phi, eigenvalues, b, X.shape[1] + horizon) + X_mean).sum(axis=0)
+    observed_total = X.sum(axis=0)
+
+    months = pd.period_range(observed_months[0], periods=len(model), freq="M").strftime("%Y-%m")
+    points = [
+        {
+            "time": epoch_ms(PERIOD_START["month"](month)),
+            "month": month,
+            "observed": float(observed_total[t]) if t < len(observed_total) else None,
+            "model": float(model[t]),
+        }
+        for t, month in enumerate(months)
+    ]
+
+    angles = np.angle(eigenvalues)
+    return {
+        "uf": uf,
+        "br": br,
+        "bin_km": bin_size,
+        "horizon": horizon,
+        "points": points,
+        "eigenvalues": [
+            {
+                "real": float(lam.real),
+                "imag": float(lam.imag),
+                "abs": float(abs(lam)),
+                "period_months": float(2 * np.pi / abs(angle)) if angle != 0 else None,
+            }
+            for lam, angle in zip(eigenvalues, angles)
+        ],
+    }
+
+
+# Path → handler
+ROUTES = {
+    "/series/daily": daily_series,
+    "/series/corridor": corridor_series,
+    "/map/grid": grid_map,
+    "/pod/modes": pod_modes,
+    "/dmd/forecast": dmd_forecast,
+}
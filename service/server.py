@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Asyncio HTTP server exposing the analysis database as JSON for dashboards.
+
+Endpoints (GET, query-string parameters):
+    /health                                             service, cache and data version
+    /series/daily?from=&to=&max_points=&method=         national series, resolution chosen by range
+    /series/corridor?uf=SC&br=101&from=&to=&max_points=&method=
+    /map/grid?zoom=&from=&to=&lat_min=&lat_max=&lon_min=&lon_max=&max_cells=
+    /pod/modes?uf=SC&br=101&bin=10&modes=3
+    /dmd/forecast?uf=SC&br=101&bin=10&rank=15&horizon=24
+
+Responses are cached (LRU) by path and parameters and the cache is emptied
+whenever the database file changes, so a dashboard refresh after the first
+costs one stat() and a dictionary lookup. Only the standard library (plus the
+analysis dependencies) is needed.
+
+Usage:
+    python -m service.server
+    python -m service.server --db extracted/analysis_data.db --port 8050
+    curl "http://127.0.0.1:8050/series/daily?from=2020-01-01&to=2020-12-31"
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from urllib.parse import parse_qsl, urlsplit
+
+# Repository root on the path for the analysis package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from service.cache import ResponseCache
+from service.db import ReadOnlyPool, data_version
+from service.endpoints import ROUTES
+
+DEFAULT_DB = os.path.join("extracted", "analysis_data.db")
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8050
+DEFAULT_POOL_SIZE = 4
+DEFAULT_CACHE_SIZE = 256
+MAX_HEADER_BYTES = 16384
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class AnalyticsService:
+    """
+    Routing, caching and error handling, independent of the HTTP transport.
+
+    `await service.handle(target)` returns (status, body, cache_status) for a
+    request target such as "/series/daily?max_points=500", so the service can
+    be exercised without opening a socket.
+
+    Args:
+        db_path: Analysis database
+        pool_size: Read-only connections (and query threads)
+        cache_size: Cached responses
+    """
+
+    def __init__(self, db_path=DEFAULT_DB, pool_size=DEFAULT_POOL_SIZE, cache_size=DEFAULT_CACHE_SIZE):
+        self.db_path = db_path
+        self.pool = ReadOnlyPool(db_path, size=pool_size)
+        self.cache = ResponseCache(cache_size)
+
+    async def handle(self, target):
+        url = urlsplit(target)
+        path = url.path.rstrip("/") or "/"
+        params = dict(parse_qsl(url.query))
+        version = data_version(self.db_path)
+
+        if path == "/health":
+            return 200, _encode({"status": "ok", "data_version": version, "cache": self.cache.stats()}), "bypass"
+
+        handler = ROUTES.get(path)
+        if handler is None:
+            return 404, _encode({"error": f"Unknown endpoint: {path}", "endpoints": sorted(ROUTES)}), "bypass"
+
+        key = (path, tuple(sorted(params.items())))
+        body = self.cache.get(key, version)
+        if body is not None:
+            return 200, body, "hit"
+
+        try:
+            body = _encode(await self.pool.run(handler, params))
+        except ValueError as error:
+            return 400, _encode({"error": str(error)}), "bypass"
+        except LookupError as error:
+            return 404, _encode({"error": str(error)}), "bypass"
+
+        self.cache.put(key, body, version)
+        return 200, body, "miss"
+
+    def close(self):
+        self.pool.close()
+
+
+def _encode(payload):
+    return json.dumps(payload, separators=(",", ":"), allow_nan=False).encode("utf-8")
+
+
+# ============================================================
+# HTTP transport
+# ============================================================
+
+async def _read_request(reader):
+    """(method, target, headers) of the next request on the connection, or None when it is closed."""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+    except asyncio.LimitOverrunError:
+        raise ValueError("Request header too large") from None
+
+    lines = head.decode("latin-1").split("\r\n")
+    parts = lines[0].split()
+    if len(parts) != 3:
+        raise ValueError("Malformed request line")
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    return parts[0], parts[1], headers
+
+
+def _response(status, body, cache_status, elapsed_ms, keep_alive, head_only=False):
+    headers = [
+        f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+        "Content-Type: application/json",
+        f"Content-Length: {len(body)}",
+        "Access-Control-Allow-Origin: *",
+        f"X-Cache: {cache_status}",
+        f"Server-Timing: app;dur={elapsed_ms:.2f}",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+    ]
+    return ("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + (b"" if head_only else body)
+
+
+def make_connection_handler(service, verbose=False):
+    """Stream handler serving HTTP/1.1 requests (with keep-alive) from `service`."""
+
+    async def handle_connection(reader, writer):
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except ValueError as error:
+                    writer.write(_response(400, _encode({"error": str(error)}), "bypass", 0.0, keep_alive=False))
+                    break
+                if request is None:
+                    break
+                method, target, headers = request
+
+                start = time.perf_counter()
+                if method not in ("GET", "HEAD"):
+                    status, body, cache_status = 405, _encode({"error": f"Method not allowed: {method}"}), "bypass"
+                else:
+                    try:
+                        status, body, cache_status = await service.handle(target)
+                    except Exception as error:  # noqa: BLE001 - reported to the client, the server keeps running
+                        status, body, cache_status = 500, _encode({"error": f"{type(error).__name__}: {error}"}), "bypass"
+                elapsed_ms = 1000 * (time.perf_counter() - start)
+
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(_response(status, body, cache_status, elapsed_ms, keep_alive, head_only=method == "HEAD"))
+                await writer.drain()
+                if verbose:
+                    print(f"{method} {target} {status} {cache_status} {elapsed_ms:.1f} ms", flush=True)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    return handle_connection
+
+
+async def serve(db_path=DEFAULT_DB, host=DEFAULT_HOST, port=DEFAULT_PORT, pool_size=DEFAULT_POOL_SIZE,
+                cache_size=DEFAULT_CACHE_SIZE, verbose=False):
+    """Run the service until cancelled."""
+    service = AnalyticsService(db_path, pool_size=pool_size, cache_size=cache_size)
+    server = await asyncio.start_server(make_connection_handler(service, verbose), host, port, limit=MAX_HEADER_BYTES)
+    print(f"Serving {db_path} on http://{host}:{port} (endpoints: /health, {', '.join(sorted(ROUTES))})", flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON analytics service over the analysis database")
+    parser.add_argument("--db", default=DEFAULT_DB, help=f"Analysis database (default: {DEFAULT_DB})")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"Bind address (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port (default: {DEFAULT_PORT})")
+    parser.add_argument("--pool-size", type=int, default=DEFAULT_POOL_SIZE,
+                        help=f"Read-only connections and query threads (default: {DEFAULT_POOL_SIZE})")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE,
+                        help=f"Cached responses (default: {DEFAULT_CACHE_SIZE})")
+    parser.add_argument("--verbose", action="store_true", help="Log every request with its cache status and latency")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.db, args.host, args.port, args.pool_size, args.cache_size, args.verbose))
+    except KeyboardInterrupt:
+        pass
+    except FileNotFoundError as error:
+        print(f"Error: {error}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())